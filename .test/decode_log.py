@@ -0,0 +1,184 @@
+"""기록된 상태 패킷 로그 일괄 디코드 (NumPy)
+
+    python .test/decode_log.py summary packets.txt             # 필드별 최소/최대/평균, 값 변화 횟수
+    python .test/decode_log.py summary packets.txt --field dust_sensor_alarm
+    python .test/decode_log.py export packets.txt out.csv      # 필드별 열로 저장 (.csv / .parquet)
+    python .test/decode_log.py validate packets.txt            # parse_status_packet 결과와 전체 비교
+
+입력 파일은 한 줄에 패킷 하나 - contents hex 또는 MQTT 메시지 JSON ({"type": "STATUS", "contents": ...}).
+FIELD_LAYOUT 을 필드별 (바이트 구간, shift, mask) 로 한 번 변환해 패킷 배열 전체에 열 단위로 적용하므로
+패킷마다 파이썬 호출이 없다. Parquet 저장에는 pyarrow 가 필요하다.
+"""
+import argparse
+import json
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+
+from standalone import load_module
+
+
+protocol = load_module("protocol")
+
+
+def _compile_columns(layout) -> tuple:
+    """필드 테이블을 (이름, 첫 바이트, 바이트 수, shift, mask) 로 변환 - 필드가 걸친 바이트만 읽음"""
+    columns = []
+    for name, byte_offset, bit_offset, width in layout:
+        first = byte_offset + bit_offset // 8
+        start_bit = bit_offset % 8
+        count = (start_bit + width + 7) // 8
+        columns.append((name, first, count, count * 8 - start_bit - width, (1 << width) - 1))
+    return tuple(columns)
+
+
+_COLUMNS = _compile_columns(protocol.FIELD_LAYOUT)
+
+
+def packets_to_array(packets) -> np.ndarray:
+    """hex 문자열 목록 또는 bytes 목록을 (N, FIELD_END) uint8 배열로 변환 (필드 구간 뒤는 버림)"""
+    if isinstance(packets, np.ndarray) and packets.dtype == np.uint8 and packets.ndim == 2:
+        return packets[:, :protocol.FIELD_END]
+    width = protocol.FIELD_END
+    packets = list(packets)
+    if not packets:
+        return np.empty((0, width), dtype=np.uint8)
+    if isinstance(packets[0], str):
+        # 같은 길이로 잘라 한 번에 hex 디코드
+        raw = bytes.fromhex("".join(packet[:width * 2] for packet in packets))
+    else:
+        raw = b"".join(bytes(packet[:width]) for packet in packets)
+    if len(raw) != len(packets) * width:
+        raise ValueError(f"Packet shorter than {width} bytes in batch")
+    return np.frombuffer(raw, dtype=np.uint8).reshape(len(packets), width)
+
+
+def decode_batch(packets) -> dict[str, np.ndarray]:
+    """패킷 배열을 필드별 열 배열로 디코드 (FIELD_LAYOUT 순서, decode_state 와 같은 값)"""
+    data = packets_to_array(packets)
+    columns = {}
+    for name, first, count, shift, mask in _COLUMNS:
+        value = data[:, first].astype(np.uint32)
+        for offset in range(1, count):
+            value = (value << 8) | data[:, first + offset]
+        value = (value >> shift) & mask
+        columns[name] = value.astype(np.uint16)
+    return columns
+
+
+def read_lines(lines) -> tuple[list[str], int]:
+    """줄 목록에서 contents hex 목록과 거부한 줄 수를 읽음 (JSON/hex 오류, 짧은 패킷은 거부하고 계속)"""
+    packets = []
+    rejected = 0
+    minimum = protocol.FIELD_END * 2
+    for line in lines:
+        line = line.strip()
+        if not line:
+            continue
+        if line.startswith("{"):
+            try:
+                line = json.loads(line).get("contents", "")
+            except (ValueError, AttributeError):
+                rejected += 1
+                continue
+        if not isinstance(line, str) or len(line) < minimum:
+            rejected += 1
+            continue
+        try:
+            bytes.fromhex(line)
+        except ValueError:
+            rejected += 1
+            continue
+        packets.append(line)
+    return packets, rejected
+
+
+def read_log(path: Path) -> tuple[list[str], int]:
+    """로그 파일에서 contents hex 목록과 거부한 줄 수를 읽음"""
+    with path.open() as f:
+        return read_lines(f)
+
+
+def summarize(columns: dict[str, np.ndarray], fields=None):
+    """필드별 최소/최대/평균과 값이 바뀐 횟수, 첫 변화 위치 출력"""
+    print(f"{'field':<24} {'min':>6} {'max':>6} {'mean':>10} {'changes':>9} {'first change':>13}")
+    for name in fields or columns:
+        values = columns[name]
+        if not len(values):
+            print(f"{name:<24} {'-':>6} {'-':>6} {'-':>10} {0:>9} {'-':>13}")
+            continue
+        changed = np.flatnonzero(values[1:] != values[:-1]) + 1
+        first = str(changed[0]) if len(changed) else "-"
+        print(f"{name:<24} {values.min():>6} {values.max():>6} {values.mean():>10.2f} "
+              f"{len(changed):>9} {first:>13}")
+
+
+def export(columns: dict[str, np.ndarray], path: Path):
+    """열 배열을 CSV 또는 Parquet 으로 저장"""
+    if path.suffix == ".parquet":
+        try:
+            import pyarrow as pa
+            import pyarrow.parquet as pq
+        except ImportError:
+            sys.exit("Parquet 저장에는 pyarrow 가 필요합니다 (pip install pyarrow)")
+        pq.write_table(pa.table(columns), path)
+        return
+    table = np.column_stack(list(columns.values()))
+    np.savetxt(path, table, fmt="%d", delimiter=",", header=",".join(columns), comments="")
+
+
+def validate(packets: list[str], columns: dict[str, np.ndarray]) -> int:
+    """parse_status_packet 결과와 패킷/필드 단위로 비교해 불일치 수 반환"""
+    mismatches = 0
+    for index, packet in enumerate(packets):
+        parsed = protocol.parse_status_packet(packet)
+        for filter_type in ("prefilter", "hepafilter"):
+            flags = parsed.pop(filter_type)
+            parsed[f"{filter_type}_reset"] = int(flags["reset_flag"])
+            parsed[f"{filter_type}_hours"] = flags["hours"]
+        for name, values in columns.items():
+            if parsed[name] != values[index]:
+                mismatches += 1
+                if mismatches <= 10:
+                    print(f"불일치 #{index} {name}: scalar={parsed[name]} batch={values[index]}")
+    return mismatches
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    commands = parser.add_subparsers(dest="command", required=True)
+    summary = commands.add_parser("summary", help="필드별 요약")
+    summary.add_argument("log", type=Path)
+    summary.add_argument("--field", action="append", help="요약할 필드 (여러 번 지정 가능, 기본 전체)")
+    export_parser = commands.add_parser("export", help="CSV/Parquet 저장")
+    export_parser.add_argument("log", type=Path)
+    export_parser.add_argument("output", type=Path)
+    validate_parser = commands.add_parser("validate", help="scalar 디코더와 비교")
+    validate_parser.add_argument("log", type=Path)
+    args = parser.parse_args()
+
+    packets, rejected = read_log(args.log)
+    started = time.perf_counter()
+    columns = decode_batch(packets)
+    elapsed = time.perf_counter() - started
+    print(f"{len(packets):,} packets 디코드 {elapsed * 1000:.1f} ms (거부한 줄 {rejected})")
+
+    if args.command == "summary":
+        unknown = set(args.field or ()) - set(columns)
+        if unknown:
+            sys.exit(f"알 수 없는 필드: {', '.join(sorted(unknown))}")
+        summarize(columns, args.field)
+    elif args.command == "export":
+        export(columns, args.output)
+        print(f"저장: {args.output}")
+    elif args.command == "validate":
+        mismatches = validate(packets, columns)
+        print(f"불일치 {mismatches}건" if mismatches else "scalar 디코더와 모두 일치")
+        if mismatches:
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
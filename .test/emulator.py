@@ -0,0 +1,317 @@
+"""DIV01/THESOOP 환기장치 에뮬레이터 및 부하 생성기
+
+MQTT 모드 - 로컬 브로커에 접속해 기기처럼 동작:
+    python .test/emulator.py mqtt --host 127.0.0.1 --port 8885 --tls --devices 1 --device-prefix DIV01-EMU
+    python .test/emulator.py mqtt --host 127.0.0.1 --port 1883 --devices 300 --rate 1
+
+    /things/{id}/status 로 상태 패킷을 주기적으로 발행하고, /things/{id}/shadow 로 받은 CMD contents 를
+    내부 상태에 적용한 뒤 바뀐 상태를 바로 다시 발행한다. (통합구성요소를 로컬 브로커로 붙이려면
+    const.py 의 MQTT_BROKER / MQTT_PORT 를 바꾸거나 해당 호스트 이름을 로컬 브로커로 돌린다.)
+
+In-process 모드 - 브로커 없이 에뮬레이터 기기를 통합구성요소의 on_message / 명령 경로에 직접 연결 (Home Assistant 필요):
+    python .test/emulator.py in-process --devices 500 --rate 1 --command-rate 50 --duration 30
+
+    기기 수에 따른 메시지 처리/디스패치 처리량과 명령 왕복(전송 → 기기 적용 → 상태 확인) 지연을 측정한다.
+"""
+import argparse
+import asyncio
+import json
+import random
+import ssl
+import sys
+import tempfile
+import threading
+import time
+from types import SimpleNamespace
+
+from standalone import ROOT, load_module
+
+# CMD 에서 기기 상태에 반영하는 필드
+COMMAND_FIELDS = ("power", "fan_speed", "ai_mode", "sleep_mode", "pressure_mode", "fan_in", "fan_out")
+
+
+protocol = load_module("protocol")
+
+
+class EmulatedDevice:
+    """기기 한 대의 내부 상태 - CMD 적용, 센서 값 변화, 상태 패킷 생성"""
+
+    def __init__(self, device_id: str, rng: random.Random):
+        self.device_id = device_id
+        self.status_topic = f"/things/{device_id}/status"
+        self.command_topic = f"/things/{device_id}/shadow"
+        self._rng = rng
+        self.fields = {name: 0 for name, *_ in protocol.FIELD_LAYOUT}
+        self.fields.update({
+            "power": 1,
+            "fan_speed": 2,
+            "wifi": 4,
+            "fan_in": 1,
+            "fan_out": 1,
+            "co2": rng.randrange(450, 900),
+            "pm1": rng.randrange(0, 20),
+            "pm25": rng.randrange(0, 30),
+            "pm10": rng.randrange(0, 50),
+            "prefilter_hours": rng.randrange(0, 2000),
+            "hepafilter_hours": rng.randrange(0, 4000),
+        })
+        self.commands = 0
+
+    def drift(self):
+        """센서 값을 조금씩 움직임 (실제 기기처럼 매 패킷마다 값이 바뀜)"""
+        fields = self.fields
+        rng = self._rng
+        fields["co2"] = min(5000, max(400, fields["co2"] + rng.randint(-15, 15)))
+        for key in ("pm1", "pm25", "pm10"):
+            fields[key] = min(999, max(0, fields[key] + rng.randint(-2, 2)))
+        fields["odor"] = rng.randrange(4) if rng.random() < 0.05 else fields["odor"]
+
+    def apply_command(self, contents: str):
+        """CMD contents 의 제어 필드와 필터 리셋을 내부 상태에 반영"""
+        command = protocol.decode_fields(bytes.fromhex(contents))
+        for key in COMMAND_FIELDS:
+            self.fields[key] = command[key]
+        for filter_type in protocol.FILTER_RESET_HOURS:
+            if command[f"{filter_type}_reset"]:
+                self.fields[f"{filter_type}_hours"] = command[f"{filter_type}_hours"]
+        self.commands += 1
+
+    def status_payload(self) -> bytes:
+        contents = protocol.build_packet(protocol.STATUS_HEADER_HEX, self.fields)
+        return json.dumps({"type": "STATUS", "contents": contents}).encode()
+
+
+def create_devices(count: int, prefix: str, seed: int) -> list[EmulatedDevice]:
+    rng = random.Random(seed)
+    if count == 1:
+        return [EmulatedDevice(prefix, rng)]
+    return [EmulatedDevice(f"{prefix}-{index:04d}", rng) for index in range(count)]
+
+
+def run_mqtt(args):
+    """로컬 브로커에 접속해 기기들을 에뮬레이션"""
+    import paho.mqtt.client as mqtt
+
+    devices = create_devices(args.devices, args.device_prefix, args.seed)
+    by_command_topic = {device.command_topic: device for device in devices}
+    lock = threading.Lock()
+    stats = {"published": 0, "commands": 0}
+
+    client = mqtt.Client()
+    if args.tls:
+        context = ssl.create_default_context()
+        context.check_hostname = False
+        context.verify_mode = ssl.CERT_NONE
+        client.tls_set_context(context)
+
+    def on_connect(client, userdata, flags, rc):
+        print(f"연결됨 (rc={rc}), 기기 {len(devices)}대 구독")
+        client.subscribe([(topic, 1) for topic in by_command_topic])
+
+    def on_message(client, userdata, msg):
+        device = by_command_topic.get(msg.topic)
+        if device is None:
+            return
+        try:
+            payload = json.loads(msg.payload)
+        except ValueError:
+            return
+        if payload.get("type") != "CMD":
+            return
+        with lock:
+            device.apply_command(payload["contents"])
+            stats["commands"] += 1
+            # 기기처럼 바뀐 상태를 바로 다시 발행
+            client.publish(device.status_topic, device.status_payload(), qos=1)
+            stats["published"] += 1
+
+    client.on_connect = on_connect
+    client.on_message = on_message
+    client.connect(args.host, args.port, 60)
+    client.loop_start()
+
+    interval = 1 / args.rate
+    started = time.monotonic()
+    next_report = started + 5
+    published_before = 0
+    try:
+        while not args.duration or time.monotonic() - started < args.duration:
+            cycle = time.monotonic()
+            for device in devices:
+                with lock:
+                    device.drift()
+                    client.publish(device.status_topic, device.status_payload(), qos=args.qos)
+                    stats["published"] += 1
+            now = time.monotonic()
+            if now >= next_report:
+                rate = (stats["published"] - published_before) / (now - next_report + 5)
+                print(f"발행 {stats['published']} ({rate:,.0f}/s), CMD 적용 {stats['commands']}")
+                published_before = stats["published"]
+                next_report = now + 5
+            time.sleep(max(0.0, interval - (time.monotonic() - cycle)))
+    except KeyboardInterrupt:
+        pass
+    finally:
+        client.loop_stop()
+        client.disconnect()
+    print(f"종료 - 발행 {stats['published']}, CMD 적용 {stats['commands']}")
+
+
+class LoopbackConnection:
+    """통합구성요소의 PurethinkConnection 대신 에뮬레이터 기기로 바로 전달하는 연결"""
+
+    def __init__(self, loop, devices: dict[str, EmulatedDevice], deliver):
+        self._loop = loop
+        self._by_command_topic = {device.command_topic: device for device in devices.values()}
+        self._deliver = deliver
+        self.published = 0
+
+    def publish(self, topic: str, payload: str, qos: int = 1):
+        self.published += 1
+        device = self._by_command_topic[topic]
+        device.apply_command(json.loads(payload)["contents"])
+        # 브로커 왕복 대신 다음 루프 턴에 기기 상태를 되돌려 줌
+        self._loop.call_soon(self._deliver, device)
+
+
+async def run_in_process(args, hass=None) -> dict:
+    """에뮬레이터 기기를 on_message 와 명령 경로에 직접 연결해 처리량/지연 측정
+
+    hass 를 주지 않으면 임시 설정 디렉터리로 HomeAssistant 인스턴스를 만들어 쓰고 끝나면 멈춘다.
+    (디스패처/타이머가 이벤트 루프 스레드 확인을 하므로 실제 HomeAssistant 가 필요)
+    """
+    sys.path.insert(0, str(ROOT))
+    try:
+        from homeassistant.core import HomeAssistant
+
+        from custom_components import purethink
+        from custom_components.purethink.const import DATA_CONNECTION, DOMAIN
+        from custom_components.purethink.device import DeviceRegistry, PurethinkDevice, async_send_command
+    except ImportError as e:
+        sys.exit(f"in-process 모드는 Home Assistant 가 필요합니다: {e}")
+
+    loop = asyncio.get_running_loop()
+    config_dir = None
+    if hass is None:
+        config_dir = tempfile.TemporaryDirectory(prefix="purethink_emulator_")
+        hass = HomeAssistant(config_dir.name)
+    registry = hass.data.setdefault(DOMAIN, DeviceRegistry())
+    emulated = {f"emulator_{device.device_id}": device
+                for device in create_devices(args.devices, args.device_prefix, args.seed)}
+    for entry_id, device in emulated.items():
+        registry.add(PurethinkDevice(hass, entry_id, device.device_id, device.device_id,
+                                     args.command_window / 1000, True))
+    entry_by_device = {device.device_id: entry_id for entry_id, device in emulated.items()}
+
+    stats = {"messages": 0, "handler_time": 0.0}
+
+    def deliver(device: EmulatedDevice):
+        msg = SimpleNamespace(topic=device.status_topic, payload=device.status_payload())
+        started = time.perf_counter()
+        purethink.on_message(hass, entry_by_device[device.device_id], msg)
+        stats["handler_time"] += time.perf_counter() - started
+        stats["messages"] += 1
+
+    connection = LoopbackConnection(loop, emulated, deliver)
+    hass.data[DATA_CONNECTION] = connection
+
+    rng = random.Random(args.seed)
+    entry_ids = list(emulated)
+    commands = [{"fan_speed": speed} for speed in range(1, 6)] + [
+        {"mode": "Auto"}, {"mode": "Manual"}, {"mode": "Sleep 1"},
+        {"pressure_mode": "양압"}, {"pressure_mode": "정압"}, {"fan_mode": "흡/배기"}, {"fan_mode": "배기"},
+    ]
+
+    interval = 1 / args.rate
+    started = time.monotonic()
+    command_budget = 0.0
+    sent = 0
+    try:
+        while time.monotonic() - started < args.duration:
+            cycle = time.monotonic()
+            for device in emulated.values():
+                device.drift()
+                deliver(device)
+
+            command_budget += args.command_rate * interval
+            while command_budget >= 1:
+                command_budget -= 1
+                async_send_command(hass, rng.choice(entry_ids), **rng.choice(commands))
+                sent += 1
+            await asyncio.sleep(max(0.0, interval - (time.monotonic() - cycle)))
+
+        # 남은 명령 병합 창과 확인이 끝나도록 잠시 대기
+        await asyncio.sleep(args.command_window / 1000 + 0.5)
+        elapsed = time.monotonic() - started
+
+        latency = [device.tracker.p95 for device in registry if device.tracker.p95 is not None]
+        return {
+            "devices": len(emulated),
+            "elapsed": elapsed,
+            "messages": stats["messages"],
+            "handler_time": stats["handler_time"],
+            "parsed": sum(device.metrics.parsed for device in registry),
+            "rejected": sum(device.metrics.rejected for device in registry),
+            "sent": sent,
+            "published": connection.published,
+            "confirmed": sum(device.tracker.confirmed for device in registry),
+            "failed": sum(device.tracker.failed for device in registry),
+            "in_flight": sum(device.tracker.in_flight for device in registry),
+            "p95": max(latency) if latency else None,
+        }
+    finally:
+        for device in registry:
+            device.commands.async_cancel()
+            device.tracker.async_cancel()
+        hass.data.pop(DATA_CONNECTION, None)
+        hass.data.pop(DOMAIN, None)
+        if config_dir is not None:
+            await hass.async_stop(force=True)
+            config_dir.cleanup()
+
+
+def print_in_process(result: dict):
+    elapsed = result["elapsed"]
+    messages = result["messages"]
+    print(f"기기 {result['devices']}대, {elapsed:.1f}s")
+    print(f"상태 메시지 {messages} ({messages / elapsed:,.0f}/s), 디코드 {result['parsed']}, 거부 {result['rejected']}, "
+          f"on_message 평균 {result['handler_time'] / max(1, messages) * 1e6:.1f} us, "
+          f"루프 점유율 {result['handler_time'] / elapsed:.1%}")
+    print(f"명령 요청 {result['sent']}, CMD 발행 {result['published']}, 반영 확인 {result['confirmed']}, "
+          f"실패 {result['failed']}, 대기 {result['in_flight']}")
+    if result["p95"] is not None:
+        print(f"기기별 명령 왕복 p95 최대 {result['p95'] * 1000:.0f} ms")
+
+
+def main():
+    common = argparse.ArgumentParser(add_help=False)
+    common.add_argument("--devices", type=int, default=1, help="에뮬레이션할 기기 수")
+    common.add_argument("--device-prefix", default="DIV01-EMU", help="device_id (여러 대면 뒤에 번호가 붙음)")
+    common.add_argument("--rate", type=float, default=0.2, help="기기당 상태 발행 주기 (Hz)")
+    common.add_argument("--duration", type=float, default=0, help="실행 시간 (초, 0 이면 계속)")
+    common.add_argument("--seed", type=int, default=0)
+
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    sub = parser.add_subparsers(dest="mode", required=True)
+
+    mqtt_parser = sub.add_parser("mqtt", parents=[common], help="로컬 브로커에 접속")
+    mqtt_parser.add_argument("--host", default="127.0.0.1")
+    mqtt_parser.add_argument("--port", type=int, default=1883)
+    mqtt_parser.add_argument("--tls", action="store_true", help="TLS 사용 (인증서 검증 안 함)")
+    mqtt_parser.add_argument("--qos", type=int, default=0, choices=(0, 1), help="주기 상태 발행 QoS")
+
+    process_parser = sub.add_parser("in-process", parents=[common], help="브로커 없이 통합구성요소 처리 경로에 직접 연결")
+    process_parser.add_argument("--command-rate", type=float, default=10, help="초당 명령 수 (전체)")
+    process_parser.add_argument("--command-window", type=float, default=150, help="명령 병합 창 (ms)")
+
+    args = parser.parse_args()
+    if args.mode == "mqtt":
+        run_mqtt(args)
+    else:
+        if not args.duration:
+            args.duration = 10
+        print_in_process(asyncio.run(run_in_process(args)))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,63 @@
+"""패킷 캡처 파일 읽기 (<config>/purethink_capture/capture.bin*)
+
+    python .test/read_capture.py capture.bin                                  # 파일 정보와 기기별 패킷 수
+    python .test/read_capture.py capture.bin --dump --device DIV01-AB1234     # 시각, 기기, contents hex
+    python .test/read_capture.py capture.bin --contents --since "2025-05-01 12:00" --until "2025-05-01 13:00"
+
+--contents 출력은 한 줄에 contents hex 하나이므로 decode_log.py 입력이나 pytest tests/test_benchmark.py --corpus 파일로 바로 쓸 수 있다.
+파일은 mmap 으로 열고 시각 구간은 이진 탐색으로 찾으므로 큰 파일도 필요한 구간만 읽는다.
+"""
+import argparse
+import sys
+from collections import Counter
+from datetime import datetime
+from pathlib import Path
+
+from standalone import load_module
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("file", type=Path)
+    parser.add_argument("--device", help="device_id 또는 캡처 기기 번호")
+    parser.add_argument("--since", type=datetime.fromisoformat, help="시작 시각 (로컬, ISO 형식)")
+    parser.add_argument("--until", type=datetime.fromisoformat, help="끝 시각 (로컬, ISO 형식, 제외)")
+    output = parser.add_mutually_exclusive_group()
+    output.add_argument("--dump", action="store_true", help="레코드 출력 (시각, 기기, contents)")
+    output.add_argument("--contents", action="store_true", help="contents hex 만 출력")
+    args = parser.parse_args()
+
+    capture = load_module("capture")
+    with capture.CaptureReader(args.file) as reader:
+        device = None
+        if args.device is not None:
+            by_id = {device_id: index for index, device_id in reader.devices.items()}
+            device = by_id.get(args.device)
+            if device is None:
+                if not args.device.isdigit():
+                    sys.exit(f"캡처에 없는 기기: {args.device}")
+                device = int(args.device)
+        start = args.since.timestamp() if args.since else None
+        end = args.until.timestamp() if args.until else None
+        records = reader.records(start, end, device)
+
+        if args.dump or args.contents:
+            for timestamp, index, packet in records:
+                if args.contents:
+                    print(packet.hex().upper())
+                    continue
+                when = datetime.fromtimestamp(reader.wall_time(timestamp)).isoformat(timespec="milliseconds")
+                print(f"{when} {reader.devices.get(index, index)} {packet.hex().upper()}")
+            return
+
+        print(f"레코드 {len(reader):,}개, 시작 {datetime.fromtimestamp(reader.wall_start / 1e9).isoformat()}")
+        if len(reader):
+            last = datetime.fromtimestamp(reader.wall_time(reader.timestamp(len(reader) - 1)))
+            print(f"마지막 레코드 {last.isoformat(timespec='milliseconds')}")
+        counts = Counter(index for _, index, _ in records)
+        for index, count in sorted(counts.items()):
+            print(f"  [{index}] {reader.devices.get(index, '?'):<24} {count:>10,}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,23 @@
+"""개발 도구 공통 - 통합구성요소 모듈을 패키지 __init__(Home Assistant 의존) 없이 단독 로드
+
+    from standalone import load_module
+    protocol = load_module("protocol")
+"""
+import importlib.util
+import sys
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+COMPONENT = ROOT / "custom_components" / "purethink"
+
+
+def load_module(name: str):
+    """custom_components/purethink/<name>.py 만 로드 (같은 모듈은 한 번만)"""
+    module_name = f"purethink_{name}"
+    module = sys.modules.get(module_name)
+    if module is None:
+        spec = importlib.util.spec_from_file_location(module_name, COMPONENT / f"{name}.py")
+        module = importlib.util.module_from_spec(spec)
+        sys.modules[module_name] = module
+        spec.loader.exec_module(module)
+    return module
@@ -1,148 +1,269 @@
 import json
 import logging
-import ssl
+import time
+from functools import partial
 
-import paho.mqtt.client as mqtt
+import voluptuous as vol
 from homeassistant.config_entries import ConfigEntry
-from homeassistant.core import HomeAssistant
-from homeassistant.helpers.dispatcher import async_dispatcher_send
-
-from .const import DOMAIN
-from .protocol import parse_status_packet, generate_command
+from homeassistant.core import HomeAssistant, callback
+from homeassistant.exceptions import HomeAssistantError
+from homeassistant.helpers import config_validation as cv
+from homeassistant.helpers.typing import ConfigType
+
+from .api import PurethinkMetricsView
+from .connection import PurethinkConnection, get_connection
+from .availability import AvailabilityWatchdog
+from .capture import PacketCapture
+from .const import CONF_CAPTURE, CONF_COMMAND_WINDOW, CONF_OPTIMISTIC, CONF_STALE_TIMEOUT, DATA_CAPTURE, \
+    DATA_CONNECTION, DATA_LAST_STATE, DATA_RESTORE, DATA_WATCHDOG, DEFAULT_CAPTURE, DEFAULT_COMMAND_WINDOW, \
+    DEFAULT_OPTIMISTIC, DEFAULT_STALE_TIMEOUT, DOMAIN, STATUS_REQUEST_MAX_AGE
+from .device import DeviceRegistry, PurethinkDevice
+from .protocol import FILTER_RESET_HOURS, PRESET_MODES, PRESSURE_MODE_VALUES, decode_state, generate_command, \
+    state_command
+from .restore import RestoreStore, get_restore_store
+from .state import async_refresh_state
 
 _LOGGER = logging.getLogger(__name__)
 
-# MQTT Broker 정보
-MQTT_BROKER = "dapt.iptime.org"
-MQTT_PORT = 8885
-
-context = ssl.create_default_context()
-context.check_hostname = False  # ✅ 호스트 이름 검증 비활성화
-context.verify_mode = ssl.CERT_NONE  # ✅ 인증서 검증 비활성화
-
-# MQTT 클라이언트 초기화
-mqtt_client = mqtt.Client()
-mqtt_client.enable_logger(_LOGGER)
-
-
-def on_connect(client, userdata, flags, rc):
-    """MQTT 연결 시 실행"""
-    if rc == 0:
-        _LOGGER.debug(f"[MQTT] 연결 성공 {userdata}")
-        client.subscribe(userdata["status_topic"])
-    else:
-        _LOGGER.error(f"[MQTT] 연결 실패 (코드 {rc})")
-
-
-def on_message(client, userdata, msg):
-    """MQTT 메시지 수신 핸들러"""
-    _LOGGER.debug(f"[MQTT] 메시지 수신: {msg.topic} - {msg.payload}")
+PLATFORMS = ["sensor", "switch", "select", "binary_sensor", "fan"]
+
+CONFIG_SCHEMA = cv.config_entry_only_config_schema(DOMAIN)
+
+# set_state 서비스 - 지정한 필드만 바꾼 CMD 패킷 하나를 기기마다 한 번 전송
+STATE_FIELDS = ("power", "preset", "fan_speed", "pressure_mode", "fan_in", "fan_out", "filter_reset")
+SET_STATE_SCHEMA = vol.All(
+    vol.Schema({
+        vol.Optional("device_id"): vol.All(cv.ensure_list, [cv.string]),
+        vol.Optional("power"): cv.boolean,
+        vol.Optional("preset"): vol.In(PRESET_MODES),
+        vol.Optional("fan_speed"): vol.All(vol.Coerce(int), vol.Range(min=0, max=5)),
+        vol.Optional("pressure_mode"): vol.In(list(PRESSURE_MODE_VALUES)),
+        vol.Optional("fan_in"): cv.boolean,
+        vol.Optional("fan_out"): cv.boolean,
+        vol.Optional("filter_reset"): vol.In(list(FILTER_RESET_HOURS)),
+    }),
+    cv.has_at_least_one_key(*STATE_FIELDS),
+)
+
+
+def on_message(hass: HomeAssistant, entry_id: str, msg):
+    """MQTT 메시지 수신 핸들러 (연결 관리자가 Entry별로 라우팅)"""
+    device = hass.data[DOMAIN].by_entry_id[entry_id]
+    metrics = device.metrics
+    metrics.received += 1
+    _LOGGER.debug("[MQTT] 메시지 수신: %s - %s", msg.topic, msg.payload)
+
+    # 직전에 반영한 메시지와 바이트 단위로 같으면 JSON 파싱부터 생략
+    if msg.payload == device.last_payload:
+        if device.capture is not None:
+            device.capture.append(device.capture_index, device.last_contents)
+        _handle_duplicate(hass, device)
+        return
 
     try:
+        started = time.perf_counter()
         payload = msg.payload.decode("utf-8")
         payload_json = json.loads(payload)
 
+        # 되돌아온 CMD는 요청 값이 담긴 명령일 뿐 기기 상태가 아님 (측정값도 0) - 반영 확인/캡처에 쓰지 않음
+        # (바이트 비교 경로는 상태 메시지로 받아들인 페이로드와만 비교하므로 여기서 걸러도 충분)
+        if payload_json.get("type") == "CMD":
+            _LOGGER.debug("[MQTT] CMD 메시지 무시: %s", msg.topic)
+            return
+
         if "contents" not in payload_json:
-            _LOGGER.warning(f"[MQTT] 잘못된 메시지 형식 (contents 없음): {payload_json}")
+            metrics.rejected += 1
+            _LOGGER.warning("[MQTT] 잘못된 메시지 형식 (contents 없음): %s", payload_json)
             return
 
         payload_hex = payload_json["contents"]
 
         if not payload_hex.startswith("A8A81721") and not payload_hex.startswith("A8A81722"):
-            _LOGGER.warning(f"[MQTT] 잘못된 패킷 시작: {payload_hex}")
+            metrics.rejected += 1
+            _LOGGER.warning("[MQTT] 잘못된 패킷 시작: %s", payload_hex)
             return
 
-        parsed = parse_status_packet(payload_hex)
+        if device.capture is not None:
+            device.capture.append(device.capture_index, payload_hex)
 
-        if not parsed:
-            _LOGGER.error(f"[MQTT] 상태 패킷 파싱 실패: {payload_hex}")
+        # 봉투(JSON)만 다르고 contents가 같으면 디코드/알림 생략
+        if payload_hex == device.last_contents:
+            device.last_payload = msg.payload
+            _handle_duplicate(hass, device)
             return
 
-        _LOGGER.debug(f"[MQTT] 상태 패킷 파싱 성공: {parsed}")
-
-        full_state = {
-            **parsed,
-            "prefilter_hours": parsed.get("prefilter", {}).get("hours", 0),
-            "prefilter_reset": parsed.get("prefilter", {}).get("reset_flag", 0),
-            "hepafilter_hours": parsed.get("hepafilter", {}).get("hours", 0),
-            "hepafilter_reset": parsed.get("hepafilter", {}).get("reset_flag", 0)
-        }
-
-        userdata["hass"].data[DOMAIN][userdata["entry_id"]]["state"] = full_state
-
-        # ✅ 메인 이벤트 루프에서 실행되도록 수정
-        hass = userdata["hass"]
-        hass.loop.call_soon_threadsafe(
-            async_dispatcher_send,
-            hass,
-            f"{DOMAIN}_state_update_{userdata['entry_id']}"
-        )
+        device_state = decode_state(payload_hex)
+        decoded = time.perf_counter()
+        metrics.decode_time.observe(decoded - started)
+        metrics.parsed += 1
+        device.last_payload = msg.payload
+        device.last_contents = payload_hex
+        device.last_seen = time.monotonic()
+        if metrics.first_state is None:
+            metrics.first_state = device.last_seen - device.setup_at
+            _LOGGER.info("[Setup] %s 첫 상태 수신까지 %.1f초 (상태 요청 %d회)",
+                         device.device_id, metrics.first_state, metrics.status_requests)
+        device.history.add(device.last_seen, device_state)
+        if not device.available:
+            # 첫 패킷 또는 끊겼다 복구 - 표시 상태를 비워 모든 필드를 다시 알림 (엔티티가 가용 상태 기록)
+            device.available = True
+            device.state = None
+
+        # 명령 반영 확인(낙관적 상태 정리) 후 이전 상태와 비교해 값이 바뀐 필드만 엔티티에 전달
+        device.device_state = device_state
+        device.tracker.async_process_state(device_state)
+
+        # 연결 관리자의 소켓 콜백이 이벤트 루프에서 호출하므로 바로 전달
+        changed = async_refresh_state(hass, device)
+        metrics.dispatch_time.observe(time.perf_counter() - decoded)
+        if not changed:
+            _LOGGER.debug("[MQTT] 상태 변경 없음: %s", msg.topic)
+            return
 
-        _LOGGER.debug(f"[MQTT] 상태 업데이트: {full_state}")
-        _LOGGER.debug(f"[MQTT] 상태 업데이트 토픽: {userdata['status_topic']}")
-        _LOGGER.debug(f"[MQTT] HASS 데이터: {hass.data[DOMAIN][userdata['entry_id']]}")
+        metrics.dispatched += 1
+        _LOGGER.debug("[MQTT] 상태 업데이트 (%s): %s", msg.topic, changed)
 
     except Exception as e:
-        _LOGGER.error(f"[MQTT] 메시지 처리 실패: {e}", exc_info=True)
+        metrics.rejected += 1
+        _LOGGER.error("[MQTT] 메시지 처리 실패: %s", e, exc_info=True)
+
+
+def _handle_duplicate(hass: HomeAssistant, device: PurethinkDevice):
+    """중복 상태 메시지 - 디코드/알림 없이 수신 시각 갱신"""
+    device.last_seen = time.monotonic()
+    device.metrics.duplicates += 1
+    # 이동 통계의 샘플 수가 수신한 상태 패킷 수와 맞도록 중복도 같은 값으로 기록
+    device.history.add(device.last_seen, device.device_state)
+    if not device.available:
+        # 같은 패킷이라도 수신이 복구된 것이므로 모든 필드를 다시 알림
+        device.available = True
+        device.state = None
+        async_refresh_state(hass, device)
+    # 보낸 명령이 이미 현재 상태와 같은 값이면 새 패킷이 오지 않으므로 현재 상태로 반영 확인
+    if device.tracker.in_flight:
+        device.tracker.async_process_state(device.device_state)
+        async_refresh_state(hass, device)
+
+
+@callback
+def _async_resync(hass: HomeAssistant, disconnected_at: float | None) -> list[str]:
+    """브로커 연결/재연결 후 - 끊긴 동안 놓친 상태가 중복 패킷으로 걸러지지 않도록 기기별 중복 판별 기록 초기화
+
+    끊기기 직전까지 상태를 보내던 (가용성 기준 시간 안에 수신한) 기기의 Entry 목록을 반환 - 연결 관리자는
+    이 기기들의 상태를 모두 다시 받으면 복구 시간을 기록한다. 꺼져 있던 기기를 기다리면 복구가 끝나지 않는다.
+    """
+    now = time.monotonic()
+    receiving = []
+    for device in hass.data.get(DOMAIN, ()):
+        device.last_payload = None
+        device.last_contents = None
+        _async_request_status(hass, device, now)
+        if device.last_seen is not None and disconnected_at is not None \
+                and disconnected_at - device.last_seen <= (device.stale_timeout or DEFAULT_STALE_TIMEOUT):
+            receiving.append(device.entry_id)
+    return receiving
+
+
+@callback
+def _async_request_status(hass: HomeAssistant, device: PurethinkDevice, now: float):
+    """재연결/다시 로드 직후 - 알고 있는 상태를 그대로 담은 CMD로 다음 주기 보고 전에 상태 패킷을 받음
+
+    별도의 읽기 전용 상태 요청 메시지가 없어 기기에 상태를 다시 쓰는 방식이므로, 직전까지 받던 상태
+    (이 Entry 가 받은 상태, 없으면 다시 로드하기 전 Entry 가 메모리에 남긴 상태) 가 있을 때만 보낸다.
+    그 상태가 STATUS_REQUEST_MAX_AGE 보다 오래됐거나 (그 사이 리모컨 등으로 바뀌었을 수 있음) 낙관적 표시/반영
+    확인 대기 중인 명령이 있으면 보내지 않고 기기의 주기 보고를 기다린다. HA 재시작 직후에는 상태가 없어 보내지 않는다.
+    """
+    state, last_seen = device.device_state, device.last_seen
+    if state is None and device.previous_state is not None:
+        state, last_seen = device.previous_state
+    if state is None or last_seen is None or now - last_seen > STATUS_REQUEST_MAX_AGE:
+        return
+    if device.optimistic or device.tracker.in_flight:
+        return
+    get_connection(hass).publish(device.command_topic, generate_command(state), qos=1)
+    device.metrics.commands_sent += 1
+    device.metrics.status_requests += 1
+    _LOGGER.debug("[MQTT] %s 상태 요청 전송", device.device_id)
+
+
+def _resolve_service_device(hass: HomeAssistant, device_id: str | None) -> PurethinkDevice:
+    """서비스 대상 기기 조회 (device_id 생략은 기기가 하나일 때만 허용)"""
+    registry: DeviceRegistry = hass.data[DOMAIN]
+    if device_id:
+        device = registry.by_device_id.get(device_id.strip())
+        if device is None:
+            raise HomeAssistantError(f"등록되지 않은 기기: {device_id}")
+        return device
+
+    if len(registry) != 1:
+        raise HomeAssistantError("기기가 여러 대이면 device_id를 지정해야 합니다")
+    return next(iter(registry))
+
+
+async def async_setup(hass: HomeAssistant, config: ConfigType) -> bool:
+    """통합구성요소 로드 시 한 번 - 전원 복원 정보 로드, 메트릭 엔드포인트(/api/purethink/metrics) 등록"""
+    restore = RestoreStore(hass)
+    await restore.async_load()
+    hass.data[DATA_RESTORE] = restore
+
+    hass.http.register_view(PurethinkMetricsView(hass))
+    return True
 
 
 async def async_setup_entry(hass: HomeAssistant, entry: ConfigEntry) -> bool:
     """Config Entry 설정"""
+    setup_started = time.monotonic()
     _LOGGER.debug(f"Initializing entry: {entry.data}")
     config = entry.data
     device_id = config["device_id"]
 
-    # MQTT 토픽 설정
-    base_topic = f"/things/{device_id}"
-    status_topic = f"{base_topic}/#"
-    command_topic = f"{base_topic}/shadow"
-
-    # 상태 저장소 초기화
-    hass.data.setdefault(DOMAIN, {})
-    hass.data[DOMAIN][entry.entry_id] = {
-        "state": {},
-        "status_topic": status_topic,
-        "command_topic": command_topic
-    }
-    hass.data[DOMAIN][device_id] = {
-        "state": {},
-        "status_topic": status_topic,
-        "command_topic": command_topic
-    }
-
-    # MQTT 클라이언트 설정
-    mqtt_client.user_data_set({
-        "hass": hass,
-        "entry_id": entry.entry_id,
-        "status_topic": status_topic
-    })
-    mqtt_client.on_connect = on_connect
-    mqtt_client.on_message = on_message
-
-    # TLS 설정 (인증서 검증 비활성화)
-    try:
-        mqtt_client.tls_set_context(context)
-    except Exception as e:
-        _LOGGER.error(f"[MQTT] TLS 설정 오류: {e}", exc_info=True)
-        return False
+    # 기기 런타임 데이터 등록 (device_id, entry_id 양쪽으로 조회)
+    registry = hass.data.setdefault(DOMAIN, DeviceRegistry())
+    device = PurethinkDevice(
+        hass, entry.entry_id, device_id, config["friendly_name"],
+        entry.options.get(CONF_COMMAND_WINDOW, DEFAULT_COMMAND_WINDOW) / 1000,
+        entry.options.get(CONF_OPTIMISTIC, DEFAULT_OPTIMISTIC),
+        entry.options.get(CONF_STALE_TIMEOUT, DEFAULT_STALE_TIMEOUT)
+    )
+    # 재시작 전 전원을 끌 때 저장한 모드/팬 속도 복원
+    get_restore_store(hass).async_restore(device)
+
+    # 패킷 캡처 (공유 기록기는 처음 켠 Entry 설정 시 생성)
+    if entry.options.get(CONF_CAPTURE, DEFAULT_CAPTURE):
+        capture = hass.data.get(DATA_CAPTURE)
+        if capture is None:
+            capture = PacketCapture(hass, hass.config.path(f"{DOMAIN}_capture"))
+            await capture.async_open()
+            hass.data[DATA_CAPTURE] = capture
+        device.capture_index = await capture.async_attach(device_id)
+        device.capture = capture
+
+    registry.add(device)
+
+    # 공유 MQTT 연결 (첫 Entry 설정 시 생성)
+    connection = hass.data.get(DATA_CONNECTION)
+    if connection is None:
+        connection = hass.data[DATA_CONNECTION] = PurethinkConnection(
+            hass, partial(on_message, hass), partial(_async_resync, hass)
+        )
 
-    # MQTT 연결
-    try:
-        mqtt_client.connect(MQTT_BROKER, MQTT_PORT, 120)  # ✅ 동기 연결
-        mqtt_client.loop_start()
-        _LOGGER.debug(f"[MQTT] 연결 시도: {MQTT_BROKER}:{MQTT_PORT}")
-    except Exception as e:
-        _LOGGER.error(f"[MQTT] 연결 실패: {e}", exc_info=True)
-        return False
+        # paho 클라이언트/TLS 컨텍스트 생성과 브로커 연결은 백그라운드에서 진행 (HA 부팅을 막지 않음)
+        hass.async_create_background_task(connection.async_connect(), f"{DOMAIN}_mqtt_connect")
+
+        # 모든 기기의 가용성을 점검하는 공유 타이머
+        watchdog = hass.data[DATA_WATCHDOG] = AvailabilityWatchdog(hass, registry)
+        watchdog.async_start()
+
+    # 다시 로드한 경우 이전 Entry 가 받던 상태로 상태 요청 (연결 중이면 바로, 아니면 연결 직후)
+    device.previous_state = hass.data.get(DATA_LAST_STATE, {}).pop(device_id, None)
+    connection.add_device(device_id, entry.entry_id)
+    if connection.connected:
+        _async_request_status(hass, device, time.monotonic())
 
-    hass.data[DOMAIN][entry.entry_id]["device"] = {
-        "identifiers": {(DOMAIN, config["device_id"])},
-        "name": config["friendly_name"],
-        "manufacturer": "Purethink",
-        "model": "Air Ventilator",
-    }
+    await hass.config_entries.async_forward_entry_setups(entry, PLATFORMS)
 
-    await hass.config_entries.async_forward_entry_setups(entry, ["sensor", "switch", "select", "binary_sensor", "fan"])
+    # 옵션 변경 시 Entry 다시 로드
+    entry.async_on_unload(entry.add_update_listener(async_reload_entry))
 
     # 필터 리셋
     async def handle_reset_filter(call):
@@ -150,20 +271,13 @@ async def async_setup_entry(hass: HomeAssistant, entry: ConfigEntry) -> bool:
             filter_type = call.data.get("filter_type", "").strip().lower()
             _LOGGER.debug(f"[Service] 필터 리셋 요청: filter_type={filter_type}")
 
-            entry_id, entry_data = next(
-                (k, v) for k, v in hass.data[DOMAIN].items()
-                if isinstance(v, dict) and "state" in v and "command_topic" in v
-            )
+            if filter_type not in FILTER_RESET_HOURS:
+                _LOGGER.error(f"[Service] 필터 리셋 명령 생성 실패: 알 수 없는 필터 {filter_type}")
+                return
 
-            device_id = entry_data["command_topic"].split("/")[2]
-            command_topic = entry_data["command_topic"]
-
-            payload = generate_command(device_id, hass, filter_reset=filter_type)
-            if payload:
-                mqtt_client.publish(command_topic, payload, qos=1)
-                _LOGGER.debug(f"[Service] 필터 리셋 명령 전송 ▶ {payload}")
-            else:
-                _LOGGER.error(f"[Service] 필터 리셋 명령 생성 실패")
+            target = _resolve_service_device(hass, call.data.get("device_id"))
+            target.commands.async_send(filter_reset=filter_type)
+            _LOGGER.debug(f"[Service] 필터 리셋 명령 요청 ▶ {target.device_id}")
 
         except Exception as e:
             _LOGGER.error(f"[Service] 필터 리셋 처리 중 오류 발생: {e}", exc_info=True)
@@ -171,4 +285,62 @@ async def async_setup_entry(hass: HomeAssistant, entry: ConfigEntry) -> bool:
 
     hass.services.async_register(DOMAIN, "reset_filter", handle_reset_filter)
 
+    # 여러 필드 동시 변경 (기기마다 CMD 패킷 하나)
+    async def handle_set_state(call):
+        command = state_command(**{key: call.data[key] for key in STATE_FIELDS if key in call.data})
+        # 대상 기기를 모두 확인한 뒤 전송 (일부만 바뀌는 일 방지)
+        targets = [_resolve_service_device(hass, target_id) for target_id in call.data.get("device_id") or [None]]
+        for target in targets:
+            target.commands.async_send(**command)
+        _LOGGER.debug("[Service] 상태 변경 요청 ▶ %s: %s", [target.device_id for target in targets], command)
+
+    hass.services.async_register(DOMAIN, "set_state", handle_set_state, schema=SET_STATE_SCHEMA)
+
+    _LOGGER.debug(f"[Setup] {device_id} 설정 소요 시간: {(time.monotonic() - setup_started) * 1000:.1f}ms")
+    return True
+
+
+async def async_unload_entry(hass: HomeAssistant, entry: ConfigEntry) -> bool:
+    """Config Entry 해제"""
+    unload_ok = await hass.config_entries.async_unload_platforms(entry, PLATFORMS)
+    if not unload_ok:
+        return False
+
+    device_id = entry.data["device_id"]
+    device = hass.data[DOMAIN].remove(entry.entry_id)
+    if device is not None:
+        # 다시 로드할 때 바로 상태를 요청하도록 마지막 상태 보관 (확인 대기 중인 명령이 있으면 기기 값이 바뀌는 중이므로 제외)
+        if device.device_state is not None and not device.optimistic and not device.tracker.in_flight:
+            hass.data.setdefault(DATA_LAST_STATE, {})[device_id] = (device.device_state, device.last_seen)
+        device.commands.async_cancel()
+        device.tracker.async_cancel()
+        if device.capture is not None:
+            device.capture.detach(device_id)
+            if not device.capture.attached:
+                hass.data.pop(DATA_CAPTURE)
+                await device.capture.async_close()
+
+    connection = hass.data.get(DATA_CONNECTION)
+    if connection is not None:
+        connection.remove_device(device_id)
+        if not connection.has_devices:
+            await connection.async_disconnect()
+            hass.data.pop(DATA_CONNECTION)
+            hass.data.pop(DATA_WATCHDOG).async_stop()
+            hass.services.async_remove(DOMAIN, "reset_filter")
+            hass.services.async_remove(DOMAIN, "set_state")
+
     return True
+
+
+async def async_remove_entry(hass: HomeAssistant, entry: ConfigEntry) -> None:
+    """Config Entry 삭제 시 저장된 복원 정보 제거"""
+    hass.data.get(DATA_LAST_STATE, {}).pop(entry.data["device_id"], None)
+    restore = hass.data.get(DATA_RESTORE)
+    if restore is not None:
+        restore.async_forget(entry.data["device_id"])
+
+
+async def async_reload_entry(hass: HomeAssistant, entry: ConfigEntry) -> None:
+    """옵션 변경 시 Entry 재시작"""
+    await hass.config_entries.async_reload(entry.entry_id)
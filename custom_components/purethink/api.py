@@ -0,0 +1,24 @@
+from aiohttp import web
+from homeassistant.components.http import HomeAssistantView
+from homeassistant.core import HomeAssistant
+
+from .const import DATA_CONNECTION, DOMAIN
+from .metrics import render_prometheus
+
+
+class PurethinkMetricsView(HomeAssistantView):
+    """Prometheus 텍스트 형식 메트릭 (HA 인증 토큰 필요)"""
+
+    url = "/api/purethink/metrics"
+    name = "api:purethink:metrics"
+    requires_auth = True
+
+    def __init__(self, hass: HomeAssistant):
+        self.hass = hass
+
+    async def get(self, request: web.Request) -> web.Response:
+        text = render_prometheus(self.hass.data.get(DOMAIN, ()), self.hass.data.get(DATA_CONNECTION))
+        return web.Response(
+            body=text.encode("utf-8"),
+            headers={"Content-Type": "text/plain; version=0.0.4; charset=utf-8"},
+        )
@@ -0,0 +1,46 @@
+import logging
+import time
+
+from homeassistant.core import HomeAssistant, callback
+from homeassistant.helpers.dispatcher import async_dispatcher_send
+
+from .const import DOMAIN, STALE_CHECK_INTERVAL
+from .state import ALL_FIELDS
+
+_LOGGER = logging.getLogger(__name__)
+
+
+class AvailabilityWatchdog:
+    """모든 기기를 타이머 하나로 주기적으로 훑어 마지막 수신 후 시간 창이 지난 기기를 사용 불가로 표시
+
+    엔티티/기기별 타이머 없이 주기마다 기기 목록만 한 번 순회하고 (기기당 비교 한 번),
+    다시 패킷이 오면 on_message 에서 바로 사용 가능으로 되돌린다.
+    """
+
+    def __init__(self, hass: HomeAssistant, registry):
+        self.hass = hass
+        self._registry = registry
+        self._timer = None
+
+    @callback
+    def async_start(self):
+        if self._timer is None:
+            self._timer = self.hass.loop.call_later(STALE_CHECK_INTERVAL, self._async_sweep)
+
+    @callback
+    def async_stop(self):
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+
+    @callback
+    def _async_sweep(self):
+        now = time.monotonic()
+        for device in self._registry:
+            if device.available and device.stale_timeout and now - device.last_seen > device.stale_timeout:
+                _LOGGER.warning("[Availability] %s: %d초 동안 상태 패킷 없음 - 사용 불가로 표시",
+                                device.device_id, now - device.last_seen)
+                device.available = False
+                # 모든 엔티티가 사용 불가 상태를 기록하도록 전체 필드 알림
+                async_dispatcher_send(self.hass, f"{DOMAIN}_state_update_{device.entry_id}", ALL_FIELDS)
+        self._timer = self.hass.loop.call_later(STALE_CHECK_INTERVAL, self._async_sweep)
@@ -1,32 +1,35 @@
 import logging
 
 from homeassistant.components.binary_sensor import BinarySensorEntity
+from homeassistant.core import callback
 from homeassistant.helpers.dispatcher import async_dispatcher_connect
 
 from .const import DOMAIN
+from .device import get_device
 
 _LOGGER = logging.getLogger(__name__)
 
 
 async def async_setup_entry(hass, config_entry, async_add_entities):
     """Binary Sensor 플랫폼 설정"""
-    entry_data = hass.data[DOMAIN][config_entry.entry_id]
-    device_info = entry_data["device"]
+    device = get_device(hass, config_entry.entry_id)
     sensors = [
-        PureThinkModeSensor(config_entry, device_info, "Auto", "auto"),
-        PureThinkModeSensor(config_entry, device_info, "Manual", "manual"),
-        PureThinkModeSensor(config_entry, device_info, "Sleep", "sleep"),
+        PureThinkModeSensor(config_entry, device, "Auto", "auto"),
+        PureThinkModeSensor(config_entry, device, "Manual", "manual"),
+        PureThinkModeSensor(config_entry, device, "Sleep", "sleep"),
     ]
     async_add_entities(sensors)
 
 
 class PureThinkModeSensor(BinarySensorEntity):
     """Device Mode에 따라 활성화되는 센서"""
+    _source_fields = frozenset({"power", "ai_mode", "sleep_mode"})
 
-    def __init__(self, entry, device_info, mode_name, entity_id_suffix):
+    def __init__(self, entry, device, mode_name, entity_id_suffix):
         """초기화"""
         self._entry = entry
-        self._device_info = device_info
+        self._device = device
+        self._device_info = device.device_info
         self._mode_name = mode_name
         config = entry.data
         self._attr_unique_id = f"{config['device_id']}_{entity_id_suffix}"
@@ -38,6 +41,11 @@ class PureThinkModeSensor(BinarySensorEntity):
     def device_info(self):
         return self._device_info
 
+    @property
+    def available(self) -> bool:
+        """기기가 최근 상태 패킷을 보냈고 엔티티 값이 있을 때만 사용 가능"""
+        return self._device.available and self._attr_available
+
     @property
     def icon(self):
         if self._mode_name == "Auto":
@@ -58,17 +66,21 @@ class PureThinkModeSensor(BinarySensorEntity):
             )
         )
 
-    def _handle_update(self):
+    @callback
+    def _handle_update(self, changed):
         """현재 모드 확인 후 센서 상태 업데이트"""
-        state = self.hass.data[DOMAIN][self._entry.entry_id]["state"]
+        if not changed & self._source_fields:
+            return
+
+        state = self._device.state
 
-        if state.get("power", 1) == 0:
+        if state.power == 0:
             self._attr_is_on = False
             _LOGGER.debug(f"[BinarySensor] Power가 꺼져 있음 - {self._mode_name} 센서 Off")
         else:
             device_mode = (
-                "Auto" if state.get("ai_mode") == 1 else
-                f"Sleep {state.get('sleep_mode')}" if state.get("sleep_mode") in [1, 2, 3] else
+                "Auto" if state.ai_mode == 1 else
+                f"Sleep {state.sleep_mode}" if state.sleep_mode in [1, 2, 3] else
                 "Manual"
             )
 
@@ -76,4 +88,4 @@ class PureThinkModeSensor(BinarySensorEntity):
 
         self._attr_available = True
         _LOGGER.debug(f"[{self.name}] State updated: is_on={self._attr_is_on}, available={self._attr_available}")
-        self.schedule_update_ha_state()
+        self.async_write_ha_state()
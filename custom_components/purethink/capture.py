@@ -0,0 +1,256 @@
+import json
+import logging
+import mmap
+import os
+import struct
+import time
+from bisect import bisect_left
+from pathlib import Path
+
+try:
+    from homeassistant.core import callback
+except ImportError:  # CaptureReader 를 Home Assistant 없이 단독 로드한 경우 (.test/read_capture.py)
+    def callback(func):
+        return func
+
+_LOGGER = logging.getLogger(__name__)
+
+# 파일 헤더 (매직, 레코드 크기, 파일 시작 시 wall clock ns, 같은 순간의 monotonic ns)
+CAPTURE_MAGIC = b"PTCAP1"
+_HEADER = struct.Struct("<6sHqq")
+# 레코드 (monotonic ns, 기기 번호, 상태 패킷 바이트) - 고정 크기라 시각으로 이진 탐색 가능
+CAPTURE_PACKET_LEN = 23  # protocol.CMD_LENGTH (리더를 Home Assistant 없이 단독 로드하기 위해 직접 정의)
+_RECORD = struct.Struct(f"<qH{CAPTURE_PACKET_LEN}s")
+
+CAPTURE_FILE = "capture.bin"
+CAPTURE_DEVICES_FILE = "devices.json"  # device_id -> 기기 번호
+CAPTURE_MAX_BYTES = 64 * 1024 * 1024  # 파일 하나의 최대 크기 (약 200만 패킷)
+CAPTURE_FILES = 5  # capture.bin + capture.bin.1 ~ .4
+# 모아둔 레코드를 이 간격 또는 이 개수마다 executor에서 한 번에 기록
+CAPTURE_FLUSH_INTERVAL = 1.0
+CAPTURE_FLUSH_BATCH = 1000
+
+
+class PacketCapture:
+    """수신한 상태 패킷을 순환 바이너리 로그에 추가 기록
+
+    이벤트 루프에서는 (시각, 기기 번호, contents hex) 를 목록에 넣기만 하고, hex 변환/패킹/파일 쓰기는
+    모아서 executor에서 한 번에 수행한다. 시작할 때마다 새 파일을 열어 파일 안의 monotonic 시각이 단조 증가한다.
+    """
+
+    def __init__(self, hass, directory: str):
+        self.hass = hass
+        self._directory = Path(directory)
+        self._path = self._directory / CAPTURE_FILE
+        self._file = None
+        self._indexes: dict[str, int] = {}
+        self._attached: set[str] = set()
+        self._pending: list[tuple] = []
+        self._timer = None
+        self._writing = None  # 진행 중인 쓰기 작업 (한 번에 하나만 - 레코드 순서 유지)
+        # 기록한 레코드 수와 버린 패킷 수 (hex 오류, 길이 불일치, 쓰기 실패) - 이벤트 루프에서만 갱신
+        self.records = 0
+        self.dropped = 0
+
+    @property
+    def attached(self) -> bool:
+        return bool(self._attached)
+
+    async def async_open(self):
+        await self.hass.async_add_executor_job(self._open)
+
+    async def async_attach(self, device_id: str) -> int:
+        """기록할 기기 등록 - 재시작 후에도 같은 기기 번호 유지"""
+        self._attached.add(device_id)
+        index = self._indexes.get(device_id)
+        if index is None:
+            index = self._indexes[device_id] = len(self._indexes)
+            await self.hass.async_add_executor_job(self._save_indexes, dict(self._indexes))
+        return index
+
+    def detach(self, device_id: str):
+        self._attached.discard(device_id)
+
+    @callback
+    def append(self, index: int, contents: str):
+        """상태 패킷 하나 기록 예약 (이벤트 루프)"""
+        pending = self._pending
+        pending.append((time.monotonic_ns(), index, contents))
+        if len(pending) >= CAPTURE_FLUSH_BATCH:
+            self._async_flush()
+        elif self._timer is None:
+            self._timer = self.hass.loop.call_later(CAPTURE_FLUSH_INTERVAL, self._async_flush)
+
+    @callback
+    def _async_flush(self):
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        if not self._pending or self._file is None:
+            return
+        if self._writing is not None:
+            # 이전 쓰기가 끝나면 다시 시도
+            self._timer = self.hass.loop.call_later(CAPTURE_FLUSH_INTERVAL, self._async_flush)
+            return
+        batch, self._pending = self._pending, []
+        self._writing = self.hass.async_create_background_task(self._async_write(batch), "purethink_capture_write")
+
+    async def _async_write(self, batch: list[tuple]):
+        try:
+            written, dropped = await self.hass.async_add_executor_job(self._write, batch)
+        except OSError as e:
+            self.dropped += len(batch)
+            _LOGGER.error("[Capture] 패킷 기록 실패: %s", e)
+        else:
+            self.records += written
+            self.dropped += dropped
+        finally:
+            self._writing = None
+
+    async def async_close(self):
+        """남은 레코드를 기록하고 파일 닫기"""
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        if self._writing is not None:
+            await self._writing
+        batch, self._pending = self._pending, []
+        written, dropped = await self.hass.async_add_executor_job(self._close, batch)
+        self.records += written
+        self.dropped += dropped
+
+    # 이하 executor 전용
+
+    def _open(self):
+        self._directory.mkdir(parents=True, exist_ok=True)
+        devices = self._directory / CAPTURE_DEVICES_FILE
+        if devices.exists():
+            self._indexes = json.loads(devices.read_text())
+        if self._path.exists() and self._path.stat().st_size > _HEADER.size:
+            self._rotate()
+        self._start_file()
+
+    def _start_file(self):
+        self._file = open(self._path, "wb", buffering=0)
+        self._file.write(_HEADER.pack(CAPTURE_MAGIC, _RECORD.size, time.time_ns(), time.monotonic_ns()))
+
+    def _rotate(self):
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+        for number in range(CAPTURE_FILES - 1, 0, -1):
+            source = self._path.with_name(f"{CAPTURE_FILE}.{number - 1}" if number > 1 else CAPTURE_FILE)
+            if source.exists():
+                os.replace(source, self._path.with_name(f"{CAPTURE_FILE}.{number}"))
+
+    def _save_indexes(self, indexes: dict):
+        path = self._directory / CAPTURE_DEVICES_FILE
+        temp = path.with_suffix(".tmp")
+        temp.write_text(json.dumps(indexes))
+        os.replace(temp, path)
+
+    def _write(self, batch: list[tuple]) -> tuple[int, int]:
+        """(기록한 레코드 수, 버린 패킷 수) - 카운터는 이벤트 루프에서 갱신"""
+        buffer = bytearray(_RECORD.size * len(batch))
+        offset = 0
+        pack_into = _RECORD.pack_into
+        for timestamp, index, contents in batch:
+            try:
+                raw = bytes.fromhex(contents)
+            except ValueError:
+                continue
+            # 고정 크기 필드("23s")는 긴 패킷을 자르고 짧은 패킷을 0으로 채우므로 길이가 다르면 버림
+            if len(raw) != CAPTURE_PACKET_LEN:
+                continue
+            pack_into(buffer, offset, timestamp, index, raw)
+            offset += _RECORD.size
+        written = offset // _RECORD.size
+        dropped = len(batch) - written
+        if dropped:
+            _LOGGER.debug("[Capture] 잘못된 패킷 %d개 버림", dropped)
+        if not offset:
+            return 0, dropped
+        if self._file.tell() + offset > CAPTURE_MAX_BYTES:
+            self._rotate()
+            self._start_file()
+        self._file.write(memoryview(buffer)[:offset])
+        return written, dropped
+
+    def _close(self, batch: list[tuple]) -> tuple[int, int]:
+        if self._file is None:
+            return 0, len(batch)
+        try:
+            return self._write(batch) if batch else (0, 0)
+        finally:
+            self._file.close()
+            self._file = None
+
+
+class CaptureReader:
+    """캡처 파일을 mmap으로 열어 레코드를 순회/시각 탐색 (파일 전체를 메모리에 읽지 않음)
+
+    레코드는 (monotonic ns, 기기 번호, 패킷 bytes) 이고 wall_time()으로 실제 시각으로 변환한다.
+    """
+
+    def __init__(self, path):
+        path = Path(path)
+        self._file = open(path, "rb")
+        size = os.fstat(self._file.fileno()).st_size
+        if size < _HEADER.size:
+            self._file.close()
+            raise ValueError(f"Not a capture file: {path}")
+        self._map = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, record_size, self.wall_start, self.monotonic_start = _HEADER.unpack_from(self._map)
+        if magic != CAPTURE_MAGIC or record_size != _RECORD.size:
+            self.close()
+            raise ValueError(f"Not a capture file: {path}")
+        # 기록 중 잘린 마지막 레코드는 제외
+        self._count = (size - _HEADER.size) // _RECORD.size
+        devices = path.parent / CAPTURE_DEVICES_FILE
+        indexes = json.loads(devices.read_text()) if devices.exists() else {}
+        self.devices = {index: device_id for device_id, index in indexes.items()}
+
+    def __len__(self) -> int:
+        return self._count
+
+    def __getitem__(self, position: int) -> tuple[int, int, bytes]:
+        if not 0 <= position < self._count:
+            raise IndexError(position)
+        return _RECORD.unpack_from(self._map, _HEADER.size + position * _RECORD.size)
+
+    def timestamp(self, position: int) -> int:
+        return struct.unpack_from("<q", self._map, _HEADER.size + position * _RECORD.size)[0]
+
+    def wall_time(self, timestamp: int) -> float:
+        """monotonic ns 를 epoch 초로 변환"""
+        return (self.wall_start + timestamp - self.monotonic_start) / 1e9
+
+    def seek(self, wall_time: float) -> int:
+        """주어진 epoch 초 이후 첫 레코드 위치"""
+        target = int(wall_time * 1e9) - self.wall_start + self.monotonic_start
+        return bisect_left(range(self._count), target, key=self.timestamp)
+
+    def records(self, start: float | None = None, end: float | None = None, device: int | None = None):
+        """[start, end) 구간(epoch 초)의 레코드 순회 (device: 기기 번호)"""
+        position = self.seek(start) if start is not None else 0
+        stop = self.seek(end) if end is not None else self._count
+        offset = _HEADER.size + position * _RECORD.size
+        unpack_from = _RECORD.unpack_from
+        for _ in range(position, stop):
+            record = unpack_from(self._map, offset)
+            offset += _RECORD.size
+            if device is None or record[1] == device:
+                yield record
+
+    def __iter__(self):
+        return self.records()
+
+    def close(self):
+        self._map.close()
+        self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
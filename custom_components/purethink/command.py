@@ -0,0 +1,223 @@
+import logging
+import time
+
+from homeassistant.core import HomeAssistant, callback
+from homeassistant.helpers.dispatcher import async_dispatcher_send
+
+from .connection import get_connection
+from .const import COMMAND_ACK_TIMEOUT, COMMAND_MAX_ATTEMPTS, DOMAIN
+from .metrics import LatencyHistogram
+from .protocol import DeviceState, generate_command, new_topic_id, normalize_command
+from .state import async_refresh_state
+
+_LOGGER = logging.getLogger(__name__)
+
+# 상태 패킷으로 반영 여부를 확인할 수 있는 명령 필드
+CONFIRM_FIELDS = ("power", "fan_speed", "ai_mode", "sleep_mode", "pressure_mode", "fan_in", "fan_out")
+
+
+class CommandCoalescer:
+    """짧은 시간 창 안에 들어온 명령을 필드 단위로 합쳐 CMD 패킷 하나로 전송"""
+
+    def __init__(self, hass: HomeAssistant, device, window: float, tracker: "CommandTracker", optimistic: bool):
+        self.hass = hass
+        self._device = device
+        self._window = window
+        self._tracker = tracker
+        self._optimistic = optimistic
+        self._pending: dict = {}
+        self._timer = None
+
+    @callback
+    def async_send(self, **kwargs):
+        """명령 필드를 대기열에 병합 (같은 필드는 마지막 값 우선)"""
+        fields = normalize_command(**kwargs)
+        self._pending.update(fields)
+        if self._optimistic:
+            self._tracker.async_apply_optimistic(fields)
+        if self._window <= 0:
+            self._async_flush()
+        elif self._timer is None:
+            # 첫 명령 기준의 고정 창 - 슬라이더를 계속 움직여도 창마다 한 번은 전송
+            self._timer = self.hass.loop.call_later(self._window, self._async_flush)
+
+    @callback
+    def async_cancel(self):
+        """대기 중인 명령 폐기 (Entry 해제 시)"""
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        self._pending = {}
+
+    @callback
+    def _async_flush(self):
+        self._timer = None
+        fields, self._pending = self._pending, {}
+        if not fields:
+            return
+
+        topic_id = new_topic_id()
+        try:
+            payload = generate_command(self._device.state, topic_id=topic_id, **fields)
+        except Exception as e:
+            _LOGGER.error(f"[Command] 명령 생성 실패: {e}", exc_info=True)
+            self._tracker.async_revert_optimistic(fields)
+            return
+        if not payload:
+            _LOGGER.error(f"[Command] 명령 생성 실패: {fields}")
+            self._tracker.async_revert_optimistic(fields)
+            return
+
+        get_connection(self.hass).publish(self._device.command_topic, payload, qos=1)
+        self._device.metrics.commands_sent += 1
+        self._tracker.async_track(topic_id, fields)
+        _LOGGER.debug(f"[Command] {self._device.device_id} 명령 전송 ▶ {payload} (병합 필드: {fields})")
+
+
+class CommandTracker:
+    """topic_id별 전송 명령을 이후 상태 패킷과 대조해 반영 확인, 왕복 시간 기록, 미반영 시 재전송"""
+
+    def __init__(self, hass: HomeAssistant, device):
+        self.hass = hass
+        self._device = device
+        # topic_id -> {"expected", "sent_at", "attempts", "timer"}
+        self._inflight: dict[str, dict] = {}
+        self.latency = LatencyHistogram()
+        self.confirmed = 0
+        self.retries = 0
+        self.failed = 0
+
+    @property
+    def in_flight(self) -> int:
+        return len(self._inflight)
+
+    @property
+    def p50(self) -> float | None:
+        return self.latency.percentile(0.5)
+
+    @property
+    def p95(self) -> float | None:
+        return self.latency.percentile(0.95)
+
+    @callback
+    def async_track(self, topic_id: str, fields: dict):
+        """전송한 명령 등록 (상태 패킷으로 확인할 필드가 없는 명령은 추적하지 않음)"""
+        expected = {key: int(fields[key]) for key in CONFIRM_FIELDS if key in fields}
+        if not expected:
+            # 필터 리셋만 담은 명령 - 다음 상태 패킷이 무엇이든 확인으로 잡혀 왕복 시간이 왜곡되므로 제외
+            _LOGGER.debug(f"[Command] {topic_id} 확인할 필드 없음, 추적 안 함: {fields}")
+            return
+
+        # 새 명령이 덮어쓴 필드는 이전 명령에서 더 이상 확인할 수 없음
+        for other_id, other in list(self._inflight.items()):
+            if not expected.keys() & other["expected"].keys():
+                continue
+            for key in expected:
+                other["expected"].pop(key, None)
+            if not other["expected"]:
+                _LOGGER.debug(f"[Command] {other_id} 이후 명령으로 대체됨")
+                self._async_discard(other_id)
+
+        self._inflight[topic_id] = {
+            "expected": expected,
+            "sent_at": time.monotonic(),
+            "attempts": 1,
+            "timer": self.hass.loop.call_later(COMMAND_ACK_TIMEOUT, self._async_timeout, topic_id),
+        }
+
+    @callback
+    def async_process_state(self, state: DeviceState):
+        """상태 패킷이 요청 필드를 모두 반영한 명령을 확인 처리"""
+        if not self._inflight:
+            return
+
+        now = time.monotonic()
+        confirmed = [
+            topic_id for topic_id, command in self._inflight.items()
+            if all(getattr(state, key) == value for key, value in command["expected"].items())
+        ]
+        for topic_id in confirmed:
+            command = self._inflight[topic_id]
+            latency = now - command["sent_at"]
+            self.latency.observe(latency)
+            self.confirmed += 1
+            self._async_discard(topic_id)
+            self._async_clear_optimistic(command["expected"])
+            _LOGGER.debug(f"[Command] {topic_id} 반영 확인 ({latency * 1000:.0f}ms, 시도 {command['attempts']}회)")
+        if confirmed:
+            self._async_notify()
+
+    @callback
+    def async_apply_optimistic(self, fields: dict):
+        """요청 필드를 기기 확인 전에 바로 표시"""
+        if self._device.device_state is None:
+            # 기기 상태를 받기 전에는 대조할 기준이 없으므로 표시하지 않음
+            return
+        self._device.optimistic.update(
+            (key, int(fields[key])) for key in CONFIRM_FIELDS if key in fields
+        )
+        async_refresh_state(self.hass, self._device)
+
+    @callback
+    def async_revert_optimistic(self, fields: dict):
+        """반영되지 않은 요청 필드를 기기 상태로 되돌림"""
+        cleared = self._async_clear_optimistic(fields)
+        if not cleared:
+            return
+
+        device_state = self._device.device_state
+        mismatched = {
+            key: (int(fields[key]), getattr(device_state, key))
+            for key in cleared if getattr(device_state, key) != int(fields[key])
+        }
+        if mismatched:
+            _LOGGER.warning(f"[Command] {self._device.device_id} 요청 상태 미반영, 기기 상태로 되돌림 (요청, 기기): {mismatched}")
+        async_refresh_state(self.hass, self._device)
+
+    @callback
+    def _async_clear_optimistic(self, fields: dict) -> list:
+        """이 명령이 표시 중인 낙관적 필드 제거 (이후 명령이 덮어쓴 필드는 유지)"""
+        optimistic = self._device.optimistic
+        cleared = [key for key in fields if key in optimistic and optimistic[key] == int(fields[key])]
+        for key in cleared:
+            del optimistic[key]
+        return cleared
+
+    @callback
+    def async_cancel(self):
+        """대기 중인 모든 명령 추적 중단 (Entry 해제 시)"""
+        for topic_id in list(self._inflight):
+            self._async_discard(topic_id)
+
+    @callback
+    def _async_discard(self, topic_id: str):
+        command = self._inflight.pop(topic_id)
+        command["timer"].cancel()
+
+    @callback
+    def _async_timeout(self, topic_id: str):
+        command = self._inflight.get(topic_id)
+        if command is None:
+            return
+
+        if command["attempts"] >= COMMAND_MAX_ATTEMPTS:
+            self.failed += 1
+            self._inflight.pop(topic_id)
+            _LOGGER.warning(f"[Command] {topic_id} {command['attempts']}회 전송했으나 반영되지 않음: {command['expected']}")
+            self.async_revert_optimistic(command["expected"])
+            self._async_notify()
+            return
+
+        # 그 사이 다른 명령으로 바뀐 필드를 되돌리지 않도록 현재 상태에 남은 요청 필드만 얹어 다시 생성
+        command["attempts"] += 1
+        self.retries += 1
+        payload = generate_command(self._device.state, topic_id=topic_id, **command["expected"])
+        get_connection(self.hass).publish(self._device.command_topic, payload, qos=1)
+        self._device.metrics.commands_sent += 1
+        command["timer"] = self.hass.loop.call_later(COMMAND_ACK_TIMEOUT, self._async_timeout, topic_id)
+        _LOGGER.debug(f"[Command] {topic_id} 반영 확인 없음, 재전송 ({command['attempts']}/{COMMAND_MAX_ATTEMPTS})")
+        self._async_notify()
+
+    @callback
+    def _async_notify(self):
+        async_dispatcher_send(self.hass, f"{DOMAIN}_command_update_{self._device.entry_id}")
@@ -3,8 +3,10 @@ import re
 
 import voluptuous as vol
 from homeassistant import config_entries
+from homeassistant.core import callback
 
-from .const import DOMAIN
+from .const import CONF_CAPTURE, CONF_COMMAND_WINDOW, CONF_OPTIMISTIC, CONF_STALE_TIMEOUT, DEFAULT_CAPTURE, \
+    DEFAULT_COMMAND_WINDOW, DEFAULT_OPTIMISTIC, DEFAULT_STALE_TIMEOUT, DOMAIN, SENSOR_WRITE_LIMITS, SENSOR_WRITE_OPTIONS
 
 _LOGGER = logging.getLogger(__name__)
 
@@ -13,6 +15,11 @@ class PurethinkConfigFlow(config_entries.ConfigFlow, domain=DOMAIN):
     """설정 마법사 클래스"""
     VERSION = 1
 
+    @staticmethod
+    @callback
+    def async_get_options_flow(config_entry):
+        return PurethinkOptionsFlow()
+
     async def async_step_user(self, user_input=None):
         """사용자 설정 단계"""
         _LOGGER.debug("Starting config flow")
@@ -52,3 +59,44 @@ class PurethinkConfigFlow(config_entries.ConfigFlow, domain=DOMAIN):
             }),
             errors=errors
         )
+
+
+class PurethinkOptionsFlow(config_entries.OptionsFlow):
+    """옵션 설정 클래스"""
+
+    async def async_step_init(self, user_input=None):
+        """옵션 설정 단계"""
+        if user_input is not None:
+            _LOGGER.debug(f"Options received: {user_input}")
+            return self.async_create_entry(title="", data=user_input)
+
+        options = self.config_entry.options
+        # 센서 묶음(CO₂, PM)별 최소 변화량/최소 기록 간격/heartbeat - 기본값은 종류별 표
+        write_limits = {}
+        for sensor_type in ("co2", "pm25"):
+            delta_key, interval_key, heartbeat_key = SENSOR_WRITE_OPTIONS[sensor_type]
+            delta, min_interval, heartbeat = SENSOR_WRITE_LIMITS[sensor_type]
+            write_limits.update({
+                vol.Optional(delta_key, default=options.get(delta_key, delta)):
+                    vol.All(vol.Coerce(int), vol.Range(min=0, max=1000)),
+                vol.Optional(interval_key, default=options.get(interval_key, min_interval)):
+                    vol.All(vol.Coerce(int), vol.Range(min=0, max=3600)),
+                vol.Optional(heartbeat_key, default=options.get(heartbeat_key, heartbeat)):
+                    vol.All(vol.Coerce(int), vol.Range(min=0, max=86400)),
+            })
+        return self.async_show_form(
+            step_id="init",
+            data_schema=vol.Schema({
+                vol.Optional(CONF_COMMAND_WINDOW,
+                             default=options.get(CONF_COMMAND_WINDOW, DEFAULT_COMMAND_WINDOW)):
+                    vol.All(vol.Coerce(int), vol.Range(min=0, max=2000)),
+                vol.Optional(CONF_OPTIMISTIC,
+                             default=options.get(CONF_OPTIMISTIC, DEFAULT_OPTIMISTIC)): bool,
+                vol.Optional(CONF_STALE_TIMEOUT,
+                             default=options.get(CONF_STALE_TIMEOUT, DEFAULT_STALE_TIMEOUT)):
+                    vol.All(vol.Coerce(int), vol.Range(min=0, max=86400)),
+                **write_limits,
+                vol.Optional(CONF_CAPTURE,
+                             default=options.get(CONF_CAPTURE, DEFAULT_CAPTURE)): bool,
+            })
+        )
@@ -0,0 +1,378 @@
+import logging
+import random
+import select
+import ssl
+import threading
+import time
+from contextlib import suppress
+from typing import TYPE_CHECKING
+
+from homeassistant.core import HomeAssistant, callback
+from homeassistant.helpers import instance_id
+
+from .const import DATA_CONNECTION, DOMAIN, MQTT_BROKER, MQTT_KEEPALIVE, MQTT_PORT
+from .metrics import LatencyHistogram
+
+if TYPE_CHECKING:
+    import paho.mqtt.client as mqtt
+
+_LOGGER = logging.getLogger(__name__)
+
+# paho.mqtt.client.MQTT_ERR_SUCCESS (paho는 첫 연결 시 executor에서 로드)
+MQTT_ERR_SUCCESS = 0
+
+# 소켓 읽기 콜백 한 번에 처리할 최대 패킷 수 (이벤트 루프 독점 방지)
+MAX_PACKETS_PER_READ = 500
+# keepalive / 재전송 처리 주기 (초)
+MISC_INTERVAL = 1
+# 재연결 대기 시간 (초) - 실패할 때마다 두 배 + 지터, 상한으로 복구 시간 제한
+RECONNECT_MIN_DELAY = 1
+RECONNECT_MAX_DELAY = 60
+# 연결 끊김 → 모든 기기 상태 재수신까지 걸린 시간 히스토그램 구간 (초)
+RECOVERY_BUCKETS = (1, 2, 5, 10, 30, 60, 120, 300)
+
+
+def create_client(client_id: str = "") -> "mqtt.Client":
+    """TLS 설정된 paho 클라이언트 생성 - 모듈 import와 인증서 로드가 블로킹이므로 executor에서 호출
+
+    client_id를 주면 영속 세션(clean_session=False)으로 접속해 잠깐 끊긴 동안의 QoS 1 메시지를 브로커가 보관한다.
+    """
+    import paho.mqtt.client as mqtt
+
+    context = ssl.create_default_context()
+    context.check_hostname = False  # ✅ 호스트 이름 검증 비활성화
+    context.verify_mode = ssl.CERT_NONE  # ✅ 인증서 검증 비활성화
+    client = mqtt.Client(client_id=client_id, clean_session=not client_id)
+    client.tls_set_context(context)
+    return client
+
+
+def get_connection(hass: HomeAssistant) -> "PurethinkConnection":
+    """공유 MQTT 연결 관리자 반환"""
+    return hass.data[DATA_CONNECTION]
+
+
+def device_id_from_topic(topic: str) -> str | None:
+    """/things/{device_id}/... 토픽에서 device_id 추출"""
+    parts = topic.split("/", 3)
+    if len(parts) < 3 or parts[1] != "things":
+        return None
+    return parts[2]
+
+
+def status_topic(device_id: str) -> str:
+    return f"/things/{device_id}/#"
+
+
+def command_topic(device_id: str) -> str:
+    return f"/things/{device_id}/shadow"
+
+
+class PurethinkConnection:
+    """모든 Config Entry가 공유하는 브로커 연결 및 토픽 → Entry 라우팅 테이블"""
+
+    def __init__(self, hass: HomeAssistant, message_handler, resync_handler):
+        self.hass = hass
+        self._message_handler = message_handler
+        # 연결/재연결 후 기기 상태를 다시 받도록 준비하는 콜백 (끊긴 시각 → 복구 시간을 잴 Entry 목록)
+        self._resync_handler = resync_handler
+        # device_id -> entry_id
+        self._routes: dict[str, str] = {}
+        # entry_id -> 아직 처리하지 않은 가장 최근 메시지 (같은 기기의 이전 메시지는 덮어씀)
+        self._pending: dict[str, "mqtt.MQTTMessage"] = {}
+        self._drain_handle = None
+        # 처리 전에 더 새 메시지로 대체되어 버려진 메시지 수
+        self.superseded = 0
+        self._connected = False
+        self._stopping = False
+        self._misc_timer = None
+        self._reconnect_timer = None
+
+        # 연결 소요 시간 측정 (백그라운드 연결이므로 HA 부팅 시간에 포함되지 않음)
+        self.connect_started: float | None = None
+        self.connect_duration: float | None = None
+        # 첫 연결 이후 다시 연결된 횟수
+        self.reconnects = 0
+        self._was_connected = False
+        # 재연결 시도 (연속 실패 수로 대기 시간 결정, 연결되면 0)
+        self.reconnect_attempts = 0
+        self._failures = 0
+        # 연결이 끊긴 시각과 재연결 후 아직 상태 패킷을 받지 못한 Entry - 모두 받으면 복구 시간 기록
+        self._disconnected_at: float | None = None
+        self._awaiting_state: set[str] = set()
+        self.recovery_time = LatencyHistogram(RECOVERY_BUCKETS)
+        self.last_recovery: float | None = None
+
+        # paho 클라이언트와 TLS 컨텍스트는 첫 연결 시 executor에서 생성
+        self._client: "mqtt.Client | None" = None
+
+    @property
+    def connected(self) -> bool:
+        return self._connected
+
+    @property
+    def has_devices(self) -> bool:
+        return bool(self._routes)
+
+    async def async_connect(self):
+        """브로커 연결 (DNS/TCP/TLS 핸드셰이크는 executor에서 수행)"""
+        self.connect_started = time.monotonic()
+        if self._client is None:
+            # 설치별 고정 client_id (영속 세션은 client_id로 구분)
+            client_id = f"{DOMAIN}-{(await instance_id.async_get(self.hass))[:16]}"
+            try:
+                client = await self.hass.async_add_executor_job(create_client, client_id)
+            except Exception as e:
+                _LOGGER.error(f"[MQTT] TLS 설정 오류: {e}", exc_info=True)
+                self._async_schedule_reconnect()
+                return
+            if self._stopping:
+                return
+            self._setup_client(client)
+
+        _LOGGER.debug(f"[MQTT] 연결 시도: {MQTT_BROKER}:{MQTT_PORT}")
+        try:
+            await self.hass.async_add_executor_job(
+                self._client.connect, MQTT_BROKER, MQTT_PORT, MQTT_KEEPALIVE
+            )
+        except Exception as e:
+            _LOGGER.error(f"[MQTT] 연결 실패: {e}")
+            self._async_schedule_reconnect()
+            return
+        self._async_start_misc()
+
+    def _setup_client(self, client: "mqtt.Client"):
+        # 네트워크 I/O는 paho 스레드 대신 HA 이벤트 루프의 소켓 콜백으로 처리
+        client.enable_logger(_LOGGER)
+        client.on_connect = self._on_connect
+        client.on_disconnect = self._on_disconnect
+        client.on_message = self._on_message
+        client.on_socket_open = self._on_socket_open
+        client.on_socket_close = self._on_socket_close
+        client.on_socket_register_write = self._on_socket_register_write
+        client.on_socket_unregister_write = self._on_socket_unregister_write
+        self._client = client
+
+    async def async_disconnect(self):
+        """브로커 연결 종료"""
+        self._stopping = True
+        self._connected = False
+        if self._reconnect_timer is not None:
+            self._reconnect_timer.cancel()
+            self._reconnect_timer = None
+        if self._misc_timer is not None:
+            self._misc_timer.cancel()
+            self._misc_timer = None
+        if self._drain_handle is not None:
+            self._drain_handle.cancel()
+            self._drain_handle = None
+        self._pending.clear()
+        if self._client is not None:
+            self._client.disconnect()
+
+    async def _async_reconnect(self):
+        self._reconnect_timer = None
+        if self._stopping:
+            return
+        self.reconnect_attempts += 1
+        if self._client is None:
+            # 클라이언트 생성(paho 로드/TLS 설정)부터 실패한 경우 - 첫 연결과 같은 경로로 다시 시도
+            await self.async_connect()
+            return
+        self.connect_started = time.monotonic()
+        try:
+            await self.hass.async_add_executor_job(self._client.reconnect)
+        except Exception as e:
+            _LOGGER.warning(f"[MQTT] 재연결 실패: {e}")
+            self._async_schedule_reconnect()
+            return
+        self._async_start_misc()
+
+    @callback
+    def _async_schedule_reconnect(self):
+        """연속 실패 수에 따라 지수 증가(상한 RECONNECT_MAX_DELAY) + 지터 후 재연결"""
+        if self._stopping or self._reconnect_timer is not None:
+            return
+        delay = min(RECONNECT_MAX_DELAY, RECONNECT_MIN_DELAY * 2 ** min(self._failures, 16))
+        # 여러 설치가 동시에 끊겨도 재연결이 몰리지 않도록 절반은 무작위
+        delay = delay / 2 + random.uniform(0, delay / 2)
+        self._failures += 1
+        _LOGGER.info("[MQTT] %.1f초 후 재연결 (연속 실패 %d회)", delay, self._failures)
+        self._reconnect_timer = self.hass.loop.call_later(
+            delay,
+            lambda: self.hass.async_create_background_task(self._async_reconnect(), f"{DOMAIN}_mqtt_reconnect"),
+        )
+
+    @callback
+    def _async_start_misc(self):
+        """keepalive 처리를 위한 주기 타이머 시작"""
+        if self._misc_timer is None:
+            self._misc_timer = self.hass.loop.call_later(MISC_INTERVAL, self._async_misc)
+
+    @callback
+    def _async_misc(self):
+        self._misc_timer = None
+        if self._client.loop_misc() == MQTT_ERR_SUCCESS:
+            self._async_start_misc()
+
+    # paho 소켓 콜백: connect()/reconnect()는 executor에서 호출되므로 루프로 넘겨서 등록
+    def _call_on_loop(self, func, *args):
+        if self.hass.loop_thread_id == threading.get_ident():
+            func(*args)
+        else:
+            self.hass.loop.call_soon_threadsafe(func, *args)
+
+    def _on_socket_open(self, client, userdata, sock):
+        self._call_on_loop(self.hass.loop.add_reader, sock.fileno(), self._async_reader_callback)
+
+    def _on_socket_close(self, client, userdata, sock):
+        self._call_on_loop(self._async_remove_socket, sock.fileno())
+
+    def _on_socket_register_write(self, client, userdata, sock):
+        self._call_on_loop(self.hass.loop.add_writer, sock.fileno(), self._async_writer_callback)
+
+    def _on_socket_unregister_write(self, client, userdata, sock):
+        self._call_on_loop(self._async_remove_writer, sock.fileno())
+
+    @callback
+    def _async_remove_socket(self, fileno: int):
+        # executor에서 닫힌 소켓은 이미 fd가 무효일 수 있음
+        with suppress(OSError):
+            self.hass.loop.remove_reader(fileno)
+        with suppress(OSError):
+            self.hass.loop.remove_writer(fileno)
+
+    @callback
+    def _async_remove_writer(self, fileno: int):
+        with suppress(OSError):
+            self.hass.loop.remove_writer(fileno)
+
+    @callback
+    def _async_reader_callback(self):
+        """소켓 수신 처리 - TLS 버퍼와 커널 버퍼에 남은 패킷까지 한 번에 읽음
+
+        loop_read()는 패킷 하나만 읽으므로 쌓인 패킷을 루프 턴마다 하나씩 읽으면 기기별 최신 메시지
+        병합이 동작하지 않는다.
+        """
+        for _ in range(MAX_PACKETS_PER_READ):
+            if self._client.loop_read() != MQTT_ERR_SUCCESS:
+                return
+            sock = self._client.socket()
+            if sock is None:
+                return
+            if isinstance(sock, ssl.SSLSocket) and sock.pending():
+                continue
+            if not select.select([sock], [], [], 0)[0]:
+                return
+
+    @callback
+    def _async_writer_callback(self):
+        self._client.loop_write()
+
+    def add_device(self, device_id: str, entry_id: str):
+        """라우팅 테이블에 기기를 추가하고 상태 토픽 구독"""
+        self._routes[device_id] = entry_id
+        if self._connected:
+            self._client.subscribe(status_topic(device_id), 1)
+
+    def remove_device(self, device_id: str):
+        """라우팅 테이블에서 기기를 제거하고 구독 해제"""
+        entry_id = self._routes.pop(device_id, None)
+        if entry_id is None:
+            return
+        self._pending.pop(entry_id, None)
+        self._awaiting_state.discard(entry_id)
+        if self._connected:
+            self._client.unsubscribe(status_topic(device_id))
+
+    def publish(self, topic: str, payload: str, qos: int = 1):
+        """명령 발행 (클라이언트 생성 전이면 버리고 명령 추적기의 재전송에 맡김)"""
+        if self._client is None:
+            _LOGGER.warning("[MQTT] 연결 준비 전이라 명령을 보내지 못함: %s", topic)
+            return None
+        return self._client.publish(topic, payload, qos=qos)
+
+    def _on_connect(self, client, userdata, flags, rc):
+        """MQTT 연결 시 등록된 모든 기기 토픽 구독"""
+        if rc != 0:
+            _LOGGER.error(f"[MQTT] 연결 실패 (코드 {rc})")
+            self._call_on_loop(self._async_schedule_reconnect)
+            return
+
+        self._connected = True
+        self._failures = 0
+        if self.connect_started is not None:
+            self.connect_duration = time.monotonic() - self.connect_started
+            _LOGGER.debug(f"[MQTT] 브로커 연결 소요 시간: {self.connect_duration * 1000:.0f}ms (백그라운드)")
+
+        # 영속 세션이 남아 있어도 구독은 항상 다시 요청 (세션이 만료됐을 수 있음)
+        topics = [(status_topic(device_id), 1) for device_id in list(self._routes)]
+        _LOGGER.debug(f"[MQTT] 연결 성공 (세션 유지: {flags.get('session present')}), 구독: {topics}")
+        if topics:
+            client.subscribe(topics)
+
+        if self._was_connected:
+            self.reconnects += 1
+        self._was_connected = True
+        self._call_on_loop(self._async_resync)
+
+    @callback
+    def _async_resync(self):
+        """연결/재연결 후 - 끊긴 동안 놓친 상태를 다음 패킷에서 반드시 반영하고, 재연결이면 끊기기 직전까지
+        상태를 보내던 기기의 상태를 모두 다시 받을 때까지 복구 시간 측정 (꺼져 있던 기기는 기다리지 않음)"""
+        self._awaiting_state = set(self._resync_handler(self._disconnected_at))
+        if not self._awaiting_state:
+            self._disconnected_at = None
+
+    def _on_disconnect(self, client, userdata, rc):
+        """연결 끊김 시 재연결 예약"""
+        was_connected, self._connected = self._connected, False
+        if self._stopping:
+            return
+        if was_connected:
+            # 끊김마다 새로 기록 - 이전 끊김의 복구를 다 받기 전에 다시 끊겨도 여러 번의 끊김을 한 번으로 재지 않음
+            self._disconnected_at = time.monotonic()
+        _LOGGER.warning(f"[MQTT] 연결 끊김 (코드 {rc})")
+        self._call_on_loop(self._async_schedule_reconnect)
+
+    def _on_message(self, client, userdata, msg):
+        """토픽의 device_id로 Entry를 찾아 기기별 최신 메시지 칸에 보관
+
+        재연결 직후처럼 한 번에 많은 패킷이 들어와도 기기마다 마지막 상태만 디코드/디스패치하도록
+        같은 루프 턴에 받은 메시지는 다음 턴에 한 번에 처리한다.
+        """
+        device_id = device_id_from_topic(msg.topic)
+        entry_id = self._routes.get(device_id)
+        if entry_id is None:
+            _LOGGER.debug("[MQTT] 등록되지 않은 토픽 무시: %s", msg.topic)
+            return
+        if msg.topic == command_topic(device_id):
+            # 구독(#)에 포함되는 명령 토픽 - 발행한 CMD가 되돌아온 것이므로 상태 패킷 자리를 차지하지 않게 버림
+            return
+        if entry_id in self._pending:
+            self.superseded += 1
+        self._pending[entry_id] = msg
+        if self._drain_handle is None:
+            self._drain_handle = self.hass.loop.call_soon(self._async_drain)
+
+    @callback
+    def _async_drain(self):
+        """기기별 최신 메시지 처리"""
+        self._drain_handle = None
+        pending, self._pending = self._pending, {}
+        for entry_id, msg in pending.items():
+            self._message_handler(entry_id, msg)
+        if self._awaiting_state:
+            self._async_check_recovery(pending)
+
+    @callback
+    def _async_check_recovery(self, received):
+        """재연결 후 모든 기기의 상태 패킷을 받으면 끊김부터의 복구 시간 기록"""
+        self._awaiting_state.difference_update(received)
+        if self._awaiting_state or self._disconnected_at is None:
+            return
+        self.last_recovery = time.monotonic() - self._disconnected_at
+        self._disconnected_at = None
+        self.recovery_time.observe(self.last_recovery)
+        _LOGGER.info("[MQTT] 연결 복구 완료 - 끊김부터 모든 기기 상태 수신까지 %.1f초", self.last_recovery)
+
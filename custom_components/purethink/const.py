@@ -1,5 +1,64 @@
 DOMAIN = "purethink"
 
+# hass.data 키
+DATA_CONNECTION = f"{DOMAIN}_connection"
+DATA_RESTORE = f"{DOMAIN}_restore"
+DATA_CAPTURE = f"{DOMAIN}_capture"
+DATA_WATCHDOG = f"{DOMAIN}_watchdog"
+# 해제한 Entry 가 마지막으로 받은 기기 상태 (다시 로드 시 상태 요청용, 메모리에만 보관)
+DATA_LAST_STATE = f"{DOMAIN}_last_state"
+
+# MQTT Broker 정보
+MQTT_BROKER = "dapt.iptime.org"
+MQTT_PORT = 8885
+MQTT_KEEPALIVE = 120
+
+# 명령 응답 추적
+COMMAND_ACK_TIMEOUT = 10  # 초, 상태 패킷으로 반영이 확인되지 않으면 재전송
+COMMAND_MAX_ATTEMPTS = 3  # 최초 전송 포함
+
+# 기기 가용성 (모든 기기를 한 타이머로 점검)
+STALE_CHECK_INTERVAL = 10  # 초
+# 연결/재연결/다시 로드 후 상태 요청 CMD는 마지막 상태 패킷이 이 시간 안일 때만 전송 (기기 주기 보고 한 번 간격, 초)
+STATUS_REQUEST_MAX_AGE = 30
+
+# 옵션
+CONF_COMMAND_WINDOW = "command_window"
+DEFAULT_COMMAND_WINDOW = 150  # ms, 연속 명령 병합 시간 창 (0이면 즉시 전송)
+CONF_OPTIMISTIC = "optimistic"
+DEFAULT_OPTIMISTIC = True  # 명령 전송 즉시 요청 상태 표시, 상태 패킷으로 확인 또는 되돌림
+CONF_STALE_TIMEOUT = "stale_timeout"
+DEFAULT_STALE_TIMEOUT = 300  # 초, 이 시간 동안 상태 패킷이 없으면 엔티티를 사용 불가로 표시 (0이면 사용 안 함)
+# 센서 상태 기록 제한 (공기질/냄새/Wi-Fi 센서 - 작은 변화는 모아서 기록)
+# 센서 종류별 기본값 (최소 변화량, 최소 기록 간격 초, heartbeat 초)
+#   최소 변화량: 마지막 기록 값과 이만큼 이상 달라져야 기록 (0이면 변화마다 기록)
+#   최소 기록 간격: 같은 센서의 연속 기록 최소 간격
+#   heartbeat: 작은 변화라도 이 시간이 지나면 기록 (0이면 사용 안 함)
+SENSOR_WRITE_LIMITS = {
+    "co2": (10, 10, 300),  # ppm
+    "pm1": (2, 10, 300),  # µg/m³
+    "pm25": (2, 10, 300),
+    "pm10": (2, 10, 300),
+    "odor": (1, 10, 600),  # 0~3 단계 - 한 단계 변화도 기록
+    "wifi": (1, 60, 900),  # 신호 단계 - 자주 흔들리므로 간격을 길게
+}
+CONF_CO2_DELTA = "co2_delta"
+CONF_CO2_MIN_INTERVAL = "co2_min_interval"
+CONF_CO2_HEARTBEAT = "co2_heartbeat"
+CONF_PM_DELTA = "pm_delta"
+CONF_PM_MIN_INTERVAL = "pm_min_interval"
+CONF_PM_HEARTBEAT = "pm_heartbeat"
+# 옵션으로 바꿀 수 있는 센서 종류별 (최소 변화량, 최소 기록 간격, heartbeat) 옵션 키 - 없으면 위 기본값 사용
+SENSOR_WRITE_OPTIONS = {
+    "co2": (CONF_CO2_DELTA, CONF_CO2_MIN_INTERVAL, CONF_CO2_HEARTBEAT),
+    "pm1": (CONF_PM_DELTA, CONF_PM_MIN_INTERVAL, CONF_PM_HEARTBEAT),
+    "pm25": (CONF_PM_DELTA, CONF_PM_MIN_INTERVAL, CONF_PM_HEARTBEAT),
+    "pm10": (CONF_PM_DELTA, CONF_PM_MIN_INTERVAL, CONF_PM_HEARTBEAT),
+}
+FORCE_WRITE_FACTOR = 5  # 최소 변화량의 이 배수 이상 급변하면 간격과 무관하게 바로 기록
+CONF_CAPTURE = "capture"
+DEFAULT_CAPTURE = False  # 수신 상태 패킷을 <config>/purethink_capture 에 바이너리로 기록
+
 # 프로토콜 상수
 CMD_HEADER = bytes.fromhex("A8 A8")
 CHECKSUM_BASE = 0x393
@@ -0,0 +1,102 @@
+import time
+
+from homeassistant.core import HomeAssistant, callback
+
+from .command import CommandCoalescer, CommandTracker
+from .connection import command_topic, status_topic
+from .const import DEFAULT_STALE_TIMEOUT, DOMAIN
+from .history import AirQualityHistory
+from .metrics import DeviceMetrics
+from .protocol import DeviceState
+
+
+def get_device(hass: HomeAssistant, entry_id: str) -> "PurethinkDevice":
+    """Entry의 기기 런타임 데이터 반환"""
+    return hass.data[DOMAIN].by_entry_id[entry_id]
+
+
+@callback
+def async_send_command(hass: HomeAssistant, entry_id: str, **kwargs):
+    """Entry 기기의 명령 병합기로 명령 전달"""
+    get_device(hass, entry_id).commands.async_send(**kwargs)
+
+
+class PurethinkDevice:
+    """기기별 런타임 데이터 (상태, 토픽, 마지막 모드 기억, 명령 처리기)"""
+
+    __slots__ = (
+        "entry_id", "device_id", "name", "status_topic", "command_topic", "device_info",
+        "state", "device_state", "optimistic", "last_device_mode", "last_fan_speed",
+        "last_payload", "last_contents", "last_seen", "previous_state", "available", "stale_timeout", "setup_at",
+        "history",
+        "capture", "capture_index",
+        "tracker", "commands", "metrics",
+    )
+
+    def __init__(self, hass: HomeAssistant, entry_id: str, device_id: str, name: str,
+                 command_window: float, optimistic: bool, stale_timeout: float = DEFAULT_STALE_TIMEOUT):
+        self.entry_id = entry_id
+        self.device_id = device_id
+        self.name = name
+        self.status_topic = status_topic(device_id)
+        self.command_topic = command_topic(device_id)
+        self.device_info = {
+            "identifiers": {(DOMAIN, device_id)},
+            "name": name,
+            "manufacturer": "Purethink",
+            "model": "Air Ventilator",
+        }
+
+        # 표시 상태 = 기기 상태 + 확인 대기 중인 낙관적 상태 (첫 상태 패킷 전에는 None)
+        self.state: DeviceState | None = None
+        self.device_state: DeviceState | None = None
+        self.optimistic: dict = {}
+
+        # 마지막으로 반영한 상태 메시지 (중복 패킷 판별) 및 마지막 수신 시각 (monotonic)
+        self.last_payload: bytes | None = None
+        self.last_contents: str | None = None
+        self.last_seen: float | None = None
+        # Entry 를 다시 로드한 경우 이전 Entry 가 마지막으로 받은 (상태, 수신 시각) - 첫 상태 요청에만 사용
+        self.previous_state: tuple[DeviceState, float] | None = None
+        # 최근 stale_timeout 초 안에 상태 패킷을 받았는지 (AvailabilityWatchdog 이 주기적으로 점검)
+        self.available = False
+        self.stale_timeout = stale_timeout
+        # 첫 상태 패킷까지 걸린 시간 측정 기준 (monotonic)
+        self.setup_at = time.monotonic()
+        # 공기질 측정값 기록과 이동 통계
+        self.history = AirQualityHistory()
+        # 패킷 캡처 (옵션을 켠 기기만, PacketCapture 와 캡처 파일 안의 기기 번호)
+        self.capture = None
+        self.capture_index = 0
+
+        # 전원을 끌 때 저장하고 켤 때 복원하는 모드/팬 속도
+        self.last_device_mode: str = "Manual"
+        self.last_fan_speed: int = 4
+
+        self.metrics = DeviceMetrics()
+        self.tracker = CommandTracker(hass, self)
+        self.commands = CommandCoalescer(hass, self, command_window, self.tracker, optimistic)
+
+
+class DeviceRegistry:
+    """device_id, entry_id 어느 쪽으로도 바로 찾을 수 있는 기기 목록"""
+
+    def __init__(self):
+        self.by_device_id: dict[str, PurethinkDevice] = {}
+        self.by_entry_id: dict[str, PurethinkDevice] = {}
+
+    def __len__(self) -> int:
+        return len(self.by_entry_id)
+
+    def __iter__(self):
+        return iter(self.by_entry_id.values())
+
+    def add(self, device: PurethinkDevice):
+        self.by_device_id[device.device_id] = device
+        self.by_entry_id[device.entry_id] = device
+
+    def remove(self, entry_id: str) -> PurethinkDevice | None:
+        device = self.by_entry_id.pop(entry_id, None)
+        if device is not None:
+            self.by_device_id.pop(device.device_id, None)
+        return device
@@ -1,43 +1,51 @@
 import logging
 
 from homeassistant.components.fan import FanEntity, FanEntityFeature
+from homeassistant.core import callback
 from homeassistant.helpers.dispatcher import async_dispatcher_connect
 from homeassistant.util.percentage import ordered_list_item_to_percentage, percentage_to_ordered_list_item
 
-from . import mqtt_client
 from .const import DOMAIN, FAN_SPEEDS
-from .protocol import generate_command
+from .device import async_send_command, get_device
+from .protocol import PRESET_MODES
 
 _LOGGER = logging.getLogger(__name__)
 
 
 async def async_setup_entry(hass, config_entry, async_add_entities):
-    entry_data = hass.data[DOMAIN][config_entry.entry_id]
-    device_info = entry_data["device"]
-    command_topic = entry_data["command_topic"]
-    async_add_entities([PurethinkFan(config_entry, entry_data, device_info, command_topic)])
+    device = get_device(hass, config_entry.entry_id)
+    async_add_entities([PurethinkFan(config_entry, device)])
+
+
+def _is_running(state) -> bool:
+    """전원이 켜져 있고 흡기/배기 중 하나라도 동작 중인지"""
+    return state is not None and state.power == 1 and (state.fan_in == 1 or state.fan_out == 1)
+
+
+def _percentage_to_speed(percentage: int) -> int:
+    """백분율을 기기 팬 속도(0-5)로 변환"""
+    return FAN_SPEEDS.index(percentage_to_ordered_list_item(FAN_SPEEDS[1:], percentage)) if percentage != 0 else 0
 
 
 class PurethinkFan(FanEntity):
-    _attr_preset_modes = ["Manual", "Auto", "Sleep 1", "Sleep 2", "Sleep 3"]
+    _attr_preset_modes = list(PRESET_MODES)
     _attr_supported_features = FanEntityFeature.SET_SPEED | FanEntityFeature.PRESET_MODE | FanEntityFeature.TURN_ON | FanEntityFeature.TURN_OFF
     _attr_speed_count = len(FAN_SPEEDS) - 1
+    _source_fields = frozenset({"power", "fan_in", "fan_out", "fan_speed", "ai_mode", "sleep_mode"})
 
-    def __init__(self, config_entry, entry_data, device_info, command_topic):
+    def __init__(self, config_entry, device):
         self._config_entry = config_entry
         self._config = config_entry.data
-        self._device_info = device_info
-        self._command_topic = command_topic
+        self._device = device
+        self._device_info = device.device_info
         self._attr_unique_id = f"{self._config['device_id']}_fan"
         self._attr_name = self._config['friendly_name']
-        self._attr_is_on = entry_data["state"].get("power", 0) == 1 and (
-                    int(entry_data["state"].get("fan_in", 0)) == 1 or int(entry_data["state"].get("fan_out", 0)) == 1)
+        self._attr_is_on = _is_running(device.state)
         self._attr_percentage = 0
 
     @property
     def is_on(self):
-        state = self.hass.data[DOMAIN][self._config_entry.entry_id]["state"]
-        return state.get("power", 0) == 1 and (int(state.get("fan_in", 0)) == 1 or int(state.get("fan_out", 0)) == 1)
+        return _is_running(self._device.state)
 
     async def async_added_to_hass(self):
         self.async_on_remove(
@@ -48,18 +56,21 @@ class PurethinkFan(FanEntity):
             )
         )
 
-    def _handle_update(self):
-        state = self.hass.data[DOMAIN][self._config_entry.entry_id]["state"]
-        self._attr_is_on = state.get("power", 0) == 1 and (
-                    int(state.get("fan_in", 0)) == 1 or int(state.get("fan_out", 0)) == 1)
+    @callback
+    def _handle_update(self, changed):
+        if not changed & self._source_fields:
+            return
+
+        state = self._device.state
+        self._attr_is_on = _is_running(state)
 
         # 장치로부터 받은 숫자 속도(0-5)를 백분율로 변환
-        fan_speed_index = state.get("fan_speed", 0)
+        fan_speed_index = state.fan_speed
         self._attr_percentage = ordered_list_item_to_percentage(FAN_SPEEDS[1:], FAN_SPEEDS[
             fan_speed_index]) if fan_speed_index != 0 else 0
 
-        ai_mode = state.get("ai_mode", 0)
-        sleep_mode = state.get("sleep_mode", 0)
+        ai_mode = state.ai_mode
+        sleep_mode = state.sleep_mode
 
         if ai_mode == 1:
             self._attr_preset_mode = "Auto"
@@ -68,35 +79,36 @@ class PurethinkFan(FanEntity):
         else:
             self._attr_preset_mode = "Manual"
 
-        self.schedule_update_ha_state()
+        self.async_write_ha_state()
 
     async def async_toggle(self, **kwargs) -> None:
         if self._attr_is_on is True:
-            await self.async_turn_off(kwargs)
+            await self.async_turn_off(**kwargs)
         else:
-            await self.async_turn_on(kwargs)
+            await self.async_turn_on(**kwargs)
 
     async def async_turn_on(self, percentage: int | None = None, preset_mode: str | None = None, **kwargs):
-        payload = generate_command(self._config['device_id'], self.hass, power=1, fan_mode="흡/배기")
-        mqtt_client.publish(self._command_topic, payload, qos=1)
-
+        # 전원/흡배기와 속도 또는 모드를 CMD 패킷 하나로 전송
+        command = {"power": 1, "fan_mode": "흡/배기"}
         if percentage is not None:
-            await self.async_set_percentage(percentage)
+            command["fan_speed"] = _percentage_to_speed(percentage)
         elif preset_mode is not None:
-            await self.async_set_preset_mode(preset_mode)
+            command["mode"] = preset_mode
+        async_send_command(self.hass, self._config_entry.entry_id, **command)
 
     async def async_turn_off(self, **kwargs):
-        payload = generate_command(self._config['device_id'], self.hass, fan_mode="환기 꺼짐")
-        mqtt_client.publish(self._command_topic, payload, qos=1)
+        async_send_command(self.hass, self._config_entry.entry_id, fan_mode="환기 꺼짐")
 
     async def async_set_percentage(self, percentage: int):
-        speed = FAN_SPEEDS.index(percentage_to_ordered_list_item(FAN_SPEEDS[1:], percentage)) if percentage != 0 else 0
-        payload = generate_command(self._config['device_id'], self.hass, fan_speed=speed)
-        mqtt_client.publish(self._command_topic, payload, qos=1)
+        async_send_command(self.hass, self._config_entry.entry_id, fan_speed=_percentage_to_speed(percentage))
 
     async def async_set_preset_mode(self, preset_mode: str):
-        payload = generate_command(self._config['device_id'], self.hass, mode=preset_mode)
-        mqtt_client.publish(self._command_topic, payload, qos=1)
+        async_send_command(self.hass, self._config_entry.entry_id, mode=preset_mode)
+
+    @property
+    def available(self) -> bool:
+        """기기가 최근 상태 패킷을 보냈을 때만 사용 가능"""
+        return self._device.available
 
     @property
     def device_info(self):
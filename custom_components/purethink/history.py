@@ -0,0 +1,151 @@
+from array import array
+from bisect import bisect_left
+
+# 이동 통계를 유지하는 측정값과 시간 창 (초)
+HISTORY_FIELDS = ("co2", "pm1", "pm25", "pm10")
+HISTORY_WINDOWS = (300, 900, 3600)
+# 링 버퍼 크기 (패킷 1초 간격이어도 1시간 분량, 기기당 약 130KB)
+HISTORY_CAPACITY = 3600
+
+
+class _Series:
+    """측정값 하나의 링 버퍼 - 값, 누적 합, 누적 시간가중 면적, 최소/최대 후보 (단조 큐)"""
+
+    __slots__ = ("values", "totals", "areas", "low", "high", "low_start", "high_start")
+
+    def __init__(self, capacity: int):
+        self.values = array("H", bytes(2 * capacity))
+        self.totals = array("q", bytes(8 * capacity))  # 처음부터 이 샘플까지 값의 합
+        self.areas = array("q", bytes(8 * capacity))  # 처음부터 이 샘플 시각까지 값 x 시간(ms) 합
+        # 샘플 번호 목록 (앞에서부터 값 오름차순/내림차순), *_start 앞쪽은 만료된 항목
+        self.low: list[int] = []
+        self.high: list[int] = []
+        self.low_start = 0
+        self.high_start = 0
+
+
+class AirQualityHistory:
+    """기기별 공기질 측정값 링 버퍼 (array('H')) 와 시간 창별 이동 통계
+
+    누적 합과 단조 큐를 패킷마다 한 번씩만 갱신하고 창 통계는 두 누적값의 차로 구하므로
+    패킷당 비용이 기록 길이나 창 개수와 무관하고, 조회 시 기록을 훑지 않는다.
+    """
+
+    __slots__ = ("fields", "windows", "_capacity", "_times", "_series", "_spans", "_heads", "_next")
+
+    def __init__(self, fields=HISTORY_FIELDS, windows=HISTORY_WINDOWS, capacity=HISTORY_CAPACITY):
+        self.fields = tuple(fields)
+        self.windows = tuple(windows)
+        self._capacity = capacity
+        self._times = array("q", bytes(8 * capacity))  # monotonic ms
+        self._series = {field: _Series(capacity) for field in self.fields}
+        self._spans = tuple(span * 1000 for span in self.windows)
+        # 창별 가장 오래된 샘플 번호 (시간 기준이므로 모든 측정값이 공유)
+        self._heads = [0] * len(self.windows)
+        self._next = 0  # 다음 샘플 번호 (링 위치는 번호 % capacity)
+
+    def __len__(self) -> int:
+        return min(self._next, self._capacity)
+
+    def add(self, now: float, state):
+        """상태 패킷의 측정값 추가 (now: time.monotonic())"""
+        ms = int(now * 1000)
+        capacity = self._capacity
+        seq = self._next
+        index = seq % capacity
+        previous = (seq - 1) % capacity
+        elapsed = ms - self._times[previous] if seq else 0
+        oldest = seq - capacity + 1  # 이번 샘플을 쓰면 링에 남는 가장 오래된 번호
+
+        for field, series in self._series.items():
+            value = getattr(state, field)
+            values = series.values
+            totals = series.totals
+            areas = series.areas
+            if seq:
+                totals[index] = totals[previous] + value
+                areas[index] = areas[previous] + values[previous] * elapsed
+            else:
+                totals[index] = value
+                areas[index] = 0
+
+            # 덮어쓸 샘플은 큐 앞에서 먼저 제거한 뒤 뒤쪽 후보 정리
+            low = series.low
+            low_start = series.low_start
+            if low_start < len(low) and low[low_start] < oldest:
+                low_start += 1
+            while len(low) > low_start and values[low[-1] % capacity] >= value:
+                low.pop()
+            low.append(seq)
+            high = series.high
+            high_start = series.high_start
+            if high_start < len(high) and high[high_start] < oldest:
+                high_start += 1
+            while len(high) > high_start and values[high[-1] % capacity] <= value:
+                high.pop()
+            high.append(seq)
+            values[index] = value
+
+            # 만료된 앞쪽 항목이 쌓이면 한 번에 정리
+            if low_start > 256 and low_start * 2 > len(low):
+                del low[:low_start]
+                low_start = 0
+            if high_start > 256 and high_start * 2 > len(high):
+                del high[:high_start]
+                high_start = 0
+            series.low_start = low_start
+            series.high_start = high_start
+
+        self._times[index] = ms
+        self._next = seq + 1
+        self._expire(ms)
+
+    def stats(self, field: str, span: int, now: float) -> dict | None:
+        """창 안의 평균, 최소, 최대, 시간가중 평균 (샘플이 없으면 None)"""
+        if not self._next:
+            return None
+        ms = int(now * 1000)
+        self._expire(ms)
+
+        capacity = self._capacity
+        window = self.windows.index(span)
+        series = self._series[field]
+        values = series.values
+        head = self._heads[window]
+        newest = self._next - 1
+        newest_index = newest % capacity
+        head_index = head % capacity
+
+        total = series.totals[newest_index] - series.totals[head_index] + values[head_index]
+        area = series.areas[newest_index] - series.areas[head_index]
+        area += values[newest_index] * (ms - self._times[newest_index])
+        start = self._times[head_index]
+        cutoff = ms - self._spans[window]
+        if start > cutoff and head > max(0, newest - capacity + 1):
+            # 창 시작 ~ 첫 샘플 구간은 직전 샘플(링에 남아 있을 때) 값이 유지된 것으로 계산
+            area += values[(head - 1) % capacity] * (start - cutoff)
+            start = cutoff
+        duration = ms - start
+
+        low = series.low[bisect_left(series.low, head, series.low_start)]
+        high = series.high[bisect_left(series.high, head, series.high_start)]
+        return {
+            "mean": total / (newest - head + 1),
+            "min": values[low % capacity],
+            "max": values[high % capacity],
+            "average": area / duration if duration > 0 else values[newest_index],
+        }
+
+    def _expire(self, ms: int):
+        """창 시작보다 오래된 샘플을 창에서 제외 (최신 샘플 하나는 항상 유지)"""
+        times = self._times
+        capacity = self._capacity
+        newest = self._next - 1
+        oldest = newest - capacity + 1
+        heads = self._heads
+        for window, span in enumerate(self._spans):
+            cutoff = ms - span
+            head = max(heads[window], oldest)
+            while head < newest and times[head % capacity] < cutoff:
+                head += 1
+            heads[window] = head
@@ -0,0 +1,142 @@
+from bisect import bisect_left
+
+# 지연 시간 히스토그램 구간 상한 (초)
+LATENCY_BUCKETS = (0.1, 0.25, 0.5, 1, 2, 3, 5, 7.5, 10, 15, 30)
+
+
+class LatencyHistogram:
+    """고정 구간 지연 시간 히스토그램 (Prometheus histogram과 같은 le 구간)"""
+
+    __slots__ = ("buckets", "counts", "count", "sum")
+
+    def __init__(self, buckets=LATENCY_BUCKETS):
+        self.buckets = tuple(buckets)
+        self.counts = [0] * (len(self.buckets) + 1)  # 마지막 칸은 +Inf
+        self.count = 0
+        self.sum = 0.0
+
+    def observe(self, value: float):
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.count += 1
+        self.sum += value
+
+    def percentile(self, q: float) -> float | None:
+        """구간 안 선형 보간으로 분위수 추정"""
+        if not self.count:
+            return None
+
+        rank = q * self.count
+        cumulative = 0
+        for index, bucket_count in enumerate(self.counts):
+            if cumulative + bucket_count >= rank and bucket_count:
+                lower = self.buckets[index - 1] if index else 0.0
+                if index == len(self.buckets):
+                    return lower
+                upper = self.buckets[index]
+                return lower + (upper - lower) * (rank - cumulative) / bucket_count
+            cumulative += bucket_count
+        return self.buckets[-1]
+
+
+# 메시지 처리 시간 히스토그램 구간 상한 (초)
+DURATION_BUCKETS = (0.00005, 0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.05)
+
+
+class DeviceMetrics:
+    """기기별 메시지 처리 카운터와 처리 시간 히스토그램 (on_message에서 정수 증가만 하므로 부담 없음)"""
+
+    __slots__ = (
+        "received", "rejected", "duplicates", "parsed", "dispatched", "commands_sent", "status_requests",
+        "decode_time", "dispatch_time", "first_state",
+    )
+
+    def __init__(self):
+        self.received = 0  # on_message 호출 수
+        self.rejected = 0  # 형식/헤더/파싱 오류로 버린 메시지
+        self.duplicates = 0  # 직전 패킷과 같아 디코드/알림 없이 넘긴 메시지
+        self.parsed = 0  # 상태 패킷 디코드 성공
+        self.dispatched = 0  # 바뀐 필드가 있어 엔티티에 알린 횟수
+        self.commands_sent = 0  # CMD 발행 (재전송 포함)
+        self.status_requests = 0  # 재연결/다시 로드 후 보낸 상태 요청 CMD
+        self.decode_time = LatencyHistogram(DURATION_BUCKETS)
+        self.dispatch_time = LatencyHistogram(DURATION_BUCKETS)
+        self.first_state: float | None = None  # 기기 설정부터 첫 상태 패킷까지 걸린 시간 (초)
+
+
+# (이름, DeviceMetrics 속성, 설명)
+_DEVICE_COUNTERS = (
+    ("purethink_messages_received_total", "received", "Status messages received"),
+    ("purethink_messages_rejected_total", "rejected", "Status messages rejected"),
+    ("purethink_messages_duplicate_total", "duplicates", "Duplicate status messages suppressed"),
+    ("purethink_messages_parsed_total", "parsed", "Status packets decoded"),
+    ("purethink_messages_dispatched_total", "dispatched", "State updates dispatched to entities"),
+    ("purethink_commands_sent_total", "commands_sent", "CMD packets published, including retries"),
+    ("purethink_status_requests_total", "status_requests", "State-preserving CMDs sent to request a status packet"),
+)
+_TRACKER_COUNTERS = (
+    ("purethink_commands_confirmed_total", "confirmed", "Commands confirmed by a status packet"),
+    ("purethink_command_retries_total", "retries", "Command retransmissions"),
+    ("purethink_commands_failed_total", "failed", "Commands never confirmed"),
+)
+
+
+def _header(name: str, kind: str, help_text: str) -> list[str]:
+    return [f"# HELP {name} {help_text}", f"# TYPE {name} {kind}"]
+
+
+def _histogram(name: str, labels: str, histogram: LatencyHistogram) -> list[str]:
+    lines = []
+    cumulative = 0
+    prefix = f"{labels}," if labels else ""
+    suffix = f"{{{labels}}}" if labels else ""
+    for bound, count in zip(histogram.buckets + (None,), histogram.counts):
+        cumulative += count
+        le = "+Inf" if bound is None else f"{bound:g}"
+        lines.append(f'{name}_bucket{{{prefix}le="{le}"}} {cumulative}')
+    lines.append(f"{name}_sum{suffix} {histogram.sum:.6f}")
+    lines.append(f"{name}_count{suffix} {histogram.count}")
+    return lines
+
+
+def render_prometheus(devices, connection=None) -> str:
+    """등록된 기기와 공유 연결의 메트릭을 Prometheus 텍스트 형식으로 변환"""
+    devices = list(devices)
+    labels = {device: 'device_id="{}"'.format(device.device_id.replace("\\", "\\\\").replace('"', '\\"'))
+              for device in devices}
+    lines = []
+
+    for name, attr, help_text in _DEVICE_COUNTERS:
+        lines += _header(name, "counter", help_text)
+        lines += [f"{name}{{{labels[device]}}} {getattr(device.metrics, attr)}" for device in devices]
+    for name, attr, help_text in _TRACKER_COUNTERS:
+        lines += _header(name, "counter", help_text)
+        lines += [f"{name}{{{labels[device]}}} {getattr(device.tracker, attr)}" for device in devices]
+
+    for name, getter, help_text in (
+        ("purethink_decode_seconds", lambda device: device.metrics.decode_time, "Status packet decode time"),
+        ("purethink_dispatch_seconds", lambda device: device.metrics.dispatch_time, "State dispatch time"),
+        ("purethink_command_latency_seconds", lambda device: device.tracker.latency, "Command round trip time"),
+    ):
+        lines += _header(name, "histogram", help_text)
+        for device in devices:
+            lines += _histogram(name, labels[device], getter(device))
+
+    lines += _header("purethink_time_to_first_state_seconds", "gauge", "Time from device setup to its first status packet")
+    lines += [f"purethink_time_to_first_state_seconds{{{labels[device]}}} {device.metrics.first_state:.3f}"
+              for device in devices if device.metrics.first_state is not None]
+
+    if connection is not None:
+        lines += _header("purethink_broker_connected", "gauge", "Broker connection state")
+        lines.append(f"purethink_broker_connected {int(connection.connected)}")
+        lines += _header("purethink_broker_reconnects_total", "counter", "Successful broker reconnects")
+        lines.append(f"purethink_broker_reconnects_total {connection.reconnects}")
+        lines += _header("purethink_broker_reconnect_attempts_total", "counter", "Broker reconnect attempts")
+        lines.append(f"purethink_broker_reconnect_attempts_total {connection.reconnect_attempts}")
+        lines += _header("purethink_broker_recovery_seconds", "histogram",
+                         "Time from broker disconnect until every device reported state again")
+        lines += _histogram("purethink_broker_recovery_seconds", "", connection.recovery_time)
+        lines += _header("purethink_messages_superseded_total", "counter",
+                         "Messages replaced by a newer one for the same device before processing")
+        lines.append(f"purethink_messages_superseded_total {connection.superseded}")
+
+    return "\n".join(lines) + "\n"
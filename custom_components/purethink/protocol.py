@@ -1,194 +1,319 @@
 import json
 import logging
 import random
-
-from .const import DOMAIN
+from functools import lru_cache
+from typing import NamedTuple
 
 _LOGGER = logging.getLogger(__name__)
 
 
+# 상태/명령 패킷 비트 필드 정의 (이름, 바이트 오프셋, 비트 오프셋(MSB 기준), 비트 길이)
+# 상태 패킷(A8A81721/A8A81722)과 CMD 패킷(A8A81722)은 5~18번째 바이트 배치가 동일하므로
+# 디코더와 인코더가 같은 테이블을 사용한다.
+FIELD_LAYOUT = (
+    # 5번째 바이트 (0x21) - 전원, 팬 속도, AI 모드, 수면 모드, 입력 감지
+    ("power", 4, 0, 1),
+    ("fan_speed", 4, 1, 3),
+    ("ai_mode", 4, 4, 1),
+    ("sleep_mode", 4, 5, 2),
+    ("input_occurred", 4, 7, 1),
+
+    # 6번째 바이트 (0x22) - 악취(odor), 압력 모드, WiFi 상태
+    ("odor", 5, 0, 2),
+    ("pressure_mode", 5, 2, 2),
+    ("wifi", 5, 5, 3),
+
+    # 7번째 바이트 (0x23) - 팬 흡기, 팬 배기, 예약된 비트
+    ("fan_in", 6, 0, 1),
+    ("fan_out", 6, 1, 1),
+    ("reserved_bits", 6, 2, 6),
+
+    # 8번째 바이트 (0x24) - 알람 상태
+    ("fan1_alarm", 7, 0, 1),
+    ("fan2_alarm", 7, 1, 1),
+    ("dust_sensor_alarm", 7, 2, 1),
+    ("co2_sensor_alarm", 7, 3, 1),
+    ("filter_alarm", 7, 4, 1),
+    ("heat_exchanger_alarm", 7, 5, 1),
+
+    # 9-14바이트: 측정값
+    ("co2", 8, 1, 13),
+    ("pm1", 8, 14, 10),
+    ("pm25", 8, 24, 10),
+    ("pm10", 8, 34, 10),
+
+    # 15-18바이트: 필터 (리셋 플래그 1비트 + 1비트 공백 + 사용 시간 14비트)
+    ("prefilter_reset", 14, 0, 1),
+    ("prefilter_hours", 14, 2, 14),
+    ("hepafilter_reset", 16, 0, 1),
+    ("hepafilter_hours", 16, 2, 14),
+)
+
+
+class DeviceState(NamedTuple):
+    """디코드된 상태 패킷 (FIELD_LAYOUT 순서의 불변 레코드, 명령 생성 시 _replace로 필드만 교체)"""
+    power: int
+    fan_speed: int
+    ai_mode: int
+    sleep_mode: int
+    input_occurred: int
+    odor: int
+    pressure_mode: int
+    wifi: int
+    fan_in: int
+    fan_out: int
+    reserved_bits: int
+    fan1_alarm: int
+    fan2_alarm: int
+    dust_sensor_alarm: int
+    co2_sensor_alarm: int
+    filter_alarm: int
+    heat_exchanger_alarm: int
+    co2: int
+    pm1: int
+    pm25: int
+    pm10: int
+    prefilter_reset: int
+    prefilter_hours: int
+    hepafilter_reset: int
+    hepafilter_hours: int
+
+
+if DeviceState._fields != tuple(name for name, *_ in FIELD_LAYOUT):
+    raise ValueError("DeviceState fields do not match FIELD_LAYOUT")
+
+# 상태를 받기 전 명령을 만들 때의 기준값 (팬 속도 4, 나머지 0)
+DEFAULT_STATE = DeviceState._make([0] * len(DeviceState._fields))._replace(fan_speed=4)
+
+# 필드 테이블이 차지하는 바이트 구간 [FIELD_START, FIELD_END)
+FIELD_START = 4
+FIELD_END = 18
+
+PACKET_HEADER_LEN = 4
+STATUS_HEADER_HEX = "A8A81721"
+CMD_HEADER_HEX = "A8A81722"
+CMD_LENGTH = 23  # 바이트 (hex 46자)
+
+
+def _compile_layout(layout) -> tuple:
+    """필드 테이블을 (이름, shift, mask) 목록으로 한 번만 변환"""
+    span_bits = (FIELD_END - FIELD_START) * 8
+    compiled = []
+    for name, byte_offset, bit_offset, width in layout:
+        end_bit = (byte_offset - FIELD_START) * 8 + bit_offset + width
+        if byte_offset < FIELD_START or end_bit > span_bits:
+            raise ValueError(f"Field {name} is outside the field span")
+        compiled.append((name, span_bits - end_bit, (1 << width) - 1))
+    return tuple(compiled)
+
+
+_FIELDS = _compile_layout(FIELD_LAYOUT)
+_FIELD_INDEX = {name: (shift, mask) for name, shift, mask in _FIELDS}
+
+
+def decode_packet(raw: bytes) -> DeviceState:
+    """패킷 바이트에서 모든 필드를 정수로 추출해 DeviceState로 반환"""
+    if len(raw) < FIELD_END:
+        raise ValueError(f"Packet too short: {len(raw)} bytes")
+    value = int.from_bytes(raw[FIELD_START:FIELD_END], "big")
+    return DeviceState._make([(value >> shift) & mask for _, shift, mask in _FIELDS])
+
+
+def decode_fields(raw: bytes) -> dict:
+    """패킷 바이트의 모든 필드를 {이름: 값} 으로 반환"""
+    return decode_packet(raw)._asdict()
+
+
+def decode_state(payload: str) -> DeviceState:
+    """상태 패킷(hex)을 DeviceState로 디코드"""
+    return decode_packet(bytes.fromhex(payload))
+
+
+def encode_fields(fields: dict) -> bytes:
+    """필드 값을 필드 구간 바이트로 변환 (지정되지 않은 필드는 0)"""
+    value = 0
+    for name, field_value in fields.items():
+        shift, mask = _FIELD_INDEX[name]
+        value |= (int(field_value) & mask) << shift
+    return value.to_bytes(FIELD_END - FIELD_START, "big")
+
+
 def parse_status_packet(payload: str) -> dict:
     """상태 패킷 파싱 (전체 필드 구현)"""
-    _LOGGER.debug(f"Parsing raw packet: {payload}...")
+    _LOGGER.debug("Parsing raw packet: %s...", payload)
     try:
-        return {
-            # 5번째 바이트 (0x21) - 전원, 팬 속도, AI 모드, 수면 모드, 입력 감지
-            'power': _parse_bits(payload[8:10], 0, 1),
-            'fan_speed': _parse_bits(payload[8:10], 1, 3),
-            'ai_mode': _parse_bits(payload[8:10], 4, 1),
-            'sleep_mode': _parse_bits(payload[8:10], 5, 2),
-            'input_occurred': _parse_bits(payload[8:10], 7, 1),
-
-            # 6번째 바이트 (0x22) - 악취(odor), 압력 모드, WiFi 상태
-            'odor': _parse_bits(payload[10:12], 0, 2),
-            'pressure_mode': _parse_bits(payload[10:12], 2, 2),
-            'wifi': _parse_bits(payload[10:12], 5, 3),
-
-            # 7번째 바이트 (0x23) - 팬 흡기, 팬 배기, 예약된 비트
-            'fan_in': _parse_bits(payload[12:14], 0, 1),
-            'fan_out': _parse_bits(payload[12:14], 1, 1),
-            'reserved_bits': _parse_bits(payload[12:14], 2, 6),
-
-            # 8번째 바이트 (0x24) - 알람 상태
-            'fan1_alarm': _parse_bits(payload[14:16], 0, 1),
-            'fan2_alarm': _parse_bits(payload[14:16], 1, 1),
-            'dust_sensor_alarm': _parse_bits(payload[14:16], 2, 1),
-            'co2_sensor_alarm': _parse_bits(payload[14:16], 3, 1),
-            'filter_alarm': _parse_bits(payload[14:16], 4, 1),
-            'heat_exchanger_alarm': _parse_bits(payload[14:16], 5, 1),
-
-            # 9-14바이트: 측정값
-            'co2': _parse_bits(payload[16:28], 1, 13),
-            'pm1': _parse_bits(payload[16:28], 14, 10),
-            'pm25': _parse_bits(payload[16:28], 24, 10),
-            'pm10': _parse_bits(payload[16:28], 34, 10),
-
-            # 15-18바이트: 필터
-            'prefilter': _parse_filter(payload[28:36], 2, 14),
-            'hepafilter': _parse_filter(payload[28:36], 18, 14)
-        }
+        parsed = decode_fields(bytes.fromhex(payload))
     except Exception as e:
         _LOGGER.error(f"Packet parsing failed: {str(e)}", exc_info=True)
         raise
 
+    parsed["prefilter"] = {
+        'reset_flag': bool(parsed.pop("prefilter_reset")),
+        'hours': parsed.pop("prefilter_hours")
+    }
+    parsed["hepafilter"] = {
+        'reset_flag': bool(parsed.pop("hepafilter_reset")),
+        'hours': parsed.pop("hepafilter_hours")
+    }
+    return parsed
 
-def _parse_bits(hex_str: str, start_bit: int, length: int) -> int:
-    """비트 단위 파싱"""
-    try:
-        full_bits = bin(int(hex_str, 16))[2:].zfill(len(hex_str) * 4)
-        return int(full_bits[start_bit:start_bit + length], 2)
-    except ValueError as e:
-        _LOGGER.error(f"Bit parsing error: {hex_str} [{start_bit}:{length}]")
-        raise
 
+# 필터 리셋 시 기록하는 사용 시간 (기존 B15~B18: 135 208 / 143 160)
+FILTER_RESET_HOURS = {
+    "prefilter": 2000,
+    "hepafilter": 4000,
+}
+
+
+def build_packet(header: str, fields: dict) -> str:
+    """헤더(hex)와 필드 값으로 패킷 contents(hex 46자) 생성 - 체크섬은 앞선 모든 바이트의 합"""
+    packet = bytearray(CMD_LENGTH)
+    packet[:PACKET_HEADER_LEN] = bytes.fromhex(header)
+    packet[FIELD_START:FIELD_END] = encode_fields(fields)
+    packet[-2:] = (sum(packet[:-2]) & 0xFFFF).to_bytes(2, "big")
+    return packet.hex().upper()
+
+
+# 명령 인자 문자열 -> 패킷 필드 값
+PRESET_MODES = ("Manual", "Auto", "Sleep 1", "Sleep 2", "Sleep 3")
+PRESSURE_MODE_VALUES = {"정압": 0, "양압": 1, "음압": 2}
+FAN_MODE_BITS = {"환기 꺼짐": (0, 0), "배기": (0, 1), "흡기": (1, 0), "흡/배기": (1, 1)}
+DEVICE_MODE_BITS = {  # (ai_mode, sleep_mode)
+    "Manual": (0, 0),
+    "Auto": (1, 0),
+    "Sleep 1": (0, 1),
+    "Sleep 2": (0, 2),
+    "Sleep 3": (0, 3),
+}
+
+# CMD contents 캐시 크기 (명령 필드 조합은 전원 x 속도 x 모드 x 압력 x 흡배기 x 필터 리셋 수천 가지)
+COMMAND_CACHE_SIZE = 4096
+
+
+def normalize_command(**kwargs) -> dict:
+    """명령 인자(mode, device_mode, fan_mode, pressure_mode 문자열)를 패킷 필드 값으로 변환
+
+    변환된 결과를 다시 넣어도 같은 값이 나오므로 여러 명령을 필드 단위로 합칠 때 사용한다.
+    """
+    # "mode" 파라미터가 전원 제어("on", "off")인지 기기 모드 변경인지 구분
+    if "mode" in kwargs:
+        mode = kwargs.pop("mode")
+        if mode in ["on", "off"]:
+            kwargs["power"] = 1 if mode == "on" else 0
+        else:
+            # 기기 모드 변경인 경우 "mode"를 "device_mode"로 처리하고, 전원은 켜진 상태(1)를 기본값으로 설정
+            kwargs["device_mode"] = mode
+            if "power" not in kwargs:
+                kwargs["power"] = 1
 
-def _parse_filter(hex_str: str, start_bit: int, length: int) -> dict:
-    return {
-        'reset_flag': bool(_parse_bits(hex_str, start_bit - 2, 1)),
-        'hours': _parse_bits(hex_str, start_bit, length)
+    # device_mode에 따른 ai_mode, sleep_mode 설정
+    if "device_mode" in kwargs:
+        mode = kwargs.pop("device_mode")
+        bits = DEVICE_MODE_BITS.get(mode)
+        if bits is None and "Sleep" in mode:
+            try:
+                sleep_value = int(mode.split()[1])
+            except Exception:
+                sleep_value = 1  # 기본값
+            bits = (0, sleep_value)
+        if bits is not None:
+            kwargs["ai_mode"], kwargs["sleep_mode"] = bits
+
+    # pressure_mode 문자열을 숫자로 변환 (정압:0, 양압:1, 음압:2)
+    if isinstance(kwargs.get("pressure_mode"), str):
+        kwargs["pressure_mode"] = PRESSURE_MODE_VALUES.get(kwargs["pressure_mode"], 0)
+
+    # fan_mode 문자열을 흡기/배기 비트로 변환
+    if "fan_mode" in kwargs:
+        kwargs["fan_in"], kwargs["fan_out"] = FAN_MODE_BITS.get(kwargs.pop("fan_mode"), (0, 0))
+
+    return kwargs
+
+
+def state_command(power: bool | None = None, preset: str | None = None, fan_speed: int | None = None,
+                  pressure_mode: str | None = None, fan_in: bool | None = None, fan_out: bool | None = None,
+                  filter_reset: str | None = None) -> dict:
+    """여러 필드를 한 번에 바꾸는 명령 인자 검증 후 패킷 필드 값으로 변환 (CMD 패킷 하나로 전송)
+
+    지정하지 않은 필드는 현재 상태를 유지한다. preset만 지정하면 기존 모드 변경처럼 전원도 켠다.
+    """
+    fields = {}
+    if preset is not None:
+        if preset not in PRESET_MODES:
+            raise ValueError(f"Invalid preset: {preset}")
+        fields["mode"] = preset
+    if power is not None:
+        fields["power"] = int(bool(power))
+    if fan_speed is not None:
+        if not 0 <= int(fan_speed) <= 5:
+            raise ValueError(f"Invalid fan speed: {fan_speed}")
+        fields["fan_speed"] = int(fan_speed)
+    if pressure_mode is not None:
+        if pressure_mode not in PRESSURE_MODE_VALUES:
+            raise ValueError(f"Invalid pressure mode: {pressure_mode}")
+        fields["pressure_mode"] = pressure_mode
+    if fan_in is not None:
+        fields["fan_in"] = int(bool(fan_in))
+    if fan_out is not None:
+        fields["fan_out"] = int(bool(fan_out))
+    if filter_reset is not None:
+        if filter_reset not in FILTER_RESET_HOURS:
+            raise ValueError(f"Invalid filter type: {filter_reset}")
+        fields["filter_reset"] = filter_reset
+    if not fields:
+        raise ValueError("No state fields given")
+    return normalize_command(**fields)
+
+
+def new_topic_id() -> str:
+    """CMD 패킷의 topic_id 생성"""
+    return str(random.randint(100000, 200000))
+
+
+@lru_cache(maxsize=COMMAND_CACHE_SIZE)
+def _command_contents(power: int, fan_speed: int, ai_mode: int, sleep_mode: int, pressure_mode: int,
+                      fan_in: int, fan_out: int, filter_reset: str | None) -> str:
+    """명령 필드 조합별 CMD contents (hex 46자) - 같은 장면을 반복 전송하면 캐시에서 바로 반환"""
+    fields = {
+        "power": power,
+        "fan_speed": fan_speed,
+        "ai_mode": ai_mode,
+        "sleep_mode": sleep_mode,
+        "input_occurred": 1,
+        "pressure_mode": pressure_mode,
+        "fan_in": fan_in,
+        "fan_out": fan_out,
     }
 
+    # 필터 리셋: 리셋 플래그와 초기 사용 시간을 함께 기록 (프리필터 2000시간, 헤파필터 4000시간)
+    if filter_reset is not None:
+        fields[f"{filter_reset}_reset"] = 1
+        fields[f"{filter_reset}_hours"] = FILTER_RESET_HOURS[filter_reset]
+    return build_packet(CMD_HEADER_HEX, fields)
 
-def generate_command(device_id: str, hass, **kwargs) -> str:
+
+def generate_command(state: DeviceState | None, topic_id: str | None = None, **kwargs) -> str:
+    """기기의 현재 상태에 명령 인자를 덮어써 CMD 메시지(JSON) 생성"""
     try:
-        state = {}
-        for entry_id, data in hass.data.get(DOMAIN, {}).items():
-            if data.get("state") and data.get("command_topic"):
-                if device_id in entry_id or device_id in data.get("command_topic", ""):
-                    state = data.get("state", {})
-                    break
-
-        # "mode" 파라미터가 전원 제어("on", "off")인지 기기 모드 변경인지 구분
-        if "mode" in kwargs:
-            if kwargs["mode"] in ["on", "off"]:
-                kwargs["power"] = 1 if kwargs["mode"] == "on" else 0
-            else:
-                # 기기 모드 변경인 경우 "mode"를 "device_mode"로 처리하고, 전원은 켜진 상태(1)를 기본값으로 설정
-                kwargs["device_mode"] = kwargs["mode"]
-                kwargs.pop("mode")
-                if "power" not in kwargs:
-                    kwargs["power"] = 1
-
-        # device_mode에 따른 ai_mode, sleep_mode 설정
-        if "device_mode" in kwargs:
-            mode = kwargs["device_mode"]
-            if mode == "Manual":
-                kwargs["ai_mode"] = 0
-                kwargs["sleep_mode"] = 0
-            elif mode == "Auto":
-                kwargs["ai_mode"] = 1
-                kwargs["sleep_mode"] = 0
-            elif "Sleep" in mode:
-                try:
-                    sleep_value = int(mode.split()[1])
-                except Exception:
-                    sleep_value = 1  # 기본값
-                kwargs["ai_mode"] = 0
-                kwargs["sleep_mode"] = sleep_value
-
-        # pressure_mode 문자열을 숫자로 변환 (정압:0, 양압:1, 음압:2)
-        if "pressure_mode" in kwargs:
-            kwargs["pressure_mode"] = {
-                "정압": 0,
-                "양압": 1,
-                "음압": 2
-            }.get(kwargs["pressure_mode"], 0)
-
-        # fan_mode 문자열을 흡기/배기 비트로 변환
-        if "fan_mode" in kwargs:
-            kwargs["fan_in"], kwargs["fan_out"] = {
-                "환기 꺼짐": (0, 0),
-                "배기": (0, 1),
-                "흡기": (1, 0),
-                "흡/배기": (1, 1)
-            }.get(kwargs["fan_mode"], (0, 0))
-
-        # 기존 상태와 새로운 인자 합치기
-        combined = {**state, **kwargs}
-        fan_speed = combined.get("fan_speed", 4)
-        power = combined.get("power", 0)
-        ai_mode = combined.get("ai_mode", 0)
-        sleep_mode = combined.get("sleep_mode", 0)
-        pressure_mode = combined.get("pressure_mode", 0)
-        fan_in = combined.get("fan_in", 0)
-        fan_out = combined.get("fan_out", 0)
-
-        topic_id = str(random.randint(100000, 200000))
-
-        # B5: 전원, 팬 속도, AI 모드, 수면 모드 (각각 비트 연산 적용)
-        bin_power = int(power) << 7
-        bin_fan_speed = int(fan_speed) << 4
-        bin_ai_mode = int(ai_mode) << 3
-        bin_sleep_mode = int(sleep_mode) << 1
-        b5 = bin_power | bin_fan_speed | bin_ai_mode | bin_sleep_mode | 1
-
-        # B6: 압력 모드 (숫자로 변환된 값을 사용)
-        b6 = int(pressure_mode) << 4
-
-        # B7: 팬 모드 (흡기, 배기)
-        bin_fan_in = int(fan_in) << 7
-        bin_fan_out = int(fan_out) << 6
-        b7 = bin_fan_in | bin_fan_out
-
-        # B15, B16(프리필터 : 2000시간 - 135 208, 3000시간 - 139 184, 40000시간 - 143 160)
-        # B17, B18(헤파필터 : 2000시간 - 135 208, 3000시간 - 139 184, 40000시간 - 143 160)
-        b15 = b16 = b17 = b18 = 0
-        if "filter_reset" in kwargs:
-            reset_type = kwargs["filter_reset"]
-            if reset_type == "prefilter":
-                b15 = 135
-                b16 = 208
-            elif reset_type == "hepafilter":
-                b17 = 143
-                b18 = 160
-            else:
-                _LOGGER.error(f"Invalid filter reset type: {reset_type}")
-                return None
-
-        # Checksum 계산 (기본값 393에 각 바이트 값을 더함)
-        checksum = 393 + b5 + b6 + b7 + b15 + b16 + b17 + b18
-
-        # 전체 명령어 구성 (총 46자여야 함)
-        payload = (
-            f"{b5:02X}{b6:02X}{b7:02X}"
-            f"{'00' * 7}"
-            f"{b15:02X}{b16:02X}{b17:02X}{b18:02X}"
-            f"{'00' * 3}"
-            f"{checksum:04X}"
-        )
-        contents = f"A8A81722{payload}"
+        kwargs = normalize_command(**kwargs)
+        filter_reset = kwargs.pop("filter_reset", None)
+        if filter_reset is not None and filter_reset not in FILTER_RESET_HOURS:
+            _LOGGER.error(f"Invalid filter reset type: {filter_reset}")
+            return None
 
-        if len(contents) != 46:
-            _LOGGER.warning(f"[generate_command] CMD 길이 불일치: {len(contents)}자 (예상: 46자)")
+        # 기존 상태에 명령 필드만 교체
+        combined = (state or DEFAULT_STATE)._replace(**kwargs)
+        contents = _command_contents(
+            combined.power, combined.fan_speed, combined.ai_mode, combined.sleep_mode,
+            combined.pressure_mode, combined.fan_in, combined.fan_out, filter_reset,
+        )
 
-        command = {
-            "topic_id": topic_id,
-            "type": "CMD",
-            "contents": contents
-        }
+        if topic_id is None:
+            topic_id = new_topic_id()
 
-        _LOGGER.debug(f"[generate_command] 최종 CMD ▶ {contents}")
-        return json.dumps(command)
+        _LOGGER.debug("[generate_command] 최종 CMD ▶ %s", contents)
+        # json.dumps({"topic_id", "type", "contents"}) 와 같은 문자열 - topic_id만 매번 끼워 넣음
+        return f'{{"topic_id": {json.dumps(topic_id)}, "type": "CMD", "contents": "{contents}"}}'
 
     except Exception as e:
         _LOGGER.error(f"[generate_command] 생성 실패: {e}", exc_info=True)
@@ -0,0 +1,54 @@
+from homeassistant.core import HomeAssistant, callback
+from homeassistant.helpers.storage import Store
+
+from .const import DATA_RESTORE, DOMAIN
+
+STORAGE_VERSION = 1
+STORAGE_KEY = f"{DOMAIN}.restore"
+# 전원을 연달아 껐다 켜도 디스크 쓰기는 한 번으로 묶이도록 지연 저장 (초)
+SAVE_DELAY = 10
+
+
+def get_restore_store(hass: HomeAssistant) -> "RestoreStore":
+    """공유 복원 정보 저장소 반환"""
+    return hass.data[DATA_RESTORE]
+
+
+class RestoreStore:
+    """기기별 전원 복원 정보 (마지막 모드, 팬 속도) - 시작 시 한 번 읽고 변경은 지연 저장"""
+
+    def __init__(self, hass: HomeAssistant):
+        self._store = Store(hass, STORAGE_VERSION, STORAGE_KEY)
+        # device_id -> {"device_mode", "fan_speed"}
+        self._data: dict[str, dict] = {}
+
+    async def async_load(self):
+        self._data = await self._store.async_load() or {}
+
+    @callback
+    def async_restore(self, device):
+        """저장된 값을 기기 런타임 데이터에 적용"""
+        saved = self._data.get(device.device_id)
+        if saved is None:
+            return
+        device.last_device_mode = saved.get("device_mode", device.last_device_mode)
+        device.last_fan_speed = saved.get("fan_speed", device.last_fan_speed)
+
+    @callback
+    def async_remember(self, device):
+        """기기의 현재 복원 정보를 기록 (메모리만 바꾸고 디스크 쓰기는 예약)"""
+        saved = {"device_mode": device.last_device_mode, "fan_speed": device.last_fan_speed}
+        if self._data.get(device.device_id) == saved:
+            return
+        self._data[device.device_id] = saved
+        self._store.async_delay_save(self._data_to_save, SAVE_DELAY)
+
+    @callback
+    def async_forget(self, device_id: str):
+        """삭제된 기기의 복원 정보 제거"""
+        if self._data.pop(device_id, None) is not None:
+            self._store.async_delay_save(self._data_to_save, SAVE_DELAY)
+
+    @callback
+    def _data_to_save(self) -> dict:
+        return self._data
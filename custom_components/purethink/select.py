@@ -1,12 +1,11 @@
 import logging
 
-from homeassistant.components import mqtt
 from homeassistant.components.select import SelectEntity
+from homeassistant.core import callback
 from homeassistant.helpers.dispatcher import async_dispatcher_connect
 
-from . import mqtt_client
 from .const import DOMAIN, PRESSURE_MODES
-from .protocol import generate_command
+from .device import async_send_command, get_device
 
 _LOGGER = logging.getLogger(__name__)
 
@@ -14,29 +13,26 @@ _LOGGER = logging.getLogger(__name__)
 # custom_components/purethink/select.py
 
 async def async_setup_entry(hass, config_entry, async_add_entities):
-    entry_data = hass.data[DOMAIN][config_entry.entry_id]
-    command_topic = entry_data["command_topic"]
-    device_info = entry_data["device"]
+    device = get_device(hass, config_entry.entry_id)
     config = config_entry.data
 
     selects = [
-        BaseSelect(config, command_topic, device_info, "pressure_mode", PRESSURE_MODES, "Pressure Mode",
-                   config_entry.entry_id),
-        FanModeSelect(config_entry, command_topic, device_info),
+        BaseSelect(config, device, "pressure_mode", PRESSURE_MODES, "Pressure Mode", config_entry.entry_id),
+        FanModeSelect(config_entry, device),
     ]
     async_add_entities(selects)
 
 
 class BaseSelect(SelectEntity):
 
-    def __init__(self, config, command_topic, device_info, entity_type, options, label_suffix, entry_id,
-                 default_index=0):
+    def __init__(self, config, device, entity_type, options, label_suffix, entry_id, default_index=0):
         self._config = config
-        self._command_topic = command_topic
-        self._device_info = device_info
+        self._device = device
+        self._device_info = device.device_info
         self._entity_type = entity_type
         self._entry_id = entry_id
         self._default_index = default_index
+        self._source_fields = frozenset({entity_type})
 
         self._attr_unique_id = f"{config['device_id']}_{entity_type}"
         self._attr_name = f"{config['friendly_name']} {label_suffix}"
@@ -47,6 +43,11 @@ class BaseSelect(SelectEntity):
     def device_info(self):
         return self._device_info
 
+    @property
+    def available(self) -> bool:
+        """기기가 최근 상태 패킷을 보냈고 엔티티 값이 있을 때만 사용 가능"""
+        return self._device.available and self._attr_available
+
     async def async_added_to_hass(self):
         _LOGGER.debug(f"[{self.name}] async_added_to_hass called")
         self.async_on_remove(
@@ -57,21 +58,20 @@ class BaseSelect(SelectEntity):
             )
         )
 
-    def _handle_update(self):
-        state = self.hass.data[DOMAIN][self._entry_id]["state"]
-        self._attr_current_option = self._attr_options[state.get(self._entity_type, self._default_index)]
+    @callback
+    def _handle_update(self, changed):
+        if not changed & self._source_fields:
+            return
+
+        state = self._device.state
+        self._attr_current_option = self._attr_options[getattr(state, self._entity_type)]
         self._attr_available = True
-        self.schedule_update_ha_state()
+        self.async_write_ha_state()
 
     async def async_select_option(self, option: str):
         try:
-            payload = generate_command(
-                self._config['device_id'],
-                self.hass,
-                **{self._entity_type: option}
-            )
-            mqtt_client.publish(self._command_topic, payload, qos=1)
-            _LOGGER.debug(f"[{self.__class__.__name__}] Command sent ▶ {payload}")
+            async_send_command(self.hass, self._entry_id, **{self._entity_type: option})
+            _LOGGER.debug(f"[{self.__class__.__name__}] Command queued ▶ {self._entity_type}={option}")
         except Exception as e:
             _LOGGER.error(f"[{self.__class__.__name__}] 명령 전송 실패: {e}", exc_info=True)
 
@@ -83,11 +83,12 @@ class FanModeSelect(SelectEntity):
         (1, 0): "흡기",
         (1, 1): "흡/배기"
     }
+    _source_fields = frozenset({"fan_in", "fan_out"})
 
-    def __init__(self, entry, command_topic, device_info):
+    def __init__(self, entry, device):
         self._entry = entry
-        self._command_topic = command_topic
-        self._device_info = device_info
+        self._device = device
+        self._device_info = device.device_info
         config = entry.data
         self._attr_unique_id = f"{config['device_id']}_fan_mode"
         self._attr_name = f"{config['friendly_name']} Fan Mode"
@@ -99,6 +100,11 @@ class FanModeSelect(SelectEntity):
     def device_info(self):
         return self._device_info
 
+    @property
+    def available(self) -> bool:
+        """기기가 최근 상태 패킷을 보냈고 엔티티 값이 있을 때만 사용 가능"""
+        return self._device.available and self._attr_available
+
     async def async_added_to_hass(self):
         _LOGGER.debug(f"[{self.name}] async_added_to_hass called")
         self.async_on_remove(
@@ -109,22 +115,21 @@ class FanModeSelect(SelectEntity):
             )
         )
 
-    def _handle_update(self):
-        state = self.hass.data[DOMAIN][self._entry.entry_id]["state"]
-        fan_in = state.get("fan_in", 0)
-        fan_out = state.get("fan_out", 0)
+    @callback
+    def _handle_update(self, changed):
+        if not changed & self._source_fields:
+            return
+
+        state = self._device.state
+        fan_in = state.fan_in
+        fan_out = state.fan_out
         self._attr_current_option = self.FAN_MODES.get((fan_in, fan_out), "Fan In-On Fan Out-On")
         self._attr_available = True
-        self.schedule_update_ha_state()
+        self.async_write_ha_state()
 
     async def async_select_option(self, option: str):
         try:
-            payload = generate_command(
-                self._entry.data["device_id"],
-                self.hass,
-                fan_mode=option
-            )
-            mqtt_client.publish(self._command_topic, payload, qos=1)
-            _LOGGER.debug(f"[FanModeSelect] Command sent ▶ {payload}")
+            async_send_command(self.hass, self._entry.entry_id, fan_mode=option)
+            _LOGGER.debug(f"[FanModeSelect] Command queued ▶ fan_mode={option}")
         except Exception as e:
             _LOGGER.error(f"[FanModeSelect] 명령 전송 실패: {e}", exc_info=True)
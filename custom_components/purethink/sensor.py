@@ -1,36 +1,103 @@
 import logging
+import time
 
-from homeassistant.components.sensor import SensorEntity
+from homeassistant.components.sensor import SensorEntity, SensorStateClass
+from homeassistant.const import MATCH_ALL, EntityCategory
+from homeassistant.core import callback
 from homeassistant.helpers.dispatcher import async_dispatcher_connect
 
-from .const import DOMAIN
+from .const import DATA_CONNECTION, DOMAIN, FORCE_WRITE_FACTOR, SENSOR_WRITE_LIMITS, SENSOR_WRITE_OPTIONS
+from .device import get_device
+from .history import HISTORY_FIELDS
 
 _LOGGER = logging.getLogger(__name__)
 
 
 async def async_setup_entry(hass, config_entry, async_add_entities):
-    entry_data = hass.data[DOMAIN][config_entry.entry_id]
-    device_info = entry_data["device"]
+    device = get_device(hass, config_entry.entry_id)
+    options = config_entry.options
     sensors = [
-        AirQualitySensor(config_entry, device_info, "co2", "CO₂", "ppm", "mdi:molecule-co2"),
-        AirQualitySensor(config_entry, device_info, "pm1", "PM 1.0", "µg/m³", "mdi:weather-dust"),
-        AirQualitySensor(config_entry, device_info, "pm25", "PM 2.5", "µg/m³", "mdi:weather-dust"),
-        AirQualitySensor(config_entry, device_info, "pm10", "PM 10.0", "µg/m³", "mdi:weather-dust"),
-        AirQualitySensor(config_entry, device_info, "odor", "Odor", "level", "mdi:scent"),
-        WifiSensor(config_entry, device_info, "wifi", "Wi-Fi Signal", "%", "mdi:wifi"),
-        FilterSensor(config_entry, device_info, "prefilter", "Pre Filter Used Tine", "hours", "mdi:clock"),
-        FilterSensor(config_entry, device_info, "hepafilter", "HEPA Filter Used Time", "hours", "mdi:clock"),
-        AlarmSensor(config_entry, device_info, "filter", "Filter Alarm", None, "mdi:alert-circle-outline"),
-        AlarmSensor(config_entry, device_info, "fan", "Fan Alarm", None, "mdi:fan-alert")
+        AirQualitySensor(config_entry, device, "co2", "CO₂", "ppm", "mdi:molecule-co2",
+                         write_filter(options, "co2")),
+        AirQualitySensor(config_entry, device, "pm1", "PM 1.0", "µg/m³", "mdi:weather-dust",
+                         write_filter(options, "pm1")),
+        AirQualitySensor(config_entry, device, "pm25", "PM 2.5", "µg/m³", "mdi:weather-dust",
+                         write_filter(options, "pm25")),
+        AirQualitySensor(config_entry, device, "pm10", "PM 10.0", "µg/m³", "mdi:weather-dust",
+                         write_filter(options, "pm10")),
+        AirQualitySensor(config_entry, device, "odor", "Odor", "level", "mdi:scent", write_filter(options, "odor")),
+        AirQualityAverageSensor(config_entry, device, "co2", "CO₂ 1h Average", "ppm", "mdi:molecule-co2"),
+        AirQualityAverageSensor(config_entry, device, "pm1", "PM 1.0 1h Average", "µg/m³", "mdi:weather-dust"),
+        AirQualityAverageSensor(config_entry, device, "pm25", "PM 2.5 1h Average", "µg/m³", "mdi:weather-dust"),
+        AirQualityAverageSensor(config_entry, device, "pm10", "PM 10.0 1h Average", "µg/m³", "mdi:weather-dust"),
+        WifiSensor(config_entry, device, "wifi", "Wi-Fi Signal", "%", "mdi:wifi", write_filter(options, "wifi")),
+        FilterSensor(config_entry, device, "prefilter", "Pre Filter Used Tine", "hours", "mdi:clock"),
+        FilterSensor(config_entry, device, "hepafilter", "HEPA Filter Used Time", "hours", "mdi:clock"),
+        AlarmSensor(config_entry, device, "filter", "Filter Alarm", None, "mdi:alert-circle-outline"),
+        AlarmSensor(config_entry, device, "fan", "Fan Alarm", None, "mdi:fan-alert"),
+        CommandLatencySensor(config_entry, device),
+        MessageRateSensor(config_entry, device, "received", "Messages Received"),
+        MessageRateSensor(config_entry, device, "rejected", "Messages Rejected"),
+        MessageRateSensor(config_entry, device, "duplicates", "Messages Suppressed"),
+        MessageRateSensor(config_entry, device, "parsed", "Messages Parsed"),
+        MessageRateSensor(config_entry, device, "dispatched", "Messages Dispatched"),
+        ProcessingTimeSensor(config_entry, device, "decode_time", "Decode Time"),
+        ProcessingTimeSensor(config_entry, device, "dispatch_time", "Dispatch Time"),
+        CommandsSentSensor(config_entry, device),
+        ReconnectsSensor(config_entry, device),
     ]
     async_add_entities(sensors)
 
 
+def write_filter(options, sensor_type: str) -> "WriteFilter":
+    """센서 종류별 기록 제한 - 옵션에 값이 있으면 옵션, 없으면 SENSOR_WRITE_LIMITS 기본값"""
+    keys = SENSOR_WRITE_OPTIONS.get(sensor_type, (None, None, None))
+    return WriteFilter(*(options.get(key, default) for key, default in zip(keys, SENSOR_WRITE_LIMITS[sensor_type])))
+
+
+class WriteFilter:
+    """센서 상태 기록 여부 판단 - 최소 변화량, 최소 기록 간격, 급변 시 즉시 기록, 주기적 기록(heartbeat)
+
+    엔티티별 타이머 없이 상태 패킷이 올 때마다 판단하므로, 미뤄둔 작은 변화는 다음 패킷에서 조건이 맞으면 기록된다.
+    """
+
+    __slots__ = ("delta", "force_delta", "min_interval", "heartbeat", "value", "available", "written_at")
+
+    def __init__(self, delta: float, min_interval: float, heartbeat: float):
+        self.delta = delta
+        self.force_delta = delta * FORCE_WRITE_FACTOR
+        self.min_interval = min_interval
+        self.heartbeat = heartbeat
+        # 마지막으로 기록한 값, 가용 상태, 시각 (monotonic)
+        self.value = None
+        self.available = None
+        self.written_at = 0.0
+
+    def should_write(self, value, available: bool, now: float) -> bool:
+        """기록해야 하면 기록 값으로 갱신하고 True"""
+        if available == self.available and value == self.value:
+            return False
+        if available == self.available and value is not None and self.value is not None:
+            difference = abs(value - self.value)
+            elapsed = now - self.written_at
+            if not (
+                    (self.force_delta and difference >= self.force_delta)
+                    or (elapsed >= self.min_interval
+                        and (difference >= self.delta or (self.heartbeat and elapsed >= self.heartbeat)))
+            ):
+                return False
+        self.value = value
+        self.available = available
+        self.written_at = now
+        return True
+
+
 class BaseSensor(SensorEntity):
 
-    def __init__(self, entry, device_info, sensor_type, name, unit=None, icon=None):
+    def __init__(self, entry, device, sensor_type, name, unit=None, icon=None, write_filter=None):
         self._entry = entry
-        self._device_info = device_info
+        self._device = device
+        self._device_info = device.device_info
         self._sensor_type = sensor_type
         config = entry.data
         self._attr_unique_id = f"{config['device_id']}_{sensor_type}"
@@ -38,82 +105,280 @@ class BaseSensor(SensorEntity):
         self._attr_native_unit_of_measurement = unit
         self._attr_icon = icon
         self._attr_available = False
+        self._source_fields = frozenset({sensor_type})
+        self._write_filter = write_filter
 
     @property
     def device_info(self):
         return self._device_info
 
+    @property
+    def available(self) -> bool:
+        """기기가 최근 상태 패킷을 보냈고 엔티티 값이 있을 때만 사용 가능"""
+        return self._device.available and self._attr_available
+
     async def async_added_to_hass(self):
         _LOGGER.debug(f"[{self.name}] async_added_to_hass called")
         self.async_on_remove(
             async_dispatcher_connect(
                 self.hass,
                 f"{DOMAIN}_state_update_{self._entry.entry_id}",
-                self._update_state
+                self._handle_update
             )
         )
 
+    @callback
+    def _handle_update(self, changed):
+        """담당 필드가 바뀐 경우에만 상태 기록 (기록 제한이 있으면 조건을 만족할 때만)"""
+        write_filter = self._write_filter
+        if write_filter is None:
+            if not changed & self._source_fields:
+                return
+            self._update_state()
+            self.async_write_ha_state()
+            return
+
+        # 담당 필드가 그대로여도 미뤄둔 변화의 heartbeat, 가용 상태 변경은 확인
+        if changed & self._source_fields:
+            self._update_state()
+        if write_filter.should_write(self._attr_native_value, self.available, time.monotonic()):
+            self.async_write_ha_state()
+
     def _update_state(self):
-        state = self.hass.data[DOMAIN][self._entry.entry_id].get("state", {})
-        self._attr_native_value = state.get(self._sensor_type, None)
-        self._attr_available = self._attr_native_value is not None
+        self._attr_native_value = getattr(self._device.state, self._sensor_type)
+        self._attr_available = True
         _LOGGER.debug(
             f"[{self.name}] State updated: native_value={self._attr_native_value}, available={self._attr_available}")
-        self.schedule_update_ha_state()
 
 
 class AirQualitySensor(BaseSensor):
+    # 이동 통계 속성은 매 패킷 바뀌므로 레코더에 저장하지 않음
+    _unrecorded_attributes = frozenset({MATCH_ALL})
+
+    def __init__(self, entry, device, sensor_type, name, unit, icon, write_filter=None):
+        super().__init__(entry, device, sensor_type, name, unit, icon, write_filter)
+
+    @property
+    def extra_state_attributes(self):
+        """5/15/60분 평균, 최소, 최대, 시간가중 평균"""
+        if self._sensor_type not in HISTORY_FIELDS:
+            return None
+        history = self._device.history
+        now = time.monotonic()
+        attributes = {}
+        for span in history.windows:
+            stats = history.stats(self._sensor_type, span, now)
+            if stats is None:
+                return None
+            suffix = f"{span // 60}m"
+            attributes[f"mean_{suffix}"] = round(stats["mean"], 1)
+            attributes[f"min_{suffix}"] = stats["min"]
+            attributes[f"max_{suffix}"] = stats["max"]
+            attributes[f"average_{suffix}"] = round(stats["average"], 1)
+        return attributes
+
 
-    def __init__(self, entry, device_info, sensor_type, name, unit, icon):
-        super().__init__(entry, device_info, sensor_type, name, unit, icon)
+class AirQualityAverageSensor(BaseSensor):
+    """최근 1시간 시간가중 평균 (기본 비활성, 기록 조회 없이 링 버퍼 통계 사용)"""
+    _attr_entity_registry_enabled_default = False
+    _attr_state_class = SensorStateClass.MEASUREMENT
+    SPAN = 3600
+
+    def __init__(self, entry, device, sensor_type, name, unit, icon):
+        super().__init__(entry, device, sensor_type, name, unit, icon)
+        self._attr_unique_id = f"{entry.data['device_id']}_{sensor_type}_average_1h"
+
+    def _update_state(self):
+        stats = self._device.history.stats(self._sensor_type, self.SPAN, time.monotonic())
+        self._attr_native_value = round(stats["average"], 1) if stats is not None else None
+        self._attr_available = self._attr_native_value is not None
 
 
 class WifiSensor(BaseSensor):
-    def __init__(self, entry, device_info, sensor_type, name, unit, icon):
-        super().__init__(entry, device_info, sensor_type, name, unit, icon)
+    def __init__(self, entry, device, sensor_type, name, unit, icon, write_filter=None):
+        super().__init__(entry, device, sensor_type, name, unit, icon, write_filter)
 
     def _update_state(self):
-        state = self.hass.data[DOMAIN][self._entry.entry_id].get("state", {})
-        raw_value = state.get(self._sensor_type, 0)
+        raw_value = self._device.state.wifi
         self._attr_native_value = int((raw_value / 7) * 100) if raw_value else 0
         self._attr_available = True
         _LOGGER.debug(
             f"[{self.name}] State updated for WifiSensor: native_value={self._attr_native_value}, available={self._attr_available}")
-        self.schedule_update_ha_state()
 
 
 class FilterSensor(BaseSensor):
 
-    def __init__(self, entry, device_info, filter_type, name, unit, icon):
-        super().__init__(entry, device_info, f"{filter_type}", name, unit, icon)
+    def __init__(self, entry, device, filter_type, name, unit, icon):
+        super().__init__(entry, device, f"{filter_type}", name, unit, icon)
         self.filter_type = filter_type
+        self._hours_field = f"{filter_type}_hours"
+        self._reset_field = f"{filter_type}_reset"
+        self._source_fields = frozenset({self._hours_field, self._reset_field})
 
     def _update_state(self):
-        state = self.hass.data[DOMAIN][self._entry.entry_id].get("state", {})
-        self._attr_native_value = state.get(f"{self.filter_type}_hours", None)
-        self._attr_available = self._attr_native_value is not None
+        self._attr_native_value = getattr(self._device.state, self._hours_field)
+        self._attr_available = True
         _LOGGER.debug(
             f"[{self.name}] State updated for FilterSensor: native_value={self._attr_native_value}, available={self._attr_available}")
-        self.schedule_update_ha_state()
 
     @property
     def extra_state_attributes(self):
-        state = self.hass.data[DOMAIN][self._entry.entry_id].get("state", {})
+        state = self._device.state
         return {
-            "reset_needed": state.get(f"{self.filter_type}_reset", False)
+            "reset_needed": bool(getattr(state, self._reset_field)) if state is not None else False
         }
 
 
 class AlarmSensor(BaseSensor):
+    # 알람 종류별 상태 패킷 필드 (팬 알람은 팬1/팬2 중 하나라도 켜지면 on)
+    ALARM_FIELDS = {
+        "filter": ("filter_alarm",),
+        "fan": ("fan1_alarm", "fan2_alarm"),
+    }
 
-    def __init__(self, entry, device_info, alarm_type, name, unit=None, icon=None):
-        super().__init__(entry, device_info, f"{alarm_type}_alarm", name, unit, icon)
+    def __init__(self, entry, device, alarm_type, name, unit=None, icon=None):
+        super().__init__(entry, device, f"{alarm_type}_alarm", name, unit, icon)
         self._alarm_type = alarm_type
+        self._source_fields = frozenset(self.ALARM_FIELDS[alarm_type])
 
     def _update_state(self):
-        state = self.hass.data[DOMAIN][self._entry.entry_id].get("state", {})
-        self._attr_native_value = "on" if state.get(f"{self._alarm_type}_alarm") else "off"
+        state = self._device.state
+        self._attr_native_value = "on" if any(getattr(state, field) for field in self._source_fields) else "off"
         self._attr_available = True
         _LOGGER.debug(
             f"[{self.name}] State updated for AlarmSensor: native_value={self._attr_native_value}, available={self._attr_available}")
-        self.schedule_update_ha_state()
+
+
+class CommandLatencySensor(SensorEntity):
+    """명령 전송 → 상태 반영까지의 왕복 시간 (p50, 속성으로 p95와 재전송 통계)"""
+    _attr_entity_category = EntityCategory.DIAGNOSTIC
+    _attr_entity_registry_enabled_default = False
+    _attr_native_unit_of_measurement = "ms"
+    _attr_icon = "mdi:timer-sand"
+
+    def __init__(self, entry, device):
+        self._entry = entry
+        self._device = device
+        self._device_info = device.device_info
+        config = entry.data
+        self._attr_unique_id = f"{config['device_id']}_command_latency"
+        self._attr_name = f"{config['friendly_name']} Command Latency"
+
+    @property
+    def device_info(self):
+        return self._device_info
+
+    async def async_added_to_hass(self):
+        self.async_on_remove(
+            async_dispatcher_connect(
+                self.hass,
+                f"{DOMAIN}_command_update_{self._entry.entry_id}",
+                self._handle_update
+            )
+        )
+
+    @callback
+    def _handle_update(self):
+        self.async_write_ha_state()
+
+    @property
+    def native_value(self):
+        p50 = self._device.tracker.p50
+        return round(p50 * 1000) if p50 is not None else None
+
+    @property
+    def extra_state_attributes(self):
+        tracker = self._device.tracker
+        return {
+            "p95_ms": round(tracker.p95 * 1000) if tracker.p95 is not None else None,
+            "confirmed": tracker.confirmed,
+            "retries": tracker.retries,
+            "failed": tracker.failed,
+            "in_flight": tracker.in_flight,
+        }
+
+
+class MetricSensor(SensorEntity):
+    """메트릭 진단 센서 (기본 비활성, 폴링 주기마다 카운터를 읽기만 하므로 메시지 경로에 부담 없음)"""
+    _attr_entity_category = EntityCategory.DIAGNOSTIC
+    _attr_entity_registry_enabled_default = False
+    _attr_should_poll = True
+
+    def __init__(self, entry, device, metric, name):
+        self._device = device
+        self._device_info = device.device_info
+        self._metric = metric
+        config = entry.data
+        self._attr_unique_id = f"{config['device_id']}_metric_{metric}"
+        self._attr_name = f"{config['friendly_name']} {name}"
+
+    @property
+    def device_info(self):
+        return self._device_info
+
+
+class MessageRateSensor(MetricSensor):
+    """메시지 카운터의 초당 증가율 (직전 폴링 이후 평균)"""
+    _attr_native_unit_of_measurement = "msg/s"
+    _attr_state_class = SensorStateClass.MEASUREMENT
+    _attr_icon = "mdi:speedometer"
+
+    def __init__(self, entry, device, counter, name):
+        super().__init__(entry, device, counter, name)
+        self._last = (getattr(device.metrics, counter), time.monotonic())
+
+    async def async_update(self):
+        count = getattr(self._device.metrics, self._metric)
+        now = time.monotonic()
+        last_count, last_time = self._last
+        self._attr_native_value = round((count - last_count) / (now - last_time), 2) if now > last_time else 0
+        self._last = (count, now)
+        self._attr_extra_state_attributes = {"total": count}
+
+
+class ProcessingTimeSensor(MetricSensor):
+    """메시지 처리 시간 p50 (속성으로 p95와 표본 수)"""
+    _attr_native_unit_of_measurement = "µs"
+    _attr_state_class = SensorStateClass.MEASUREMENT
+    _attr_icon = "mdi:timer-outline"
+
+    async def async_update(self):
+        histogram = getattr(self._device.metrics, self._metric)
+        p50 = histogram.percentile(0.5)
+        p95 = histogram.percentile(0.95)
+        self._attr_native_value = round(p50 * 1e6) if p50 is not None else None
+        self._attr_extra_state_attributes = {
+            "p95_us": round(p95 * 1e6) if p95 is not None else None,
+            "count": histogram.count,
+        }
+
+
+class CommandsSentSensor(MetricSensor):
+    """발행한 CMD 패킷 수 (재전송 포함)"""
+    _attr_state_class = SensorStateClass.TOTAL_INCREASING
+    _attr_icon = "mdi:send"
+
+    def __init__(self, entry, device):
+        super().__init__(entry, device, "commands_sent", "Commands Sent")
+
+    async def async_update(self):
+        self._attr_native_value = self._device.metrics.commands_sent
+
+
+class ReconnectsSensor(MetricSensor):
+    """공유 브로커 연결의 재연결 횟수"""
+    _attr_state_class = SensorStateClass.TOTAL_INCREASING
+    _attr_icon = "mdi:lan-disconnect"
+
+    def __init__(self, entry, device):
+        super().__init__(entry, device, "reconnects", "Broker Reconnects")
+
+    async def async_update(self):
+        connection = self.hass.data.get(DATA_CONNECTION)
+        self._attr_native_value = connection.reconnects if connection is not None else None
+        if connection is not None:
+            self._attr_extra_state_attributes = {
+                "attempts": connection.reconnect_attempts,
+                "last_recovery_s": round(connection.last_recovery, 1) if connection.last_recovery is not None else None,
+                "recovery_p95_s": connection.recovery_time.percentile(0.95),
+            }
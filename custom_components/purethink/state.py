@@ -0,0 +1,32 @@
+from homeassistant.core import HomeAssistant, callback
+from homeassistant.helpers.dispatcher import async_dispatcher_send
+
+from .const import DOMAIN
+from .protocol import DeviceState
+
+ALL_FIELDS = frozenset(DeviceState._fields)
+
+
+@callback
+def async_refresh_state(hass: HomeAssistant, device) -> frozenset:
+    """기기 상태 위에 낙관적 상태를 얹어 표시 상태를 갱신하고, 바뀐 필드만 엔티티에 알림"""
+    state = device.device_state
+    if state is None:
+        return frozenset()
+    if device.optimistic:
+        state = state._replace(**device.optimistic)
+
+    previous = device.state
+    if previous is None:
+        changed = ALL_FIELDS
+    elif state == previous:
+        changed = frozenset()
+    else:
+        changed = frozenset(
+            name for name, value, old in zip(DeviceState._fields, state, previous) if value != old
+        )
+    device.state = state
+
+    if changed:
+        async_dispatcher_send(hass, f"{DOMAIN}_state_update_{device.entry_id}", changed)
+    return changed
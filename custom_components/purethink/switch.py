@@ -1,44 +1,48 @@
 import logging
 
 from homeassistant.components.switch import SwitchEntity
+from homeassistant.core import callback
 from homeassistant.helpers.dispatcher import async_dispatcher_connect
 
-from . import mqtt_client
 from .const import DOMAIN
-from .protocol import generate_command
+from .device import async_send_command, get_device
+from .restore import get_restore_store
 
 _LOGGER = logging.getLogger(__name__)
 
 
 async def async_setup_entry(hass, config_entry, async_add_entities):
     """스위치 플랫폼 설정 (비동기)"""
-    entry_data = hass.data[DOMAIN][config_entry.entry_id]
-    device_info = entry_data["device"]
+    device = get_device(hass, config_entry.entry_id)
     switches = [
-        PowerSwitch(hass, config_entry, entry_data["command_topic"], device_info)
+        PowerSwitch(hass, config_entry, device)
     ]
     async_add_entities(switches)
-    entry_data.setdefault("entities", []).extend(switches)
 
 
 class PowerSwitch(SwitchEntity):
     """전원 스위치"""
+    _source_fields = frozenset({"power"})
 
-    def __init__(self, hass, entry, command_topic, device_info):
+    def __init__(self, hass, entry, device):
         self.hass = hass
         self._entry = entry
-        self._command_topic = command_topic
-        self._device_info = device_info
+        self._device = device
+        self._device_info = device.device_info
         config = entry.data
         self._attr_unique_id = f"{config['device_id']}_power"
         self._attr_name = f"{config['friendly_name']} Power"
         self.entity_id = f"switch.{config['base_id']}_power"
-        self._attr_available = True
 
     @property
     def device_info(self):
         return self._device_info
 
+    @property
+    def available(self) -> bool:
+        """기기가 최근 상태 패킷을 보냈을 때만 사용 가능"""
+        return self._device.available
+
     async def async_added_to_hass(self):
         """상태 업데이트 신호 구독"""
         _LOGGER.debug(f"[{self.name}] async_added_to_hass called")
@@ -50,18 +54,20 @@ class PowerSwitch(SwitchEntity):
             )
         )
 
-    def _handle_update(self):
+    @callback
+    def _handle_update(self, changed):
         """상태 업데이트"""
-        state = self.hass.data[DOMAIN][self._entry.entry_id]["state"]
-        self._attr_available = bool(state)
-        _LOGGER.debug(f"[{self.name}] State updated: available={self._attr_available}")
-        self.schedule_update_ha_state()
+        if not changed & self._source_fields:
+            return
+
+        _LOGGER.debug(f"[{self.name}] State updated: available={self.available}")
+        self.async_write_ha_state()
 
     @property
     def is_on(self) -> bool:
         """현재 전원 상태 반환"""
-        state = self.hass.data[DOMAIN][self._entry.entry_id]["state"]
-        return bool(state.get("power", 0))
+        state = self._device.state
+        return state is not None and bool(state.power)
 
     @property
     def icon(self):
@@ -73,28 +79,31 @@ class PowerSwitch(SwitchEntity):
             _LOGGER.debug("[PowerSwitch] 이미 전원이 꺼져 있어 저장 및 전송 생략")
             return
 
-        entry_data = self.hass.data[DOMAIN][self._entry.entry_id]
-        state = entry_data.get("state", {})
+        device = self._device
+        state = device.state
 
         # 현재 디바이스 모드 저장
-        if state.get("ai_mode") == 1:
-            entry_data["last_device_mode"] = "Auto"
-        elif state.get("sleep_mode") == 1:
-            entry_data["last_device_mode"] = "Sleep 1"
-        elif state.get("sleep_mode") == 2:
-            entry_data["last_device_mode"] = "Sleep 2"
-        elif state.get("sleep_mode") == 3:
-            entry_data["last_device_mode"] = "Sleep 3"
+        if state.ai_mode == 1:
+            device.last_device_mode = "Auto"
+        elif state.sleep_mode == 1:
+            device.last_device_mode = "Sleep 1"
+        elif state.sleep_mode == 2:
+            device.last_device_mode = "Sleep 2"
+        elif state.sleep_mode == 3:
+            device.last_device_mode = "Sleep 3"
         else:
-            entry_data["last_device_mode"] = state.get("device_mode", "Manual")
-        _LOGGER.debug(f"[PowerSwitch] 전원 끄기 -현재 Device Mode 저장: {entry_data['last_device_mode']}")
+            device.last_device_mode = "Manual"
+        _LOGGER.debug(f"[PowerSwitch] 전원 끄기 -현재 Device Mode 저장: {device.last_device_mode}")
 
-        if entry_data["last_device_mode"] == "Manual":
-            current_fan_speed = state.get("fan_speed", 4)
+        if device.last_device_mode == "Manual":
+            current_fan_speed = state.fan_speed
             # Normal모드이면서 현재 팬 속도가 0이 아니면 팬속도 저장
             if current_fan_speed != 0:
-                entry_data["last_fan_speed"] = current_fan_speed
-            _LOGGER.debug(f"[PowerSwitch] 전원 끄기 - 현재 Fan Speed 저장: {entry_data.get('last_fan_speed')}")
+                device.last_fan_speed = current_fan_speed
+            _LOGGER.debug(f"[PowerSwitch] 전원 끄기 - 현재 Fan Speed 저장: {device.last_fan_speed}")
+
+        # 재시작 후에도 복원되도록 기록 (디스크 쓰기는 지연 저장으로 묶임)
+        get_restore_store(self.hass).async_remember(device)
 
         # 전원 끄기 명령 전송
         await self._send_command(mode="off")
@@ -105,12 +114,10 @@ class PowerSwitch(SwitchEntity):
             _LOGGER.debug("[PowerSwitch] 이미 전원이 켜져 있어 복원 동작 생략")
             return
 
-        entry_data = self.hass.data[DOMAIN][self._entry.entry_id]
-
         # 저장된 디바이스 모드, 팬 속도 가져오기 (없으면 기본값 Normal, 4)
-        last_device_mode = entry_data.get("last_device_mode", "Manual")
+        last_device_mode = self._device.last_device_mode
         if last_device_mode == "Manual":
-            last_fan_speed = entry_data.get("last_fan_speed", 4)
+            last_fan_speed = self._device.last_fan_speed
             await self._send_command(mode="on", fan_speed=last_fan_speed, device_mode=last_device_mode)
             _LOGGER.debug(
                 f"[PowerSwitch] 전원 켜짐 - 저장된 Fan Speed 복원: {last_fan_speed}, 저장된 Device Mode 복원: {last_device_mode}")
@@ -121,12 +128,7 @@ class PowerSwitch(SwitchEntity):
     async def _send_command(self, **kwargs):
         """MQTT 명령 전송"""
         try:
-            payload = generate_command(
-                self._entry.data["device_id"],
-                self.hass,
-                **kwargs
-            )
-            mqtt_client.publish(self._command_topic, payload, qos=1)
-            _LOGGER.debug(f"[PowerSwitch] Command sent ▶ {payload}")
+            async_send_command(self.hass, self._entry.entry_id, **kwargs)
+            _LOGGER.debug(f"[PowerSwitch] Command queued ▶ {kwargs}")
         except Exception as e:
             _LOGGER.error(f"[PowerSwitch] 명령 전송 실패: {e}", exc_info=True)
@@ -0,0 +1 @@
+"""Purethink 통합구성요소 테스트"""
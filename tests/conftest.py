@@ -0,0 +1,129 @@
+"""테스트 공통 fixture - 브로커 없이 기기 런타임과 명령/메시지 경로 구성"""
+import importlib
+import json
+import random
+import sys
+from pathlib import Path
+from types import SimpleNamespace
+
+import pytest
+
+from custom_components.purethink.const import DATA_CONNECTION, DOMAIN
+from custom_components.purethink.device import DeviceRegistry, PurethinkDevice
+from custom_components.purethink.protocol import CMD_HEADER_HEX, STATUS_HEADER_HEX, build_packet
+
+DEVICE_ID = "DIV01-TEST01"
+ENTRY_ID = "test_entry"
+# 설정 흐름이 만드는 Config Entry 데이터
+ENTRY_DATA = {"friendly_name": "Test", "device_id": DEVICE_ID, "base_id": "test"}
+# 개발 도구 (에뮬레이터, 로그 디코더 등)
+TOOLS = Path(__file__).resolve().parent.parent / ".test"
+
+
+def pytest_addoption(parser):
+    parser.addoption("--corpus", type=Path, default=None,
+                     help="벤치마크/일괄 디코드 비교용 패킷 파일 (한 줄에 contents hex 하나, 기본: 합성 패킷)")
+
+
+def load_tool(name: str):
+    """.test/<name>.py 개발 도구를 모듈로 로드 (도구가 쓰는 .test/standalone.py 를 찾도록 경로에 추가)"""
+    if str(TOOLS) not in sys.path:
+        sys.path.insert(0, str(TOOLS))
+    return importlib.import_module(name)
+
+
+class RecordingConnection:
+    """발행한 메시지만 기록하는 연결 (PurethinkConnection.publish 대신)"""
+
+    def __init__(self):
+        self.published: list[tuple[str, dict]] = []
+
+    def publish(self, topic: str, payload: str, qos: int = 0):
+        self.published.append((topic, json.loads(payload)))
+
+
+def status_contents(state) -> str:
+    """DeviceState 를 기기가 보내는 상태 패킷(hex)으로 변환"""
+    return build_packet(STATUS_HEADER_HEX, state._asdict())
+
+
+def mqtt_message(topic: str, payload: dict):
+    """paho MQTTMessage 대신 on_message 에 넘길 메시지 (topic, payload bytes)"""
+    return SimpleNamespace(topic=topic, payload=json.dumps(payload).encode())
+
+
+def status_message(state, device_id: str = DEVICE_ID):
+    return mqtt_message(f"/things/{device_id}/status", {"type": "STATUS", "contents": status_contents(state)})
+
+
+def synthetic_corpus(count: int = 2000, seed: int = 0) -> list[str]:
+    """모든 모드/압력/흡배기/알람/필터 상태를 고르게 포함하는 상태 패킷 생성"""
+    rng = random.Random(seed)
+    modes = [(0, 0), (1, 0), (0, 1), (0, 2), (0, 3)]  # (ai_mode, sleep_mode)
+    packets = []
+    for index in range(count):
+        ai_mode, sleep_mode = modes[index % len(modes)]
+        fields = {
+            "power": index % 2,
+            "fan_speed": index % 6,
+            "ai_mode": ai_mode,
+            "sleep_mode": sleep_mode,
+            "input_occurred": 1,
+            "odor": rng.randrange(4),
+            "pressure_mode": index % 3,
+            "wifi": rng.randrange(8),
+            "fan_in": (index >> 1) & 1,
+            "fan_out": (index >> 2) & 1,
+            "co2": rng.randrange(400, 3000),
+            "pm1": rng.randrange(0, 200),
+            "pm25": rng.randrange(0, 300),
+            "pm10": rng.randrange(0, 500),
+            "prefilter_reset": rng.random() < 0.1,
+            "prefilter_hours": rng.randrange(0, 4000),
+            "hepafilter_reset": rng.random() < 0.1,
+            "hepafilter_hours": rng.randrange(0, 4000),
+        }
+        # 알람 비트는 하나씩 순환 + 가끔 전체
+        for bit, alarm in enumerate(("fan1_alarm", "fan2_alarm", "dust_sensor_alarm", "co2_sensor_alarm",
+                                     "filter_alarm", "heat_exchanger_alarm")):
+            fields[alarm] = int(index % 7 == bit or index % 50 == 49)
+        packets.append(build_packet(STATUS_HEADER_HEX if index % 4 else CMD_HEADER_HEX, fields))
+    return packets
+
+
+@pytest.fixture(scope="module")
+def corpus(request) -> list[str]:
+    path = request.config.getoption("--corpus")
+    if path is None:
+        return synthetic_corpus()
+    return [line.strip() for line in path.read_text().splitlines() if line.strip()]
+
+
+@pytest.fixture
+def connection(hass) -> RecordingConnection:
+    connection = hass.data[DATA_CONNECTION] = RecordingConnection()
+    return connection
+
+
+@pytest.fixture
+def make_device(hass, connection):
+    """기기 런타임 생성 (레지스트리 등록) - 테스트가 끝나면 대기 중인 명령 타이머 정리"""
+    registry = hass.data[DOMAIN] = DeviceRegistry()
+    devices = []
+
+    def make(command_window: float = 0, optimistic: bool = False, device_id: str = DEVICE_ID,
+             entry_id: str = ENTRY_ID) -> PurethinkDevice:
+        device = PurethinkDevice(hass, entry_id, device_id, device_id, command_window, optimistic)
+        registry.add(device)
+        devices.append(device)
+        return device
+
+    yield make
+    for device in devices:
+        device.commands.async_cancel()
+        device.tracker.async_cancel()
+
+
+@pytest.fixture
+def device(make_device) -> PurethinkDevice:
+    return make_device()
@@ -0,0 +1,108 @@
+"""기존(테이블 코덱 이전) 파서/인코더 - 코덱 동등성 테스트와 벤치마크의 비교 기준으로 그대로 옮겨 둠"""
+import json
+import random
+
+
+def _legacy_parse_bits(hex_str: str, start_bit: int, length: int) -> int:
+    full_bits = bin(int(hex_str, 16))[2:].zfill(len(hex_str) * 4)
+    return int(full_bits[start_bit:start_bit + length], 2)
+
+
+def _legacy_parse_filter(hex_str: str, start_bit: int, length: int) -> dict:
+    return {
+        'reset_flag': bool(_legacy_parse_bits(hex_str, start_bit - 2, 1)),
+        'hours': _legacy_parse_bits(hex_str, start_bit, length)
+    }
+
+
+def legacy_parse_status_packet(payload: str) -> dict:
+    return {
+        'power': _legacy_parse_bits(payload[8:10], 0, 1),
+        'fan_speed': _legacy_parse_bits(payload[8:10], 1, 3),
+        'ai_mode': _legacy_parse_bits(payload[8:10], 4, 1),
+        'sleep_mode': _legacy_parse_bits(payload[8:10], 5, 2),
+        'input_occurred': _legacy_parse_bits(payload[8:10], 7, 1),
+        'odor': _legacy_parse_bits(payload[10:12], 0, 2),
+        'pressure_mode': _legacy_parse_bits(payload[10:12], 2, 2),
+        'wifi': _legacy_parse_bits(payload[10:12], 5, 3),
+        'fan_in': _legacy_parse_bits(payload[12:14], 0, 1),
+        'fan_out': _legacy_parse_bits(payload[12:14], 1, 1),
+        'reserved_bits': _legacy_parse_bits(payload[12:14], 2, 6),
+        'fan1_alarm': _legacy_parse_bits(payload[14:16], 0, 1),
+        'fan2_alarm': _legacy_parse_bits(payload[14:16], 1, 1),
+        'dust_sensor_alarm': _legacy_parse_bits(payload[14:16], 2, 1),
+        'co2_sensor_alarm': _legacy_parse_bits(payload[14:16], 3, 1),
+        'filter_alarm': _legacy_parse_bits(payload[14:16], 4, 1),
+        'heat_exchanger_alarm': _legacy_parse_bits(payload[14:16], 5, 1),
+        'co2': _legacy_parse_bits(payload[16:28], 1, 13),
+        'pm1': _legacy_parse_bits(payload[16:28], 14, 10),
+        'pm25': _legacy_parse_bits(payload[16:28], 24, 10),
+        'pm10': _legacy_parse_bits(payload[16:28], 34, 10),
+        'prefilter': _legacy_parse_filter(payload[28:36], 2, 14),
+        'hepafilter': _legacy_parse_filter(payload[28:36], 18, 14)
+    }
+
+
+def legacy_command_contents(power, fan_speed, ai_mode, sleep_mode, pressure_mode, fan_in, fan_out,
+                             filter_reset=None) -> str:
+    b5 = int(power) << 7 | int(fan_speed) << 4 | int(ai_mode) << 3 | int(sleep_mode) << 1 | 1
+    b6 = int(pressure_mode) << 4
+    b7 = int(fan_in) << 7 | int(fan_out) << 6
+    b15 = b16 = b17 = b18 = 0
+    if filter_reset == "prefilter":
+        b15, b16 = 135, 208
+    elif filter_reset == "hepafilter":
+        b17, b18 = 143, 160
+    checksum = 393 + b5 + b6 + b7 + b15 + b16 + b17 + b18
+    return (
+        f"A8A81722{b5:02X}{b6:02X}{b7:02X}{'00' * 7}"
+        f"{b15:02X}{b16:02X}{b17:02X}{b18:02X}{'00' * 3}{checksum:04X}"
+    )
+
+
+def legacy_generate_command(state: dict, topic_id=None, **kwargs) -> str | None:
+    """기존 generate_command - hass.data 조회 대신 상태 dict 를 받고, topic_id 를 주지 않으면 기존처럼 난수 사용"""
+    if "mode" in kwargs:
+        if kwargs["mode"] in ["on", "off"]:
+            kwargs["power"] = 1 if kwargs["mode"] == "on" else 0
+        else:
+            kwargs["device_mode"] = kwargs["mode"]
+            kwargs.pop("mode")
+            if "power" not in kwargs:
+                kwargs["power"] = 1
+
+    if "device_mode" in kwargs:
+        mode = kwargs["device_mode"]
+        if mode == "Manual":
+            kwargs["ai_mode"] = 0
+            kwargs["sleep_mode"] = 0
+        elif mode == "Auto":
+            kwargs["ai_mode"] = 1
+            kwargs["sleep_mode"] = 0
+        elif "Sleep" in mode:
+            try:
+                sleep_value = int(mode.split()[1])
+            except Exception:
+                sleep_value = 1
+            kwargs["ai_mode"] = 0
+            kwargs["sleep_mode"] = sleep_value
+
+    if "pressure_mode" in kwargs:
+        kwargs["pressure_mode"] = {"정압": 0, "양압": 1, "음압": 2}.get(kwargs["pressure_mode"], 0)
+
+    if "fan_mode" in kwargs:
+        kwargs["fan_in"], kwargs["fan_out"] = {
+            "환기 꺼짐": (0, 0), "배기": (0, 1), "흡기": (1, 0), "흡/배기": (1, 1)
+        }.get(kwargs["fan_mode"], (0, 0))
+
+    combined = {**state, **kwargs}
+    filter_reset = kwargs.get("filter_reset")
+    if filter_reset is not None and filter_reset not in ("prefilter", "hepafilter"):
+        return None
+    if topic_id is None:
+        topic_id = str(random.randint(100000, 200000))
+    contents = legacy_command_contents(
+        combined.get("power", 0), combined.get("fan_speed", 4), combined.get("ai_mode", 0),
+        combined.get("sleep_mode", 0), combined.get("pressure_mode", 0), combined.get("fan_in", 0),
+        combined.get("fan_out", 0), filter_reset)
+    return json.dumps({"topic_id": topic_id, "type": "CMD", "contents": contents})
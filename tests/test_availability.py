@@ -0,0 +1,64 @@
+"""가용성 점검 타이머 - 한 번의 순회로 오래 조용한 기기만 사용 불가 처리, 다음 패킷에서 복구"""
+import time
+from datetime import timedelta
+
+from homeassistant.helpers.dispatcher import async_dispatcher_connect
+from homeassistant.util import dt as dt_util
+from pytest_homeassistant_custom_component.common import async_fire_time_changed
+
+from custom_components.purethink import on_message
+from custom_components.purethink.availability import AvailabilityWatchdog
+from custom_components.purethink.const import DOMAIN, STALE_CHECK_INTERVAL
+from custom_components.purethink.protocol import DEFAULT_STATE
+from custom_components.purethink.state import ALL_FIELDS
+
+from .conftest import ENTRY_ID, status_message
+
+
+async def _sweep(hass):
+    async_fire_time_changed(hass, dt_util.utcnow() + timedelta(seconds=STALE_CHECK_INTERVAL + 1))
+    await hass.async_block_till_done()
+
+
+async def test_sweep_marks_only_stale_devices_unavailable(hass, make_device):
+    now = time.monotonic()
+    stale = make_device()
+    fresh = make_device(device_id="DIV01-FRESH", entry_id="fresh_entry")
+    disabled = make_device(device_id="DIV01-DISABLED", entry_id="disabled_entry")
+    disabled.stale_timeout = 0  # 점검 사용 안 함
+    for device in (stale, fresh, disabled):
+        on_message(hass, device.entry_id, status_message(DEFAULT_STATE, device.device_id))
+    stale.last_seen = disabled.last_seen = now - stale.stale_timeout - 1
+
+    updates = []
+    for device in (stale, fresh, disabled):
+        async_dispatcher_connect(hass, f"{DOMAIN}_state_update_{device.entry_id}",
+                                 lambda changed, entry_id=device.entry_id: updates.append((entry_id, changed)))
+
+    watchdog = AvailabilityWatchdog(hass, hass.data[DOMAIN])
+    watchdog.async_start()
+    await _sweep(hass)
+    assert (stale.available, fresh.available, disabled.available) == (False, True, True)
+    assert updates == [(ENTRY_ID, ALL_FIELDS)]
+
+    # 이미 사용 불가인 기기는 다음 순회에서 다시 알리지 않음
+    await _sweep(hass)
+    assert updates == [(ENTRY_ID, ALL_FIELDS)]
+
+    # 다시 상태 패킷이 오면 바로 사용 가능 + 모든 필드 다시 알림
+    on_message(hass, ENTRY_ID, status_message(DEFAULT_STATE))
+    assert stale.available
+    assert updates[-1] == (ENTRY_ID, ALL_FIELDS)
+
+    watchdog.async_stop()
+    assert watchdog._timer is None
+
+
+async def test_device_without_state_is_not_swept(hass, device):
+    watchdog = AvailabilityWatchdog(hass, hass.data[DOMAIN])
+    watchdog.async_start()
+    await _sweep(hass)
+
+    assert not device.available
+    assert device.last_seen is None
+    watchdog.async_stop()
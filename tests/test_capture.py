@@ -0,0 +1,162 @@
+"""패킷 캡처 - 묶음 기록, 파일 순환, 잘못된 패킷 제외, mmap 리더의 시각 탐색과 왕복"""
+import asyncio
+import math
+from datetime import timedelta
+
+import pytest
+from homeassistant.util import dt as dt_util
+from pytest_homeassistant_custom_component.common import async_fire_time_changed
+
+from custom_components.purethink import capture as capture_module
+from custom_components.purethink.capture import CAPTURE_FILE, CAPTURE_FILES, CAPTURE_FLUSH_BATCH, \
+    CAPTURE_MAGIC, CaptureReader, PacketCapture
+from custom_components.purethink.protocol import DEFAULT_STATE
+
+from .conftest import DEVICE_ID, status_contents
+
+CONTENTS = status_contents(DEFAULT_STATE)
+
+
+async def _open_capture(hass, tmp_path) -> PacketCapture:
+    capture = PacketCapture(hass, str(tmp_path))
+    await capture.async_open()
+    await capture.async_attach(DEVICE_ID)
+    return capture
+
+
+def _write_capture_file(path, timestamps: list[int], wall_start: int = 0, monotonic_start: int = 0):
+    """정해진 시각의 레코드로 캡처 파일 작성 (기기 번호는 위치 % 2)"""
+    with open(path, "wb") as file:
+        file.write(capture_module._HEADER.pack(CAPTURE_MAGIC, capture_module._RECORD.size, wall_start,
+                                               monotonic_start))
+        for position, timestamp in enumerate(timestamps):
+            file.write(capture_module._RECORD.pack(timestamp, position % 2, bytes.fromhex(CONTENTS)))
+
+
+async def test_records_are_written_in_batches(hass, tmp_path):
+    capture = await _open_capture(hass, tmp_path)
+
+    for _ in range(10):
+        capture.append(0, CONTENTS)
+    await hass.async_block_till_done(wait_background_tasks=True)
+    assert capture.records == 0  # 기록 주기 전에는 모아 두기만 함
+
+    async_fire_time_changed(hass, dt_util.utcnow() + timedelta(seconds=capture_module.CAPTURE_FLUSH_INTERVAL))
+    await hass.async_block_till_done(wait_background_tasks=True)
+    assert capture.records == 10
+
+    # 묶음 크기에 도달하면 주기를 기다리지 않고 바로 기록
+    for _ in range(CAPTURE_FLUSH_BATCH):
+        capture.append(0, CONTENTS)
+    await hass.async_block_till_done(wait_background_tasks=True)
+    assert capture.records == 10 + CAPTURE_FLUSH_BATCH
+
+    await capture.async_close()
+    with CaptureReader(tmp_path / CAPTURE_FILE) as reader:
+        assert len(reader) == 10 + CAPTURE_FLUSH_BATCH
+        assert {packet.hex().upper() for _, _, packet in reader} == {CONTENTS}
+
+
+async def test_invalid_packets_are_dropped_not_truncated(hass, tmp_path):
+    capture = await _open_capture(hass, tmp_path)
+
+    capture.append(0, CONTENTS + "00")  # 23바이트보다 김
+    capture.append(0, CONTENTS[:-2])  # 짧음
+    capture.append(0, "ZZ")  # hex 아님
+    capture.append(0, CONTENTS)
+    await capture.async_close()
+
+    assert (capture.records, capture.dropped) == (1, 3)
+    with CaptureReader(tmp_path / CAPTURE_FILE) as reader:
+        assert [packet.hex().upper() for _, _, packet in reader] == [CONTENTS]
+
+
+async def test_files_rotate_and_keep_capture_files(hass, tmp_path, monkeypatch):
+    # 파일 하나에 레코드 10개 - 64 MB x 5 순환을 작은 크기로 확인
+    monkeypatch.setattr(capture_module, "CAPTURE_MAX_BYTES",
+                        capture_module._HEADER.size + 10 * capture_module._RECORD.size)
+    capture = await _open_capture(hass, tmp_path)
+
+    batches = CAPTURE_FILES * 2
+    for batch in range(batches):
+        for _ in range(10):
+            capture.append(batch, CONTENTS)
+        capture._async_flush()
+        await hass.async_block_till_done(wait_background_tasks=True)
+    await capture.async_close()
+
+    files = sorted(tmp_path.glob(f"{CAPTURE_FILE}*"))
+    assert [path.name for path in files] == [CAPTURE_FILE] + [f"{CAPTURE_FILE}.{n}" for n in range(1, CAPTURE_FILES)]
+    # 최신 파일부터 한 묶음씩, 가장 오래된 묶음은 지워짐
+    for number, path in enumerate(files):
+        assert path.stat().st_size <= capture_module.CAPTURE_MAX_BYTES
+        with CaptureReader(path) as reader:
+            assert {index for _, index, _ in reader} == {batches - 1 - number}
+
+
+async def test_restart_keeps_device_index_and_starts_new_file(hass, tmp_path):
+    capture = await _open_capture(hass, tmp_path)
+    capture.append(0, CONTENTS)
+    await capture.async_close()
+
+    capture = PacketCapture(hass, str(tmp_path))
+    await capture.async_open()
+    assert await capture.async_attach("DIV01-OTHER") == 1
+    assert await capture.async_attach(DEVICE_ID) == 0
+    await capture.async_close()
+
+    assert (tmp_path / f"{CAPTURE_FILE}.1").exists()
+    with CaptureReader(tmp_path / f"{CAPTURE_FILE}.1") as reader:
+        assert len(reader) == 1
+        assert reader.devices == {0: DEVICE_ID, 1: "DIV01-OTHER"}
+
+
+def test_reader_seeks_time_range_with_bisect(tmp_path):
+    path = tmp_path / CAPTURE_FILE
+    timestamps = [position * 1_000_000 for position in range(1000)]  # 1 ms 간격
+    _write_capture_file(path, timestamps)
+    with open(path, "ab") as file:
+        file.write(b"\0" * 5)  # 기록 중 잘린 레코드
+
+    with CaptureReader(path) as reader:
+        assert len(reader) == 1000
+        calls = []
+        timestamp = reader.timestamp
+        reader.timestamp = lambda position: calls.append(position) or timestamp(position)
+
+        assert reader.seek(0.1005) == 101
+        assert len(calls) <= math.ceil(math.log2(1000)) + 1  # 전체를 읽지 않음
+
+        records = list(reader.records(0.1, 0.2))
+        assert [record[0] for record in records] == timestamps[100:200]
+        assert [record[0] for record in reader.records(0.1, 0.2, device=1)] == timestamps[101:200:2]
+        assert list(reader.records(5.0)) == []
+        assert reader[999][0] == timestamps[-1]
+
+
+def test_reader_rejects_other_files(tmp_path):
+    path = tmp_path / "other.bin"
+    path.write_bytes(b"PTCAP0" + b"\0" * 40)
+    with pytest.raises(ValueError):
+        CaptureReader(path)
+
+
+async def test_round_trip_by_time_range(hass, tmp_path):
+    capture = await _open_capture(hass, tmp_path)
+    packets = [status_contents(DEFAULT_STATE._replace(co2=400 + n)) for n in range(30)]
+
+    # 10개씩 세 묶음을 간격을 두고 기록한 뒤 가운데 묶음만 시각 구간으로 읽음
+    for batch in range(3):
+        for contents in packets[batch * 10:(batch + 1) * 10]:
+            capture.append(batch, contents)
+        await asyncio.sleep(0.02)
+    await capture.async_close()
+
+    with CaptureReader(tmp_path / CAPTURE_FILE) as reader:
+        assert [packet.hex().upper() for _, _, packet in reader] == packets
+        wall_times = [reader.wall_time(timestamp) for timestamp, _, _ in reader]
+        start, end = wall_times[10] - 0.005, wall_times[19] + 0.005
+        middle = list(reader.records(start, end))
+
+    assert [packet.hex().upper() for _, _, packet in middle] == packets[10:20]
+    assert {index for _, index, _ in middle} == {1}
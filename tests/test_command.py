@@ -0,0 +1,149 @@
+"""명령 병합(CommandCoalescer) 과 반영 확인/재전송(CommandTracker)"""
+from datetime import timedelta
+
+from homeassistant.util import dt as dt_util
+from pytest_homeassistant_custom_component.common import async_fire_time_changed
+
+from custom_components.purethink.const import COMMAND_ACK_TIMEOUT, COMMAND_MAX_ATTEMPTS
+from custom_components.purethink.protocol import DEFAULT_STATE, decode_state
+
+
+def _sent(connection, index: int = -1):
+    """발행한 CMD 의 (topic_id, 디코드한 상태)"""
+    _, command = connection.published[index]
+    return command["topic_id"], decode_state(command["contents"])
+
+
+async def test_coalescer_merges_fields_within_window(hass, make_device, connection):
+    device = make_device(command_window=0.15)
+    device.device_state = device.state = DEFAULT_STATE._replace(power=1, fan_speed=1, pressure_mode=2)
+
+    device.commands.async_send(fan_speed=2)
+    device.commands.async_send(mode="Auto")
+    device.commands.async_send(fan_speed=3)
+    assert connection.published == []
+
+    async_fire_time_changed(hass, dt_util.utcnow() + timedelta(seconds=1))
+    assert len(connection.published) == 1
+    topic, _ = connection.published[0]
+    assert topic == device.command_topic
+    _, sent = _sent(connection)
+    # 같은 필드는 마지막 값, 다른 필드는 합쳐지고 명령하지 않은 필드는 현재 상태 유지
+    assert (sent.fan_speed, sent.power, sent.ai_mode, sent.sleep_mode, sent.pressure_mode) == (3, 1, 1, 0, 2)
+    assert device.metrics.commands_sent == 1
+    assert device.tracker.in_flight == 1
+
+
+async def test_coalescer_opens_new_window_after_flush(hass, make_device, connection):
+    device = make_device(command_window=0.15)
+
+    device.commands.async_send(fan_speed=2)
+    async_fire_time_changed(hass, dt_util.utcnow() + timedelta(seconds=1))
+    device.commands.async_send(fan_speed=4)
+    assert len(connection.published) == 1
+
+    async_fire_time_changed(hass, dt_util.utcnow() + timedelta(seconds=2))
+    assert len(connection.published) == 2
+    assert _sent(connection)[1].fan_speed == 4
+
+
+async def test_coalescer_without_window_sends_immediately(make_device, connection):
+    device = make_device(command_window=0)
+
+    device.commands.async_send(fan_speed=1)
+    device.commands.async_send(pressure_mode="양압")
+    assert len(connection.published) == 2
+    assert _sent(connection, 0)[1].fan_speed == 1
+    assert _sent(connection, 1)[1].pressure_mode == 1
+
+
+async def test_coalescer_cancel_drops_pending(hass, make_device, connection):
+    device = make_device(command_window=0.15)
+
+    device.commands.async_send(fan_speed=2)
+    device.commands.async_cancel()
+    async_fire_time_changed(hass, dt_util.utcnow() + timedelta(seconds=1))
+    assert connection.published == []
+
+
+async def test_tracker_confirms_matching_state(make_device, connection):
+    device = make_device()
+    tracker = device.tracker
+
+    device.commands.async_send(fan_speed=2, pressure_mode="양압")
+    assert tracker.in_flight == 1
+
+    # 일부 필드만 반영된 상태는 확인으로 보지 않음
+    tracker.async_process_state(DEFAULT_STATE._replace(fan_speed=2))
+    assert (tracker.in_flight, tracker.confirmed) == (1, 0)
+
+    tracker.async_process_state(DEFAULT_STATE._replace(fan_speed=2, pressure_mode=1))
+    assert (tracker.in_flight, tracker.confirmed) == (0, 1)
+    assert tracker.latency.count == 1
+    assert tracker.p50 is not None
+
+
+async def test_tracker_retries_with_same_topic_id_then_reverts(hass, make_device, connection):
+    device = make_device(optimistic=True)
+    device.device_state = device.state = DEFAULT_STATE._replace(fan_speed=1)
+    tracker = device.tracker
+
+    device.commands.async_send(fan_speed=2)
+    topic_id, _ = _sent(connection)
+    assert device.optimistic == {"fan_speed": 2}
+    assert device.state.fan_speed == 2
+
+    for attempt in range(2, COMMAND_MAX_ATTEMPTS + 1):
+        async_fire_time_changed(hass, dt_util.utcnow() + timedelta(seconds=COMMAND_ACK_TIMEOUT + 1))
+        assert len(connection.published) == attempt
+        retry_id, sent = _sent(connection)
+        assert retry_id == topic_id
+        assert sent.fan_speed == 2
+        assert tracker.retries == attempt - 1
+        assert tracker.in_flight == 1
+
+    async_fire_time_changed(hass, dt_util.utcnow() + timedelta(seconds=COMMAND_ACK_TIMEOUT + 1))
+    assert len(connection.published) == COMMAND_MAX_ATTEMPTS
+    assert (tracker.failed, tracker.in_flight, tracker.confirmed) == (1, 0, 0)
+    # 반영되지 않은 낙관적 표시는 기기 상태로 되돌림
+    assert device.optimistic == {}
+    assert device.state.fan_speed == 1
+
+
+async def test_tracker_confirmation_stops_retries(hass, make_device, connection):
+    device = make_device()
+    device.commands.async_send(fan_speed=2)
+    device.tracker.async_process_state(DEFAULT_STATE._replace(fan_speed=2))
+
+    async_fire_time_changed(hass, dt_util.utcnow() + timedelta(seconds=COMMAND_ACK_TIMEOUT + 1))
+    assert len(connection.published) == 1
+    assert device.tracker.retries == 0
+
+
+async def test_tracker_later_command_supersedes_overlapping_fields(make_device, connection):
+    device = make_device()
+    tracker = device.tracker
+
+    device.commands.async_send(fan_speed=2, fan_mode="배기")
+    device.commands.async_send(fan_speed=3)
+    # 첫 명령은 흡배기 필드만 확인 대상으로 남음
+    assert tracker.in_flight == 2
+
+    device.commands.async_send(fan_mode="흡기")
+    assert tracker.in_flight == 2
+
+    tracker.async_process_state(DEFAULT_STATE._replace(fan_speed=3, fan_in=1, fan_out=0))
+    assert (tracker.in_flight, tracker.confirmed) == (0, 2)
+
+
+async def test_tracker_ignores_command_without_confirmable_fields(make_device, connection):
+    device = make_device()
+    tracker = device.tracker
+
+    device.commands.async_send(filter_reset="prefilter")
+    assert len(connection.published) == 1
+    assert tracker.in_flight == 0
+
+    # 이후 아무 상태 패킷이 와도 확인/왕복 시간으로 기록하지 않음
+    tracker.async_process_state(DEFAULT_STATE)
+    assert (tracker.confirmed, tracker.latency.count) == (0, 0)
@@ -0,0 +1,163 @@
+"""연결 관리자 메시지 라우팅 - 기기별 최신 메시지 보관과 되돌아온 CMD 제외"""
+import asyncio
+import time
+from datetime import timedelta
+from functools import partial
+from types import SimpleNamespace
+
+from homeassistant.util import dt as dt_util
+from pytest_homeassistant_custom_component.common import async_fire_time_changed
+
+from custom_components.purethink import _async_resync, on_message
+from custom_components.purethink import connection as connection_module
+from custom_components.purethink.connection import RECONNECT_MIN_DELAY, PurethinkConnection, command_topic, \
+    status_topic
+from custom_components.purethink.const import DATA_CONNECTION
+from custom_components.purethink.protocol import DEFAULT_STATE, generate_command
+
+from .conftest import DEVICE_ID, ENTRY_ID, status_message
+
+
+def _connection(hass, received: list) -> PurethinkConnection:
+    connection = PurethinkConnection(hass, lambda entry_id, msg: received.append((entry_id, msg)),
+                                     lambda disconnected_at: ())
+    # 브로커에 연결하지 않았으므로 라우팅 테이블에만 등록됨
+    connection.add_device(DEVICE_ID, ENTRY_ID)
+    return connection
+
+
+async def test_latest_message_per_device_is_handled(hass):
+    received = []
+    connection = _connection(hass, received)
+
+    first = status_message(DEFAULT_STATE._replace(co2=500))
+    latest = status_message(DEFAULT_STATE._replace(co2=600))
+    connection._on_message(None, None, first)
+    connection._on_message(None, None, latest)
+    connection._on_message(None, None, status_message(DEFAULT_STATE, "DIV01-OTHER"))
+    await asyncio.sleep(0)
+
+    assert received == [(ENTRY_ID, latest)]
+    assert connection.superseded == 1
+
+
+async def test_echoed_command_does_not_replace_status(hass):
+    received = []
+    connection = _connection(hass, received)
+
+    status = status_message(DEFAULT_STATE._replace(co2=600))
+    echo = SimpleNamespace(topic=command_topic(DEVICE_ID), payload=generate_command(DEFAULT_STATE).encode())
+    connection._on_message(None, None, status)
+    # 명령 토픽도 /things/{id}/# 구독에 포함되어 발행한 CMD가 바로 되돌아옴
+    connection._on_message(None, None, echo)
+    await asyncio.sleep(0)
+
+    assert received == [(ENTRY_ID, status)]
+    assert connection.superseded == 0
+
+    connection._on_message(None, None, echo)
+    await asyncio.sleep(0)
+    assert received == [(ENTRY_ID, status)]
+
+
+async def test_client_creation_failure_schedules_reconnect(hass, monkeypatch):
+    attempts = []
+
+    def failing_create_client(client_id: str = ""):
+        attempts.append(client_id)
+        raise ImportError("paho")
+
+    monkeypatch.setattr(connection_module, "create_client", failing_create_client)
+    connection = _connection(hass, [])
+
+    await connection.async_connect()
+    assert len(attempts) == 1
+    assert not connection.connected
+
+    # 재시작 없이 백오프 후 클라이언트 생성부터 다시 시도
+    async_fire_time_changed(hass, dt_util.utcnow() + timedelta(seconds=RECONNECT_MIN_DELAY + 1))
+    await hass.async_block_till_done()
+    assert len(attempts) == 2
+    assert connection.reconnect_attempts == 1
+
+    await connection.async_disconnect()
+
+
+async def test_recovery_after_blip_ignores_silent_device(hass, make_device, monkeypatch):
+    connection = PurethinkConnection(hass, partial(on_message, hass), partial(_async_resync, hass))
+    hass.data[DATA_CONNECTION] = connection
+    # 브로커 없이 연결/끊김 콜백만 호출
+    monkeypatch.setattr(connection, "_async_schedule_reconnect", lambda: None)
+    client = SimpleNamespace(subscribe=lambda topics: None, publish=lambda topic, payload, qos=0: None)
+    connection._client = client
+
+    make_device()
+    make_device(device_id="DIV01-SILENT", entry_id="silent_entry")  # 전원이 빠져 상태를 보내지 않는 기기
+    connection.add_device(DEVICE_ID, ENTRY_ID)
+    connection.add_device("DIV01-SILENT", "silent_entry")
+
+    async def receive_status():
+        connection._on_message(client, None, status_message(DEFAULT_STATE._replace(co2=600)))
+        await asyncio.sleep(0)
+
+    connection._on_connect(client, None, {}, 0)
+    await receive_status()
+
+    connection._on_disconnect(client, None, 1)
+    connection._on_connect(client, None, {}, 0)
+    await receive_status()
+    assert connection.recovery_time.count == 1
+
+    # 복구 전에 다시 끊기면 새 끊김 시각부터 측정
+    connection._on_disconnect(client, None, 1)
+    first_outage = connection._disconnected_at
+    connection._on_connect(client, None, {}, 0)
+    connection._on_disconnect(client, None, 1)
+    second_outage = connection._disconnected_at
+    assert second_outage > first_outage
+    connection._on_connect(client, None, {}, 0)
+    await receive_status()
+    assert connection.recovery_time.count == 2
+    assert connection.last_recovery <= time.monotonic() - second_outage
+
+
+async def test_messages_are_routed_by_topic_device_id(hass):
+    received = []
+    connection = PurethinkConnection(hass, lambda entry_id, msg: received.append((entry_id, msg)),
+                                     lambda disconnected_at: ())
+    device_ids = [f"DIV01-ROUTE{index:04d}" for index in range(1000)]
+    for index, device_id in enumerate(device_ids):
+        connection.add_device(device_id, f"entry_{index}")
+    # 라우팅은 토픽에서 꺼낸 device_id 로 dict 를 한 번 조회 (기기 수와 무관)
+    assert connection._routes == {device_id: f"entry_{index}" for index, device_id in enumerate(device_ids)}
+
+    messages = {index: status_message(DEFAULT_STATE, device_ids[index]) for index in (0, 500, 999)}
+    for msg in messages.values():
+        connection._on_message(None, None, msg)
+    connection._on_message(None, None, status_message(DEFAULT_STATE, "DIV01-UNKNOWN"))
+    connection._on_message(None, None, SimpleNamespace(topic="/other/DIV01-ROUTE0000/status", payload=b""))
+    await asyncio.sleep(0)
+
+    assert received == [(f"entry_{index}", msg) for index, msg in messages.items()]
+
+
+async def test_subscriptions_follow_routing_table(hass):
+    connection = _connection(hass, [])
+    calls = []
+    client = SimpleNamespace(subscribe=lambda topics, qos=0: calls.append(("subscribe", topics)),
+                             unsubscribe=lambda topic: calls.append(("unsubscribe", topic)))
+    connection._client = client
+    connection.add_device("DIV01-SECOND", "second_entry")
+
+    # 연결되면 등록된 모든 기기를 요청 하나로 구독
+    connection._on_connect(client, None, {}, 0)
+    assert calls == [("subscribe", [(status_topic(DEVICE_ID), 1), (status_topic("DIV01-SECOND"), 1)])]
+
+    calls.clear()
+    connection.add_device("DIV01-THIRD", "third_entry")
+    connection._on_message(None, None, status_message(DEFAULT_STATE, "DIV01-SECOND"))
+    connection.remove_device("DIV01-SECOND")
+    assert calls == [("subscribe", status_topic("DIV01-THIRD")), ("unsubscribe", status_topic("DIV01-SECOND"))]
+    # 제거한 기기의 처리 대기 메시지도 버림
+    assert "second_entry" not in connection._pending
+    assert connection.has_devices
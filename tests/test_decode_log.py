@@ -0,0 +1,42 @@
+""".test/decode_log.py 일괄 디코드 - 스칼라 디코더와 열 단위 비교, 잘못된 줄 거부, 빈 입력 요약"""
+from custom_components.purethink.protocol import DeviceState, decode_state, parse_status_packet
+
+from .conftest import load_tool
+
+decode_log = load_tool("decode_log")
+
+
+def test_decode_batch_matches_scalar_decoders(corpus):
+    columns = decode_log.decode_batch(corpus)
+
+    assert tuple(columns) == DeviceState._fields
+    for index, packet in enumerate(corpus):
+        state = decode_state(packet)
+        parsed = parse_status_packet(packet)
+        for name, values in columns.items():
+            assert values[index] == getattr(state, name), f"#{index} {name}"
+        for filter_type in ("prefilter", "hepafilter"):
+            assert columns[f"{filter_type}_reset"][index] == parsed[filter_type]["reset_flag"]
+            assert columns[f"{filter_type}_hours"][index] == parsed[filter_type]["hours"]
+    assert decode_log.validate(corpus, columns) == 0
+
+
+def test_bad_lines_are_rejected_without_aborting(corpus):
+    lines = [corpus[0], "ZZ" * 23, f'{{"type": "STATUS", "contents": "{corpus[1]}"}}', "{broken", "A8A8",
+             '{"contents": 5}', "", corpus[2]]
+
+    packets, rejected = decode_log.read_lines(lines)
+
+    assert packets == [corpus[0], corpus[1], corpus[2]]
+    assert rejected == 4
+    columns = decode_log.decode_batch(packets)
+    assert list(columns["co2"]) == [decode_state(packet).co2 for packet in packets]
+
+
+def test_summary_of_empty_input(capsys):
+    packets, rejected = decode_log.read_lines(["ZZ", "{broken"])
+    assert (packets, rejected) == ([], 2)
+
+    decode_log.summarize(decode_log.decode_batch(packets), ["co2"])
+
+    assert capsys.readouterr().out.splitlines()[1].split() == ["co2", "-", "-", "-", "0", "-"]
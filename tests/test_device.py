@@ -0,0 +1,54 @@
+"""기기 레지스트리 - device_id / entry_id 조회, 제거, 서비스 대상 기기 결정"""
+import pytest
+from homeassistant.exceptions import HomeAssistantError
+
+from custom_components.purethink import _resolve_service_device
+from custom_components.purethink.const import DOMAIN
+from custom_components.purethink.device import get_device
+
+from .conftest import DEVICE_ID, ENTRY_ID
+
+
+async def test_registry_looks_up_by_device_and_entry_id(hass, make_device):
+    first = make_device()
+    second = make_device(device_id="DIV01-SECOND", entry_id="second_entry")
+    registry = hass.data[DOMAIN]
+
+    assert registry.by_device_id == {DEVICE_ID: first, "DIV01-SECOND": second}
+    assert registry.by_entry_id == {ENTRY_ID: first, "second_entry": second}
+    assert get_device(hass, "second_entry") is second
+    assert len(registry) == 2
+    assert list(registry) == [first, second]
+
+
+async def test_registry_remove_clears_both_indexes(hass, make_device):
+    device = make_device()
+    registry = hass.data[DOMAIN]
+
+    assert registry.remove("unknown_entry") is None
+    assert registry.remove(ENTRY_ID) is device
+    assert registry.by_device_id == registry.by_entry_id == {}
+    assert len(registry) == 0
+
+
+async def test_reloaded_entry_replaces_device(hass, make_device):
+    make_device()
+    hass.data[DOMAIN].remove(ENTRY_ID)
+    reloaded = make_device(entry_id="reloaded_entry")
+
+    assert hass.data[DOMAIN].by_device_id[DEVICE_ID] is reloaded
+    assert list(hass.data[DOMAIN].by_entry_id) == ["reloaded_entry"]
+
+
+async def test_service_target_resolution(hass, make_device):
+    device = make_device()
+    assert _resolve_service_device(hass, None) is device  # 기기가 하나면 생략 가능
+    assert _resolve_service_device(hass, f" {DEVICE_ID} ") is device
+
+    with pytest.raises(HomeAssistantError):
+        _resolve_service_device(hass, "DIV01-UNKNOWN")
+
+    second = make_device(device_id="DIV01-SECOND", entry_id="second_entry")
+    assert _resolve_service_device(hass, "DIV01-SECOND") is second
+    with pytest.raises(HomeAssistantError):
+        _resolve_service_device(hass, None)
@@ -0,0 +1,23 @@
+""".test/emulator.py in-process 모드 - 실제 HomeAssistant 인스턴스로 잠깐 돌려 상태 디코드와 명령 왕복 확인"""
+from argparse import Namespace
+
+import pytest
+
+from .conftest import load_tool
+
+
+@pytest.mark.slow
+async def test_in_process_mode_decodes_and_confirms_commands(hass):
+    emulator = load_tool("emulator")
+    args = Namespace(devices=20, device_prefix="DIV01-EMU", rate=5, duration=2, seed=0,
+                     command_rate=20, command_window=150)
+
+    result = await emulator.run_in_process(args, hass)
+
+    assert result["messages"] >= 20 * 5
+    assert result["parsed"] > 0
+    assert result["rejected"] == 0
+    assert result["sent"] > 0
+    assert result["published"] > 0
+    assert result["confirmed"] == result["published"]
+    assert result["failed"] == result["in_flight"] == 0
@@ -0,0 +1,70 @@
+"""공기질 이동 통계 (AirQualityHistory) - 기록 전체를 훑는 단순 계산과 비교"""
+import random
+
+import pytest
+
+from custom_components.purethink.history import AirQualityHistory
+from custom_components.purethink.protocol import DEFAULT_STATE
+
+FIELDS = ("co2", "pm25")
+WINDOWS = (5, 15, 60)
+CAPACITY = 50
+
+
+def _brute_force(samples: list, capacity: int, field: str, span: int, now: float) -> dict:
+    """링에 남은 샘플만으로 창 통계 직접 계산 (samples: (ms, 상태) 목록)"""
+    ms = int(now * 1000)
+    cutoff = ms - span * 1000
+    ring = samples[-capacity:]
+    first = next((index for index, (time, _) in enumerate(ring) if time >= cutoff), len(ring) - 1)
+    window = ring[first:]
+    values = [getattr(state, field) for _, state in window]
+
+    # 시간가중 평균 - 각 값은 다음 샘플(마지막 값은 지금)까지 유지, 창 시작 ~ 첫 샘플은 직전 샘플 값
+    area = 0
+    for (time, state), (next_time, _) in zip(window, window[1:] + [(ms, None)]):
+        area += getattr(state, field) * (next_time - time)
+    start = window[0][0]
+    if start > cutoff and first > 0:
+        area += getattr(ring[first - 1][1], field) * (start - cutoff)
+        start = cutoff
+    duration = ms - start
+    return {
+        "mean": sum(values) / len(values),
+        "min": min(values),
+        "max": max(values),
+        "average": area / duration if duration > 0 else values[-1],
+    }
+
+
+def test_empty_history_has_no_stats():
+    history = AirQualityHistory(FIELDS, WINDOWS, CAPACITY)
+    assert len(history) == 0
+    assert history.stats("co2", 5, 1.0) is None
+
+
+@pytest.mark.parametrize("seed", range(3))
+def test_window_stats_match_brute_force(seed):
+    rng = random.Random(seed)
+    history = AirQualityHistory(FIELDS, WINDOWS, CAPACITY)
+    samples = []
+    now = 1000.0
+    for _ in range(1500):
+        # 짧은 간격 위주, 가끔 창보다 긴 공백 (모든 샘플이 창 밖으로 나가는 경우 포함)
+        now += rng.choice((0.1, 0.5, 1.0, 2.5)) if rng.random() < 0.97 else rng.uniform(20, 90)
+        state = DEFAULT_STATE._replace(co2=rng.randrange(400, 420), pm25=rng.randrange(0, 5))
+        history.add(now, state)
+        samples.append((int(now * 1000), state))
+        assert len(history) == min(len(samples), CAPACITY)
+
+        query = now + rng.choice((0, 0, 0.3, 4, 30))
+        for field in FIELDS:
+            for span in WINDOWS:
+                expected = _brute_force(samples, CAPACITY, field, span, query)
+                actual = history.stats(field, span, query)
+                assert actual["min"] == expected["min"]
+                assert actual["max"] == expected["max"]
+                assert actual["mean"] == pytest.approx(expected["mean"])
+                assert actual["average"] == pytest.approx(expected["average"])
+        # 조회도 monotonic 시각 기준이므로 다음 샘플은 조회 시각 이후
+        now = query
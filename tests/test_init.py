@@ -0,0 +1,191 @@
+"""MQTT 메시지 처리 (on_message) 와 Entry 설정/해제 - 상태 반영, 명령 반영 확인, 되돌아온 CMD 제외, 연결 공유"""
+import json
+import sys
+import time
+from types import SimpleNamespace
+
+from homeassistant.setup import async_setup_component
+from pytest_homeassistant_custom_component.common import MockConfigEntry
+
+from custom_components.purethink import _async_resync, on_message
+from custom_components.purethink.const import DATA_CONNECTION, DOMAIN, STATUS_REQUEST_MAX_AGE
+from custom_components.purethink.protocol import DEFAULT_STATE, decode_state
+
+from .conftest import ENTRY_DATA, ENTRY_ID, status_message
+
+
+def _echo(connection):
+    """마지막으로 발행한 CMD가 /things/{id}/shadow 구독으로 되돌아온 메시지"""
+    topic, command = connection.published[-1]
+    return SimpleNamespace(topic=topic, payload=json.dumps(command).encode())
+
+
+async def test_status_updates_device_state(hass, device):
+    state = DEFAULT_STATE._replace(power=1, fan_speed=1, co2=600, pm25=12)
+
+    on_message(hass, ENTRY_ID, status_message(state))
+    assert device.device_state == state
+    assert device.state == state
+    assert device.available
+    assert device.metrics.parsed == 1
+
+
+async def test_echoed_cmd_leaves_state_and_tracker_unchanged(hass, make_device, connection):
+    device = make_device(optimistic=True)
+    state = DEFAULT_STATE._replace(power=1, fan_speed=1, co2=600, pm25=12)
+    on_message(hass, ENTRY_ID, status_message(state))
+
+    device.commands.async_send(fan_speed=2)
+    assert device.optimistic == {"fan_speed": 2}
+
+    # CMD 의 측정값 필드는 0 - 상태로 받아들이면 센서가 0 이 되고 명령이 바로 확인된 것으로 처리됨
+    on_message(hass, ENTRY_ID, _echo(connection))
+    assert device.device_state == state
+    assert device.state == state._replace(fan_speed=2)
+    assert device.optimistic == {"fan_speed": 2}
+    assert (device.tracker.in_flight, device.tracker.confirmed) == (1, 0)
+    assert device.metrics.parsed == 1
+
+    on_message(hass, ENTRY_ID, status_message(state._replace(fan_speed=2)))
+    assert device.optimistic == {}
+    assert (device.tracker.in_flight, device.tracker.confirmed) == (0, 1)
+    assert device.state.co2 == 600
+
+
+async def test_first_state_is_measured_from_status_not_echo(hass, make_device, connection):
+    device = make_device()
+    device.commands.async_send(fan_speed=2)
+
+    on_message(hass, ENTRY_ID, _echo(connection))
+    assert device.metrics.first_state is None
+
+    on_message(hass, ENTRY_ID, status_message(DEFAULT_STATE._replace(fan_speed=2)))
+    assert device.metrics.first_state is not None
+
+
+async def test_resync_requests_status_from_recently_seen_device(hass, device, connection):
+    state = DEFAULT_STATE._replace(power=1, fan_speed=3, pressure_mode=1, fan_in=1, co2=600)
+    on_message(hass, ENTRY_ID, status_message(state))
+
+    _async_resync(hass, None)
+    assert len(connection.published) == 1
+    topic, command = connection.published[0]
+    assert topic == device.command_topic
+    sent = decode_state(command["contents"])
+    # 현재 상태를 그대로 다시 쓰는 CMD
+    assert (sent.power, sent.fan_speed, sent.ai_mode, sent.sleep_mode, sent.pressure_mode, sent.fan_in,
+            sent.fan_out) == (1, 3, 0, 0, 1, 1, 0)
+    assert device.metrics.status_requests == 1
+    # 재연결 후 같은 상태 패킷이 와도 중복으로 걸러지지 않음
+    assert device.last_payload is None
+
+
+async def test_resync_skips_unknown_or_stale_state(hass, make_device, connection):
+    unknown = make_device()
+    stale = make_device(device_id="DIV01-STALE", entry_id="stale_entry")
+    on_message(hass, "stale_entry", status_message(DEFAULT_STATE, "DIV01-STALE"))
+    # 끊긴 동안 리모컨 등으로 바뀌었을 수 있는 오래된 상태는 기기에 다시 쓰지 않음
+    stale.last_seen -= STATUS_REQUEST_MAX_AGE + 1
+
+    _async_resync(hass, None)
+    assert connection.published == []
+    assert unknown.metrics.status_requests == stale.metrics.status_requests == 0
+
+
+async def test_resync_skips_device_with_pending_command(hass, make_device, connection):
+    device = make_device(optimistic=True)
+    on_message(hass, ENTRY_ID, status_message(DEFAULT_STATE))
+    device.commands.async_send(fan_speed=2)
+
+    _async_resync(hass, None)
+    assert len(connection.published) == 1
+    assert device.metrics.status_requests == 0
+
+
+async def test_resync_uses_state_left_by_previous_entry(hass, make_device, connection):
+    fresh = make_device()
+    stale = make_device(device_id="DIV01-STALE", entry_id="stale_entry")
+    state = DEFAULT_STATE._replace(power=1, fan_speed=2, pressure_mode=2)
+    fresh.previous_state = (state, time.monotonic())
+    stale.previous_state = (state, time.monotonic() - STATUS_REQUEST_MAX_AGE - 1)
+
+    _async_resync(hass, None)
+    assert len(connection.published) == 1
+    topic, command = connection.published[0]
+    assert topic == fresh.command_topic
+    sent = decode_state(command["contents"])
+    assert (sent.power, sent.fan_speed, sent.pressure_mode) == (state.power, state.fan_speed, state.pressure_mode)
+
+
+async def test_reload_requests_status_once_connected(hass, enable_custom_integrations, monkeypatch):
+    # 브로커에 연결하지 않도록 paho 로드를 막고, 연결 성공은 콜백을 직접 호출해 흉내냄
+    monkeypatch.setitem(sys.modules, "paho", None)
+    entry = MockConfigEntry(domain=DOMAIN, data=ENTRY_DATA)
+    entry.add_to_hass(hass)
+    assert await async_setup_component(hass, "http", {})
+    assert await hass.config_entries.async_setup(entry.entry_id)
+    await hass.async_block_till_done()
+
+    state = DEFAULT_STATE._replace(power=1, fan_speed=3, co2=700)
+    on_message(hass, entry.entry_id, status_message(state))
+    assert await hass.config_entries.async_reload(entry.entry_id)
+    await hass.async_block_till_done()
+
+    device = hass.data[DOMAIN].by_entry_id[entry.entry_id]
+    assert device.device_state is None
+    assert device.previous_state[0] == state
+
+    published = []
+    client = SimpleNamespace(subscribe=lambda topics: None, unsubscribe=lambda topic: None, disconnect=lambda: None,
+                             publish=lambda topic, payload, qos=0: published.append((topic, json.loads(payload))))
+    connection = hass.data[DATA_CONNECTION]
+    connection._client = client
+    connection._on_connect(client, None, {}, 0)
+
+    assert len(published) == 1
+    topic, command = published[0]
+    assert topic == device.command_topic
+    sent = decode_state(command["contents"])
+    assert (sent.power, sent.fan_speed, sent.pressure_mode) == (state.power, state.fan_speed, state.pressure_mode)
+    assert device.metrics.status_requests == 1
+
+    assert await hass.config_entries.async_unload(entry.entry_id)
+
+
+async def test_entries_share_one_connection(hass, enable_custom_integrations, monkeypatch):
+    monkeypatch.setitem(sys.modules, "paho", None)
+    assert await async_setup_component(hass, "http", {})
+    entries = [MockConfigEntry(domain=DOMAIN, data={**ENTRY_DATA, "device_id": device_id, "base_id": device_id})
+               for device_id in ("DIV01-FIRST", "DIV01-SECOND")]
+    for entry in entries:
+        entry.add_to_hass(hass)
+        assert await hass.config_entries.async_setup(entry.entry_id)
+    await hass.async_block_till_done()
+
+    connection = hass.data[DATA_CONNECTION]
+    assert connection._routes == {"DIV01-FIRST": entries[0].entry_id, "DIV01-SECOND": entries[1].entry_id}
+    assert hass.data[DOMAIN].by_device_id["DIV01-SECOND"].entry_id == entries[1].entry_id
+
+    # 마지막 Entry 를 해제할 때만 연결 종료
+    assert await hass.config_entries.async_unload(entries[0].entry_id)
+    assert hass.data[DATA_CONNECTION] is connection
+    assert connection._routes == {"DIV01-SECOND": entries[1].entry_id}
+    assert await hass.config_entries.async_unload(entries[1].entry_id)
+    assert DATA_CONNECTION not in hass.data
+
+
+async def test_duplicate_status_is_recorded_in_history(hass, device):
+    state = DEFAULT_STATE._replace(co2=600)
+    message = status_message(state)
+
+    on_message(hass, ENTRY_ID, message)
+    on_message(hass, ENTRY_ID, message)  # 바이트 단위 중복
+    # 봉투만 다른 중복
+    payload = json.loads(message.payload)
+    payload["timestamp"] = 1
+    on_message(hass, ENTRY_ID, SimpleNamespace(topic=message.topic, payload=json.dumps(payload).encode()))
+
+    assert device.metrics.parsed == 1
+    assert device.metrics.duplicates == 2
+    assert len(device.history) == 3
+    assert device.history.stats("co2", device.history.windows[0], time.monotonic())["mean"] == 600
@@ -0,0 +1,111 @@
+"""비트 필드 코덱 - 기존 문자열 파서/수작업 인코더와 바이트 단위로 같은 결과인지 확인"""
+import itertools
+import json
+import random
+
+import pytest
+
+from custom_components.purethink.protocol import CMD_HEADER_HEX, CMD_LENGTH, DEFAULT_STATE, FIELD_END, \
+    FIELD_LAYOUT, FILTER_RESET_HOURS, build_packet, decode_fields, decode_state, encode_fields, generate_command, \
+    parse_status_packet
+
+from .conftest import synthetic_corpus
+from .legacy import legacy_command_contents, legacy_generate_command, legacy_parse_status_packet
+
+
+def _random_packets(count: int, seed: int = 0) -> list[str]:
+    rng = random.Random(seed)
+    packets = [bytes(rng.randrange(256) for _ in range(CMD_LENGTH)).hex().upper() for _ in range(count)]
+    # 모든 비트가 0/1 인 경계값
+    packets += ["A8A81721" + "00" * (CMD_LENGTH - 4), "A8A81722" + "FF" * (CMD_LENGTH - 4)]
+    return packets
+
+
+def test_parse_status_packet_matches_legacy_parser():
+    for packet in _random_packets(2000):
+        assert parse_status_packet(packet) == legacy_parse_status_packet(packet), packet
+
+
+def test_decode_state_matches_decode_fields():
+    for packet in _random_packets(200, seed=1):
+        state = decode_state(packet)
+        assert state._asdict() == decode_fields(bytes.fromhex(packet)), packet
+
+
+def test_encode_decode_round_trip():
+    rng = random.Random(2)
+    for _ in range(200):
+        fields = {name: rng.randrange(1 << width) for name, _, _, width in FIELD_LAYOUT}
+        raw = bytes(4) + encode_fields(fields)
+        assert decode_fields(raw) == fields
+
+
+def test_decode_rejects_short_packet():
+    with pytest.raises(ValueError):
+        decode_state("A8A81721" + "00" * (FIELD_END - 5))
+
+
+@pytest.mark.parametrize("filter_reset", [None, *FILTER_RESET_HOURS])
+def test_command_contents_match_legacy_encoder(filter_reset):
+    modes = [(0, 0), (1, 0), (0, 1), (0, 2), (0, 3)]
+    for power, fan_speed, (ai_mode, sleep_mode), pressure_mode, fan_in, fan_out in itertools.product(
+            (0, 1), range(6), modes, range(3), (0, 1), (0, 1)):
+        state = DEFAULT_STATE._replace(power=power, fan_speed=fan_speed, ai_mode=ai_mode, sleep_mode=sleep_mode,
+                                       pressure_mode=pressure_mode, fan_in=fan_in, fan_out=fan_out)
+        kwargs = {"filter_reset": filter_reset} if filter_reset else {}
+        contents = json.loads(generate_command(state, topic_id="100000", **kwargs))["contents"]
+        assert contents == legacy_command_contents(power, fan_speed, ai_mode, sleep_mode, pressure_mode,
+                                                    fan_in, fan_out, filter_reset)
+
+
+# 명령 인자 21가지 - 전원/모드/팬 속도/압력/흡배기/필터 리셋과 조합
+COMMAND_ARGS = (
+    {"mode": "on"}, {"mode": "off"}, {"mode": "Auto"}, {"mode": "Manual"},
+    {"mode": "Sleep 1"}, {"mode": "Sleep 2"}, {"mode": "Sleep 3"}, {"device_mode": "Auto"},
+    {"fan_speed": 1}, {"fan_speed": 5},
+    {"pressure_mode": "정압"}, {"pressure_mode": "양압"}, {"pressure_mode": "음압"},
+    {"fan_mode": "환기 꺼짐"}, {"fan_mode": "배기"}, {"fan_mode": "흡기"}, {"fan_mode": "흡/배기"},
+    {"filter_reset": "prefilter"}, {"filter_reset": "hepafilter"},
+    {"mode": "on", "device_mode": "Manual", "fan_speed": 4},
+    {"power": 1, "fan_mode": "흡/배기", "fan_speed": 3},
+)
+
+
+def test_cached_command_matches_legacy_generate_command():
+    """캐시된 CMD 생성이 기존 generate_command 와 바이트 단위로 같은지 - 상태 1500 x 인자 21 x topic_id 3가지"""
+    states = [None] + [decode_state(packet) for packet in synthetic_corpus(1499, seed=3)]
+    assert len(COMMAND_ARGS) == 21
+    for index, state in enumerate(states):
+        legacy_state = {} if state is None else state._asdict()
+        for kwargs in COMMAND_ARGS:
+            # topic_id: 문자열, 정수, 생략(난수 - 같은 시드로 비교)
+            for topic_id in ("123456", 123456):
+                assert generate_command(state, topic_id=topic_id, **kwargs) == \
+                    legacy_generate_command(legacy_state, topic_id=topic_id, **kwargs), (state, kwargs, topic_id)
+            random.seed(index)
+            command = generate_command(state, **kwargs)
+            random.seed(index)
+            assert command == legacy_generate_command(legacy_state, **kwargs), (state, kwargs)
+
+
+def test_command_fields_decode_back():
+    contents = build_packet(CMD_HEADER_HEX, {"power": 1, "fan_speed": 3, "pressure_mode": 2, "fan_in": 1})
+    assert len(contents) == CMD_LENGTH * 2
+    assert contents.startswith(CMD_HEADER_HEX)
+    raw = bytes.fromhex(contents)
+    assert int.from_bytes(raw[-2:], "big") == sum(raw[:-2]) & 0xFFFF
+    state = decode_state(contents)
+    assert (state.power, state.fan_speed, state.pressure_mode, state.fan_in, state.fan_out) == (1, 3, 2, 1, 0)
+
+
+def test_generate_command_arguments():
+    state = DEFAULT_STATE._replace(power=1, fan_speed=2, pressure_mode=1, fan_in=1, fan_out=1)
+    command = json.loads(generate_command(state, topic_id="123456", mode="Sleep 2", fan_mode="배기"))
+    assert command["topic_id"] == "123456"
+    assert command["type"] == "CMD"
+    sent = decode_state(command["contents"])
+    # 지정한 필드만 바뀌고 나머지는 현재 상태 유지
+    assert (sent.power, sent.ai_mode, sent.sleep_mode, sent.fan_in, sent.fan_out) == (1, 0, 2, 0, 1)
+    assert (sent.fan_speed, sent.pressure_mode) == (2, 1)
+
+    assert generate_command(state, filter_reset="unknown") is None
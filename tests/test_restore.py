@@ -0,0 +1,69 @@
+"""전원 복원 정보 저장소 - 지연 저장으로 쓰기 묶음, 재시작 후 복원, 삭제된 기기 정리"""
+from datetime import timedelta
+
+from pytest_homeassistant_custom_component.common import async_fire_time_changed
+
+from custom_components.purethink.restore import SAVE_DELAY, STORAGE_KEY, STORAGE_VERSION, RestoreStore
+
+from .conftest import DEVICE_ID
+
+
+async def _flush(hass, freezer):
+    freezer.tick(timedelta(seconds=SAVE_DELAY + 1))
+    async_fire_time_changed(hass)
+    await hass.async_block_till_done()
+
+
+async def test_changes_are_saved_once_after_delay(hass, hass_storage, freezer, device):
+    store = RestoreStore(hass)
+    await store.async_load()
+
+    device.last_device_mode = "Sleep 1"
+    store.async_remember(device)
+    device.last_device_mode = "Manual"
+    device.last_fan_speed = 2
+    store.async_remember(device)
+    assert STORAGE_KEY not in hass_storage  # 지연 저장 전에는 디스크에 쓰지 않음
+
+    await _flush(hass, freezer)
+    assert hass_storage[STORAGE_KEY]["data"] == {DEVICE_ID: {"device_mode": "Manual", "fan_speed": 2}}
+
+
+async def test_unchanged_values_do_not_schedule_save(hass, hass_storage, freezer, device):
+    hass_storage[STORAGE_KEY] = {"version": STORAGE_VERSION, "key": STORAGE_KEY,
+                                 "data": {DEVICE_ID: {"device_mode": "Manual", "fan_speed": 4}}}
+    store = RestoreStore(hass)
+    await store.async_load()
+    del hass_storage[STORAGE_KEY]
+
+    store.async_remember(device)  # 기본값 (Manual, 4) 그대로
+    await _flush(hass, freezer)
+    assert STORAGE_KEY not in hass_storage
+
+
+async def test_saved_values_are_restored_after_restart(hass, hass_storage, make_device):
+    hass_storage[STORAGE_KEY] = {"version": STORAGE_VERSION, "key": STORAGE_KEY,
+                                 "data": {DEVICE_ID: {"device_mode": "Sleep 2", "fan_speed": 5}}}
+    store = RestoreStore(hass)
+    await store.async_load()
+
+    device = make_device()
+    store.async_restore(device)
+    assert (device.last_device_mode, device.last_fan_speed) == ("Sleep 2", 5)
+
+    # 저장된 정보가 없는 기기는 기본값 유지
+    other = make_device(device_id="DIV01-OTHER", entry_id="other_entry")
+    store.async_restore(other)
+    assert (other.last_device_mode, other.last_fan_speed) == ("Manual", 4)
+
+
+async def test_forget_removes_saved_device(hass, hass_storage, freezer, device):
+    hass_storage[STORAGE_KEY] = {"version": STORAGE_VERSION, "key": STORAGE_KEY,
+                                 "data": {DEVICE_ID: {"device_mode": "Auto", "fan_speed": 4},
+                                          "DIV01-OTHER": {"device_mode": "Manual", "fan_speed": 1}}}
+    store = RestoreStore(hass)
+    await store.async_load()
+
+    store.async_forget(DEVICE_ID)
+    await _flush(hass, freezer)
+    assert hass_storage[STORAGE_KEY]["data"] == {"DIV01-OTHER": {"device_mode": "Manual", "fan_speed": 1}}
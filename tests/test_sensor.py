@@ -0,0 +1,81 @@
+"""센서 상태 기록 제한 (WriteFilter) - 최소 변화량, 최소 간격, 급변, heartbeat, 센서 종류별 기본값/옵션"""
+from custom_components.purethink.const import CONF_PM_DELTA, CONF_PM_HEARTBEAT, CONF_PM_MIN_INTERVAL, \
+    FORCE_WRITE_FACTOR, SENSOR_WRITE_LIMITS
+from custom_components.purethink.sensor import WriteFilter, write_filter
+
+DELTA = 10
+MIN_INTERVAL = 10
+HEARTBEAT = 300
+
+
+def _filter() -> WriteFilter:
+    write_filter = WriteFilter(DELTA, MIN_INTERVAL, HEARTBEAT)
+    assert write_filter.should_write(500, True, 0.0)
+    return write_filter
+
+
+def test_first_value_is_written():
+    write_filter = WriteFilter(DELTA, MIN_INTERVAL, HEARTBEAT)
+    assert write_filter.should_write(500, True, 0.0)
+    assert (write_filter.value, write_filter.available, write_filter.written_at) == (500, True, 0.0)
+
+
+def test_unchanged_value_is_not_written():
+    write_filter = _filter()
+    assert not write_filter.should_write(500, True, 1000.0)
+
+
+def test_small_change_waits_for_heartbeat():
+    write_filter = _filter()
+    assert not write_filter.should_write(505, True, 20.0)
+    assert not write_filter.should_write(505, True, HEARTBEAT - 1)
+    assert write_filter.should_write(505, True, HEARTBEAT)
+    assert write_filter.value == 505
+
+
+def test_delta_change_waits_for_min_interval():
+    write_filter = _filter()
+    assert not write_filter.should_write(500 + DELTA, True, MIN_INTERVAL - 1)
+    assert write_filter.should_write(500 + DELTA, True, MIN_INTERVAL)
+    # 기록 기준값이 바뀌었으므로 다음 변화량은 새 값 기준
+    assert not write_filter.should_write(500 + DELTA + DELTA - 1, True, MIN_INTERVAL * 3)
+
+
+def test_large_change_is_written_immediately():
+    write_filter = _filter()
+    force = DELTA * FORCE_WRITE_FACTOR
+    assert not write_filter.should_write(500 + force - 1, True, 1.0)
+    assert write_filter.should_write(500 - force, True, 1.0)
+
+
+def test_availability_change_is_written_immediately():
+    write_filter = _filter()
+    assert write_filter.should_write(500, False, 1.0)
+    assert write_filter.should_write(501, True, 2.0)
+    assert write_filter.should_write(None, True, 3.0)
+    assert write_filter.should_write(501, True, 4.0)
+
+
+def test_without_heartbeat_small_changes_are_dropped():
+    write_filter = WriteFilter(DELTA, MIN_INTERVAL, 0)
+    assert write_filter.should_write(500, True, 0.0)
+    assert not write_filter.should_write(501, True, 100000.0)
+
+
+def test_write_limits_are_per_sensor_type():
+    assert _limits(write_filter({}, "co2")) == SENSOR_WRITE_LIMITS["co2"]
+    assert _limits(write_filter({}, "odor")) == SENSOR_WRITE_LIMITS["odor"]
+    assert _limits(write_filter({}, "wifi")) == SENSOR_WRITE_LIMITS["wifi"]
+
+
+def test_options_override_only_their_sensor_group():
+    options = {CONF_PM_DELTA: 5, CONF_PM_MIN_INTERVAL: 30, CONF_PM_HEARTBEAT: 0}
+
+    for sensor_type in ("pm1", "pm25", "pm10"):
+        assert _limits(write_filter(options, sensor_type)) == (5, 30, 0)
+    assert _limits(write_filter(options, "co2")) == SENSOR_WRITE_LIMITS["co2"]
+    assert _limits(write_filter(options, "wifi")) == SENSOR_WRITE_LIMITS["wifi"]
+
+
+def _limits(sensor_filter: WriteFilter) -> tuple:
+    return sensor_filter.delta, sensor_filter.min_interval, sensor_filter.heartbeat
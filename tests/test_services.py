@@ -0,0 +1,69 @@
+"""set_state 서비스 - 스키마 검증과 CMD 패킷 하나로의 변환"""
+import pytest
+import voluptuous as vol
+
+from custom_components.purethink import SET_STATE_SCHEMA
+from custom_components.purethink.protocol import DEFAULT_STATE, decode_state, state_command
+
+
+@pytest.mark.parametrize(("data", "expected"), [
+    ({"fan_speed": "3"}, {"fan_speed": 3}),
+    ({"power": "on", "preset": "Sleep 2"}, {"power": True, "preset": "Sleep 2"}),
+    ({"device_id": "DIV01-A", "fan_in": "false"}, {"device_id": ["DIV01-A"], "fan_in": False}),
+    ({"device_id": ["DIV01-A", "DIV01-B"], "pressure_mode": "양압"},
+     {"device_id": ["DIV01-A", "DIV01-B"], "pressure_mode": "양압"}),
+    ({"filter_reset": "hepafilter"}, {"filter_reset": "hepafilter"}),
+])
+def test_schema_accepts_and_coerces(data, expected):
+    assert SET_STATE_SCHEMA(data) == expected
+
+
+@pytest.mark.parametrize("data", [
+    {},
+    {"device_id": "DIV01-A"},  # 바꿀 필드 없음
+    {"fan_speed": 6},
+    {"fan_speed": -1},
+    {"preset": "Turbo"},
+    {"pressure_mode": "고압"},
+    {"filter_reset": "carbon"},
+    {"power": "maybe"},
+    {"speed": 3},  # 알 수 없는 키
+])
+def test_schema_rejects_invalid(data):
+    with pytest.raises(vol.Invalid):
+        SET_STATE_SCHEMA(data)
+
+
+def test_state_command_preset_turns_power_on():
+    assert state_command(preset="Auto") == {"power": 1, "ai_mode": 1, "sleep_mode": 0}
+    # 전원을 함께 지정하면 지정한 값 우선
+    assert state_command(preset="Sleep 3", power=False) == {"power": 0, "ai_mode": 0, "sleep_mode": 3}
+
+
+def test_state_command_converts_fields():
+    assert state_command(fan_speed=2, pressure_mode="음압", fan_in=True, fan_out=False, filter_reset="prefilter") == {
+        "fan_speed": 2, "pressure_mode": 2, "fan_in": 1, "fan_out": 0, "filter_reset": "prefilter",
+    }
+
+
+@pytest.mark.parametrize("kwargs", [
+    {},
+    {"fan_speed": 6},
+    {"preset": "Turbo"},
+    {"pressure_mode": "고압"},
+    {"filter_reset": "carbon"},
+])
+def test_state_command_rejects_invalid(kwargs):
+    with pytest.raises(ValueError):
+        state_command(**kwargs)
+
+
+async def test_state_command_is_sent_as_one_cmd(make_device, connection):
+    device = make_device()
+    device.device_state = device.state = DEFAULT_STATE._replace(power=0, fan_speed=1, fan_in=1, fan_out=1)
+
+    device.commands.async_send(**state_command(preset="Manual", fan_speed=5, pressure_mode="양압", fan_out=False))
+    assert len(connection.published) == 1
+    sent = decode_state(connection.published[0][1]["contents"])
+    assert (sent.power, sent.ai_mode, sent.sleep_mode, sent.fan_speed, sent.pressure_mode) == (1, 0, 0, 5, 1)
+    assert (sent.fan_in, sent.fan_out) == (1, 0)
@@ -0,0 +1,68 @@
+"""시작 비용 - 패키지 import 시간 예산, paho 지연 로드, Config Entry 설정 시간 예산"""
+import json
+import os
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+from homeassistant.setup import async_setup_component
+from pytest_homeassistant_custom_component.common import MockConfigEntry
+
+from custom_components.purethink.const import DATA_CONNECTION, DOMAIN
+
+from .conftest import ENTRY_DATA
+
+ROOT = Path(__file__).resolve().parent.parent
+# 통합구성요소 패키지 import 시간 예산 (ms, Home Assistant 가 미리 로드해 두는 모듈은 제외)
+IMPORT_BUDGET_MS = 25
+# 새 프로세스 측정값이 흔들리므로 가장 빠른 값으로 판정
+IMPORT_RUNS = 3
+# Config Entry 하나 설정 시간 예산 (ms, 플랫폼 설정 포함 - 브로커 연결은 백그라운드라 제외)
+SETUP_BUDGET_MS = 250
+
+# paho 는 첫 연결 시 executor 에서 로드 - import 시점에 로드하려 하면 ImportError 로 실패하게 막음
+_IMPORT_PROBE = """
+import json, sys, time
+sys.modules["paho"] = None
+import aiohttp.web, voluptuous, homeassistant.core, homeassistant.config_entries, homeassistant.helpers.dispatcher
+started = time.perf_counter()
+import custom_components.purethink
+elapsed = time.perf_counter() - started
+print(json.dumps({"import_ms": elapsed * 1000, "loaded": sorted(name for name in sys.modules if name.startswith("paho."))}))
+"""
+
+
+def _import_ms() -> float:
+    # HA 처럼 바이트코드 캐시를 쓰는 import 로 측정 (컴파일 시간 제외)
+    env = {key: value for key, value in os.environ.items() if key != "PYTHONDONTWRITEBYTECODE"}
+    probe = subprocess.run([sys.executable, "-c", _IMPORT_PROBE], cwd=ROOT, env=env, capture_output=True, text=True)
+    assert probe.returncode == 0, probe.stderr
+    result = json.loads(probe.stdout)
+    assert result["loaded"] == []
+    return result["import_ms"]
+
+
+def test_package_import_within_budget_without_paho():
+    _import_ms()  # 바이트코드 캐시 생성
+    import_ms = min(_import_ms() for _ in range(IMPORT_RUNS))
+    assert import_ms <= IMPORT_BUDGET_MS, f"import custom_components.purethink: {import_ms:.1f} ms"
+
+
+async def test_setup_entry_within_budget_without_paho(hass, enable_custom_integrations, monkeypatch):
+    # 설정은 paho 없이 끝나야 함 - 백그라운드 연결 작업만 클라이언트 생성에 실패
+    monkeypatch.setitem(sys.modules, "paho", None)
+    entry = MockConfigEntry(domain=DOMAIN, data=ENTRY_DATA)
+    entry.add_to_hass(hass)
+    assert await async_setup_component(hass, "http", {})
+
+    started = time.perf_counter()
+    assert await hass.config_entries.async_setup(entry.entry_id)
+    setup_ms = (time.perf_counter() - started) * 1000
+    await hass.async_block_till_done()
+
+    assert setup_ms <= SETUP_BUDGET_MS, f"async_setup_entry: {setup_ms:.1f} ms"
+    assert not hass.data[DATA_CONNECTION].connected
+    # 모든 플랫폼이 엔티티까지 설정됨
+    assert hass.states.get("switch.test_power") is not None
+    assert await hass.config_entries.async_unload(entry.entry_id)
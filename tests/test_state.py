@@ -0,0 +1,67 @@
+"""표시 상태 갱신 - 바뀐 필드만 알리고, 엔티티는 담당 필드가 바뀐 경우에만 상태 기록"""
+from types import SimpleNamespace
+
+from homeassistant.helpers.dispatcher import async_dispatcher_connect
+
+from custom_components.purethink import on_message
+from custom_components.purethink.const import DOMAIN
+from custom_components.purethink.fan import PurethinkFan
+from custom_components.purethink.protocol import DEFAULT_STATE
+from custom_components.purethink.state import ALL_FIELDS, async_refresh_state
+
+from .conftest import ENTRY_DATA, ENTRY_ID, status_message
+
+
+def _listen(hass) -> list:
+    updates = []
+    async_dispatcher_connect(hass, f"{DOMAIN}_state_update_{ENTRY_ID}", updates.append)
+    return updates
+
+
+async def test_only_changed_fields_are_dispatched(hass, device):
+    updates = _listen(hass)
+    state = DEFAULT_STATE._replace(power=1, co2=600)
+
+    device.device_state = state
+    assert async_refresh_state(hass, device) == ALL_FIELDS  # 첫 상태는 모든 필드
+
+    assert async_refresh_state(hass, device) == frozenset()  # 같은 상태는 알리지 않음
+
+    device.device_state = state._replace(co2=650, pm25=9)
+    assert async_refresh_state(hass, device) == {"co2", "pm25"}
+    assert updates == [ALL_FIELDS, {"co2", "pm25"}]
+
+
+async def test_optimistic_overlay_counts_as_change(hass, device):
+    device.device_state = DEFAULT_STATE
+    async_refresh_state(hass, device)
+
+    device.optimistic = {"fan_speed": 2}
+    assert async_refresh_state(hass, device) == {"fan_speed"}
+    assert device.state.fan_speed == 2
+
+    # 기기가 같은 값을 보고하고 낙관적 상태를 정리해도 표시 상태는 그대로
+    device.device_state = DEFAULT_STATE._replace(fan_speed=2)
+    device.optimistic = {}
+    assert async_refresh_state(hass, device) == frozenset()
+
+
+async def test_entity_ignores_unrelated_fields(hass, device):
+    fan = PurethinkFan(SimpleNamespace(data=ENTRY_DATA, entry_id=ENTRY_ID), device)
+    fan.hass = hass
+    writes = []
+    fan.async_write_ha_state = lambda: writes.append(device.state)
+    async_dispatcher_connect(hass, f"{DOMAIN}_state_update_{ENTRY_ID}", fan._handle_update)
+    state = DEFAULT_STATE._replace(power=1, fan_in=1, fan_out=1, fan_speed=3, co2=600)
+
+    on_message(hass, ENTRY_ID, status_message(state))
+    assert len(writes) == 1
+
+    # 측정값만 바뀐 패킷은 팬 엔티티를 건드리지 않음
+    on_message(hass, ENTRY_ID, status_message(state._replace(co2=700, pm10=40)))
+    assert len(writes) == 1
+    assert device.metrics.dispatched == 2
+
+    on_message(hass, ENTRY_ID, status_message(state._replace(co2=700, pm10=40, fan_speed=5)))
+    assert len(writes) == 2
+    assert fan.percentage == 100